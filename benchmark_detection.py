@@ -0,0 +1,276 @@
+"""
+展品占用检测基准测试
+回放带标注的图片集，统计检测流程各阶段耗时、帧率、延迟分位数及人员检测的精确率/召回率，
+并在模型、输入尺寸和推理后端之间扫描，输出精度/延迟的帕累托前沿；
+可同时测试粗到细多尺度推理，并与全分辨率推理比较速度和召回率。
+同时统计预分配缓冲区在稳定运行阶段的重新分配次数，可选用 tracemalloc 统计每帧的临时内存分配
+"""
+import argparse
+import dataclasses
+import json
+import sys
+import os
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.services.exhibit_regions import ExhibitRegions
+from src.services.frame_sources import ImageFolderFrameSource
+from src.services.person_detector import create_person_detector, onnx_model_path
+from src.services.person_tracker import PersonTracker, box_iou
+from src.utils.config import detection_config, exhibit_config
+
+STAGES = ("grab", "convert", "preprocess", "inference", "postprocess", "assign", "track")
+PERSON_CLASS_ID = 0  # COCO/YOLO标注中的人员类别
+
+
+def load_person_labels(image_file: str, frame_shape) -> Optional[np.ndarray]:
+    """
+    读取YOLO格式标注（images/ 对应 labels/）中的人员框
+
+    Returns:
+        像素坐标的人员框数组 (M, 4)，没有标注文件时返回None
+    """
+    parts = image_file.split(os.sep)
+    if "images" not in parts:
+        return None
+    parts[len(parts) - 1 - parts[::-1].index("images")] = "labels"
+    label_file = os.path.splitext(os.sep.join(parts))[0] + ".txt"
+    if not os.path.exists(label_file):
+        return None
+
+    labels = np.loadtxt(label_file, ndmin=2)
+    if labels.size == 0:
+        return np.zeros((0, 4))
+    labels = labels[labels[:, 0] == PERSON_CLASS_ID]
+    height, width = frame_shape[:2]
+    cx, cy, w, h = labels[:, 1] * width, labels[:, 2] * height, labels[:, 3] * width, labels[:, 4] * height
+    return np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+
+
+def match_detections(pred: np.ndarray, conf: np.ndarray, gt: np.ndarray, iou_threshold: float = 0.5):
+    """
+    按置信度从高到低贪心匹配预测框与标注框
+
+    Returns:
+        (tp, fp, fn) 元组
+    """
+    if len(gt) == 0 or len(pred) == 0:
+        return 0, len(pred), len(gt)
+    iou = box_iou(pred[np.argsort(-conf)], gt)
+    matched = np.zeros(len(gt), dtype=bool)
+    tp = 0
+    for row in iou:
+        row = np.where(matched, 0.0, row)
+        best = int(np.argmax(row))
+        if row[best] >= iou_threshold:
+            matched[best] = True
+            tp += 1
+    return tp, len(pred) - tp, len(gt) - tp
+
+
+def benchmark_config(source: ImageFolderFrameSource, config, regions: ExhibitRegions,
+                     repeat: int, trace_alloc: bool = False) -> Dict:
+    """
+    用指定配置回放全部图片 repeat 遍
+
+    Args:
+        trace_alloc: 是否用 tracemalloc 统计每帧取帧和检测过程中的临时内存分配峰值
+            （仅统计NumPy/OpenCV数组等经Python分配器的内存，不含PyTorch张量；会降低帧率）
+
+    Returns:
+        包含各阶段平均耗时、帧率、延迟分位数、精确率/召回率和内存分配统计的结果字典
+    """
+    detector = create_person_detector(config)
+    tracker = PersonTracker(
+        iou_threshold=config.tracker_iou_threshold,
+        max_age=config.tracker_max_age,
+        distance_threshold=config.tracker_distance_threshold
+    )
+    stage_times = {stage: [] for stage in STAGES}
+    latencies = []
+    alloc_bytes = []
+    crops = []
+    tp = fp = fn = 0
+    # 第一遍回放用于建立缓冲区，之后的分配次数即稳定运行阶段的重新分配次数
+    steady_allocations = None
+
+    if trace_alloc:
+        tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        source.rewind()
+        while True:
+            if trace_alloc:
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+            t0 = time.perf_counter()
+            frame = source.read()
+            if frame is None:
+                break
+            boxes_xyxy, confidences = detector.detect(frame)
+            t1 = time.perf_counter()
+            regions.assign_boxes(boxes_xyxy, frame.shape)
+            t2 = time.perf_counter()
+            tracker.update(boxes_xyxy, t2)
+            t3 = time.perf_counter()
+            if trace_alloc:
+                alloc_bytes.append(tracemalloc.get_traced_memory()[1] - baseline)
+            crops.append(getattr(detector, "last_crops", 0))
+
+            latencies.append(t3 - t0)
+            timings = dict(source.last_timings, **detector.last_timings, assign=t2 - t1, track=t3 - t2)
+            for stage in STAGES:
+                stage_times[stage].append(timings.get(stage, 0.0))
+
+            gt = load_person_labels(source.current_file, frame.shape)
+            if gt is not None:
+                counts = match_detections(boxes_xyxy, confidences, gt)
+                tp, fp, fn = tp + counts[0], fp + counts[1], fn + counts[2]
+        if steady_allocations is None:
+            steady_allocations = -(source.buffers.allocations + detector.buffers.allocations)
+    elapsed = time.perf_counter() - started
+    if trace_alloc:
+        tracemalloc.stop()
+    steady_allocations += source.buffers.allocations + detector.buffers.allocations
+
+    latencies_ms = np.array(latencies) * 1000.0
+    precision = tp / (tp + fp) if tp + fp else float("nan")
+    recall = tp / (tp + fn) if tp + fn else float("nan")
+    return {
+        "backend": config.detector_backend,
+        "model": config.onnx_model_path if config.detector_backend == "onnxruntime" else config.yolo_model_path,
+        "imgsz": config.inference_imgsz,
+        "mode": "adaptive" if config.adaptive_inference else "full",
+        "crops_per_frame": float(np.mean(crops)) if crops else 0.0,
+        "frames": len(latencies),
+        "fps": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "stages_ms": {stage: float(np.mean(times) * 1000.0) for stage, times in stage_times.items()},
+        "precision": precision,
+        "recall": recall,
+        "f1": 2 * tp / (2 * tp + fp + fn) if tp else 0.0,
+        "buffer_bytes": source.buffers.nbytes + detector.buffers.nbytes,
+        "steady_allocations": steady_allocations,
+        "alloc_kb_per_frame": float(np.mean(alloc_bytes) / 1024.0) if alloc_bytes else None,
+    }
+
+
+def mark_pareto_front(results: List[Dict]):
+    """标记延迟(p95)更低且F1不更差、不被其他配置支配的结果"""
+    for r in results:
+        r["pareto"] = not any(
+            o is not r
+            and o["p95_ms"] <= r["p95_ms"] and o["f1"] >= r["f1"]
+            and (o["p95_ms"] < r["p95_ms"] or o["f1"] > r["f1"])
+            for o in results
+        )
+
+
+def print_report(results: List[Dict]):
+    """打印结果表格"""
+    header = (f"{'backend':<12} {'model':<22} {'imgsz':>5} {'mode':<8} {'fps':>7} {'p50':>7} {'p95':>7} {'p99':>7} "
+              + " ".join(f"{stage[:7]:>7}" for stage in STAGES)
+              + f" {'prec':>5} {'recall':>6} {'allocs':>6} {'kb/frm':>8} {'pareto':>6}")
+    print(header)
+    print("-" * len(header))
+    for r in sorted(results, key=lambda r: r["p95_ms"]):
+        print(f"{r['backend']:<12} {os.path.basename(r['model']):<22} {r['imgsz']:>5} {r['mode']:<8} {r['fps']:>7.1f} "
+              f"{r['p50_ms']:>7.1f} {r['p95_ms']:>7.1f} {r['p99_ms']:>7.1f} "
+              + " ".join(f"{r['stages_ms'][stage]:>7.2f}" for stage in STAGES)
+              + f" {r['precision']:>5.2f} {r['recall']:>6.2f} {r['steady_allocations']:>6}"
+              + (f" {r['alloc_kb_per_frame']:>8.1f}" if r['alloc_kb_per_frame'] is not None else f" {'-':>8}")
+              + f" {'*' if r['pareto'] else '':>6}")
+    print("\n延迟单位为毫秒；* 表示位于精度(F1)/延迟(p95)帕累托前沿")
+    print("allocs 为首遍回放后预分配缓冲区的重新分配次数（分辨率不变时应为0）；"
+          "kb/frm 为 --trace-alloc 统计的每帧临时分配峰值")
+
+
+def print_adaptive_speedups(results: List[Dict]):
+    """将每个粗到细结果与同一后端、模型下输入尺寸最大的全分辨率结果比较"""
+    for r in results:
+        if r["mode"] != "adaptive":
+            continue
+        references = [o for o in results if o["mode"] == "full"
+                      and o["backend"] == r["backend"] and o["model"] == r["model"]]
+        if not references:
+            continue
+        ref = max(references, key=lambda o: o["imgsz"])
+        print(f"{r['backend']} {os.path.basename(r['model'])}: adaptive imgsz={r['imgsz']} "
+              f"({r['crops_per_frame']:.2f} crops/frame) vs full imgsz={ref['imgsz']}: "
+              f"{ref['p50_ms'] / r['p50_ms']:.2f}x p50 speed-up, "
+              f"recall {r['recall']:.3f} vs {ref['recall']:.3f}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="展品占用检测基准测试")
+    parser.add_argument("--images", nargs="+", default=["datasets/coco8/images", "exhibit_detection"],
+                        help="图片目录或通配符；images/ 旁的 labels/ 目录用于计算精确率/召回率")
+    parser.add_argument("--models", nargs="+", default=[detection_config.yolo_model_path],
+                        help=".pt 权重；ONNX后端使用按输入尺寸导出的 <权重名>-<imgsz>.onnx 文件")
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[detection_config.inference_imgsz])
+    parser.add_argument("--backends", nargs="+", choices=["ultralytics", "onnxruntime"],
+                        default=[detection_config.detector_backend])
+    parser.add_argument("--adaptive", action="store_true",
+                        help="同时测试粗到细多尺度推理，并与最大 --imgsz 的全分辨率推理比较")
+    parser.add_argument("--repeat", type=int, default=3, help="每个配置回放图片集的遍数")
+    parser.add_argument("--trace-alloc", action="store_true",
+                        help="用tracemalloc统计每帧临时内存分配（会降低帧率）")
+    parser.add_argument("--json", help="将结果另存为JSON文件")
+    args = parser.parse_args()
+
+    source = ImageFolderFrameSource(args.images, preload=True)
+    regions = ExhibitRegions.from_config(exhibit_config.total_exhibit_ids, detection_config.exhibit_regions)
+    print(f"Loaded {len(source)} images from {args.images}\n")
+
+    results = []
+    for backend in args.backends:
+        for weights in args.models:
+            for imgsz in args.imgsz:
+                config = dataclasses.replace(
+                    detection_config,
+                    detector_backend=backend,
+                    yolo_model_path=weights,
+                    onnx_model_path=onnx_model_path(weights, imgsz),
+                    inference_imgsz=imgsz
+                )
+                if backend == "onnxruntime" and not os.path.exists(config.onnx_model_path):
+                    print(f"Skipping {backend}/{weights}: {config.onnx_model_path} not found "
+                          f"(run export_detection_model.py --weights {weights} --imgsz {imgsz})")
+                    continue
+                for adaptive in ([False, True] if args.adaptive else [False]):
+                    config = dataclasses.replace(config, adaptive_inference=adaptive)
+                    print(f"Benchmarking {backend} {weights} imgsz={imgsz}{' adaptive' if adaptive else ''}...")
+                    try:
+                        results.append(benchmark_config(source, config, regions, args.repeat, args.trace_alloc))
+                    except Exception as e:
+                        # 单个配置失败（模型缺失、输入尺寸不符等）不影响其余配置的结果
+                        print(f"Skipping {backend}/{weights} imgsz={imgsz}: {e}")
+
+    if not results:
+        print("No configuration was benchmarked")
+        return
+
+    mark_pareto_front(results)
+    print()
+    print_report(results)
+    if args.adaptive:
+        print()
+        print_adaptive_speedups(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+语音识别基准测试
+在用户提供的WAV片段（例如在展厅现场录制的访客提问）上比较各语音识别后端、模型大小和计算精度的
+加载时间、实时率（RTF）和延迟分位数；片段旁有同名 .txt 参考文本时同时计算词错误率（WER），
+便于按部署主机选择模型大小。仓库不附带音频片段，每次比较应使用同一组片段
+"""
+import argparse
+import dataclasses
+import glob
+import json
+import sys
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.services.speech_service import SpeechRecognitionService
+from src.utils.config import speech_config
+
+
+def load_clips(patterns: List[str]) -> List[Tuple[str, np.ndarray, int, Optional[str]]]:
+    """
+    读取WAV片段及其参考文本
+
+    Args:
+        patterns: WAV文件、目录或通配符
+
+    Returns:
+        (文件路径, 录音数据, 采样率, 参考文本或None) 列表
+    """
+    from scipy.io.wavfile import read
+
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            files.extend(sorted(glob.glob(os.path.join(pattern, "*.wav"))))
+        else:
+            files.extend(sorted(glob.glob(pattern)))
+
+    clips = []
+    for path in files:
+        fs, recording = read(path)
+        if recording.dtype != np.int16:
+            # 浮点WAV按 [-1, 1] 还原为 int16，与麦克风录音的格式一致
+            recording = (np.clip(recording, -1.0, 1.0) * 32767).astype(np.int16)
+        reference_file = os.path.splitext(path)[0] + ".txt"
+        reference = None
+        if os.path.exists(reference_file):
+            with open(reference_file, encoding="utf-8") as f:
+                reference = f.read()
+        clips.append((path, recording, fs, reference))
+    return clips
+
+
+def _words(text: str) -> List[str]:
+    return "".join(c if c.isalnum() or c.isspace() else " " for c in text.lower()).split()
+
+
+def word_errors(hypothesis: str, reference: str) -> Tuple[int, int]:
+    """
+    按词级编辑距离统计错误数
+
+    Returns:
+        (错误词数, 参考文本词数) 元组
+    """
+    hyp, ref = _words(hypothesis), _words(reference)
+    row = np.arange(len(hyp) + 1)
+    for i, word in enumerate(ref, 1):
+        previous, row = row, np.empty_like(row)
+        row[0] = i
+        for j in range(1, len(hyp) + 1):
+            row[j] = min(previous[j] + 1, row[j - 1] + 1, previous[j - 1] + (word != hyp[j - 1]))
+    return int(row[-1]), len(ref)
+
+
+def benchmark_config(clips, config, repeat: int) -> Dict:
+    """
+    用指定配置转写全部片段 repeat 遍（转写内存中的录音，与线上路径一致）
+
+    Returns:
+        包含加载时间、实时率、延迟分位数和词错误率的结果字典
+    """
+    service = SpeechRecognitionService(config)
+    started = time.perf_counter()
+    service.warmup()
+    load_s = time.perf_counter() - started
+
+    audio_s = 0.0
+    latencies = []
+    rtfs = []
+    errors = words = 0
+    for _ in range(repeat):
+        for _, recording, fs, reference in clips:
+            duration = len(recording) / fs
+            t0 = time.perf_counter()
+            text = service.transcribe_array(recording, fs)
+            elapsed = time.perf_counter() - t0
+            audio_s += duration
+            latencies.append(elapsed)
+            rtfs.append(elapsed / duration if duration > 0 else 0.0)
+            if reference is not None:
+                counts = word_errors(text, reference)
+                errors, words = errors + counts[0], words + counts[1]
+
+    latencies_ms = np.array(latencies) * 1000.0
+    return {
+        "backend": config.asr_backend,
+        "model": config.whisper_model,
+        "compute_type": config.asr_compute_type if config.asr_backend == "faster-whisper" else "-",
+        "threads": config.asr_cpu_threads,
+        "beam_size": config.asr_beam_size,
+        "clips": len(latencies),
+        "load_s": load_s,
+        "audio_s": audio_s,
+        "rtf": float(np.sum(latencies) / audio_s) if audio_s > 0 else float("nan"),
+        "rtf_p95": float(np.percentile(rtfs, 95)),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "wer": errors / words if words else float("nan"),
+    }
+
+
+def print_report(results: List[Dict]):
+    """打印结果表格"""
+    header = (f"{'backend':<15} {'model':<10} {'compute':<13} {'thr':>3} {'beam':>4} {'load_s':>7} "
+              f"{'rtf':>6} {'rtf_p95':>7} {'p50':>8} {'p95':>8} {'wer':>6}")
+    print(header)
+    print("-" * len(header))
+    for r in sorted(results, key=lambda r: r["rtf"]):
+        print(f"{r['backend']:<15} {r['model']:<10} {r['compute_type']:<13} {r['threads']:>3} {r['beam_size']:>4} "
+              f"{r['load_s']:>7.1f} {r['rtf']:>6.3f} {r['rtf_p95']:>7.3f} {r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} "
+              f"{r['wer']:>6.3f}")
+    print("\nrtf 为总处理时间/总音频时长（小于1表示快于实时）；延迟单位为毫秒；"
+          "wer 仅在片段旁有同名 .txt 参考文本时计算")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="语音识别基准测试")
+    parser.add_argument("--clips", nargs="+", required=True,
+                        help="WAV文件、目录或通配符；同名 .txt 文件作为参考文本用于计算WER")
+    parser.add_argument("--backends", nargs="+", choices=["whisper", "faster-whisper"],
+                        default=[speech_config.asr_backend])
+    parser.add_argument("--models", nargs="+", default=[speech_config.whisper_model],
+                        help="模型大小，如 tiny base small")
+    parser.add_argument("--compute-types", nargs="+", default=[speech_config.asr_compute_type],
+                        help="faster-whisper计算精度，如 int8 float32")
+    parser.add_argument("--threads", nargs="+", type=int, default=[speech_config.asr_cpu_threads],
+                        help="faster-whisper的CPU线程数，0表示默认")
+    parser.add_argument("--beam-size", type=int, default=speech_config.asr_beam_size)
+    parser.add_argument("--device", default=speech_config.asr_device)
+    parser.add_argument("--repeat", type=int, default=1, help="每个配置转写片段集的遍数")
+    parser.add_argument("--json", help="将结果另存为JSON文件")
+    args = parser.parse_args()
+
+    clips = load_clips(args.clips)
+    if not clips:
+        print(f"No WAV clips found in {args.clips}")
+        return
+    total = sum(len(recording) / fs for _, recording, fs, _ in clips)
+    print(f"Loaded {len(clips)} clips ({total:.1f}s of audio) from {args.clips}\n")
+
+    results = []
+    for backend in args.backends:
+        # openai-whisper 不使用计算精度和线程数参数，只测一次
+        compute_types = args.compute_types if backend == "faster-whisper" else [speech_config.asr_compute_type]
+        threads = args.threads if backend == "faster-whisper" else [speech_config.asr_cpu_threads]
+        for model in args.models:
+            for compute_type in compute_types:
+                for cpu_threads in threads:
+                    config = dataclasses.replace(
+                        speech_config,
+                        asr_backend=backend,
+                        whisper_model=model,
+                        asr_compute_type=compute_type,
+                        asr_cpu_threads=cpu_threads,
+                        asr_beam_size=args.beam_size,
+                        asr_device=args.device
+                    )
+                    print(f"Benchmarking {backend} {model}"
+                          + (f" {compute_type} threads={cpu_threads}" if backend == "faster-whisper" else "")
+                          + "...")
+                    results.append(benchmark_config(clips, config, args.repeat))
+
+    print()
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
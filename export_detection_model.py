@@ -0,0 +1,29 @@
+"""
+导出检测模型：将YOLO .pt 权重转换为ONNX Runtime CPU后端使用的ONNX模型
+"""
+import argparse
+import sys
+import os
+
+# 添加src目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.services.person_detector import export_onnx
+from src.utils.config import detection_config
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="导出YOLO人员检测模型为ONNX")
+    parser.add_argument("--weights", default=detection_config.yolo_model_path, help=".pt 权重路径")
+    parser.add_argument("--imgsz", type=int, default=detection_config.inference_imgsz, help="输入尺寸")
+    parser.add_argument("--int8", action="store_true", help="额外生成int8静态量化模型")
+    parser.add_argument("--calib", default="datasets/coco8/images", help="int8量化校准图片目录或通配符")
+    args = parser.parse_args()
+    
+    model_path = export_onnx(args.weights, imgsz=args.imgsz, int8=args.int8, calibration_images=args.calib)
+    print(f"\n设置 DetectionConfig.detector_backend = \"onnxruntime\" 并将 onnx_model_path 指向 {model_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -29,6 +29,7 @@ def main():
         import traceback
         traceback.print_exc()
     finally:
+        controller.occupancy_subscriber.stop()
         print("系统已关闭")
         print("注意力记录:", controller.attention_records)
 
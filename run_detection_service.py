@@ -1,6 +1,11 @@
 """
 启动检测服务的主入口
 """
+import time
+
+_STARTED_AT = time.monotonic()
+
+import argparse
 import sys
 import os
 
@@ -8,21 +13,43 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.services.detection_service import DetectionService
+from src.utils.config import detection_config
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="展品检测服务")
+    parser.add_argument("--source", choices=["zed", "video", "images", "synthetic"],
+                        default=detection_config.frame_source, help="帧来源")
+    parser.add_argument("--path", default=detection_config.frame_source_path,
+                        help="视频文件路径，或图片目录/通配符（例如 'exhibit_detection/*.jpg'）")
+    parser.add_argument("--realtime", action="store_true", help="按帧率实时回放")
+    parser.add_argument("--adaptive", action="store_true", help="粗到细多尺度推理")
+    return parser.parse_args()
 
 
 def main():
     """主函数"""
+    args = parse_args()
+    detection_config.frame_source = args.source
+    detection_config.frame_source_path = args.path
+    detection_config.frame_source_realtime = args.realtime or detection_config.frame_source_realtime
+    detection_config.adaptive_inference = args.adaptive or detection_config.adaptive_inference
+    
     print("=" * 60)
     print("展品检测服务")
     print("=" * 60)
     print("\n正在初始化检测服务...")
+    print(f"  - 帧来源: {args.source}" + (f" ({args.path})" if args.path else ""))
     
-    service = DetectionService(num_exhibits=2)
+    service = DetectionService(num_exhibits=2, started_at=_STARTED_AT)
+    print(f"  - 导入及初始化耗时: {time.monotonic() - _STARTED_AT:.2f}s（模型在后台并行加载）")
     
     try:
         print("检测服务已启动")
         print(f"  - 展品占用检测端口: {service.network_config.detection_port}")
         print(f"  - 语音识别服务端口: {service.network_config.audio_port}")
+        print("  - 就绪探测: 向任一端口发送 'ready=1' 返回JSON就绪状态")
         print("\n按 Ctrl+C 停止服务\n")
         service.start_all_services()
     except KeyboardInterrupt:
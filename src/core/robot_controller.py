@@ -3,6 +3,7 @@
 NAO机器人的主控制逻辑，包括NAOMark检测、导航、交互等功能
 """
 import datetime
+import json
 import socket
 import string
 import threading
@@ -13,6 +14,9 @@ from naoqi import ALProxy
 import qi
 
 from ..utils.config import robot_config, network_config, exhibit_config
+from ..utils.occupancy_protocol import (
+    PROTOCOL_VERSION, OccupancyMessage, OccupancySubscriber, OccupancyTable, ProtocolError, read_message
+)
 from ..services import get_llm_service
 
 
@@ -34,7 +38,14 @@ class RobotController:
         self._initialize_proxies()
         
         # 状态变量
-        self.occupied_exhibits = ""
+        self.occupancy = OccupancyTable()
+        
+        # 后台订阅检测服务的占用推送，detect_naomark 只读取本地表
+        self.occupancy_subscriber = OccupancySubscriber(
+            network_config.host,
+            network_config.detection_port,
+            heartbeat=network_config.subscription_heartbeat
+        )
         self.detected_exhibit_ids: List[int] = []
         self.attention_records: List[List] = []
         
@@ -58,6 +69,29 @@ class RobotController:
         self.localization = ALProxy("ALLocalization", self.robot_ip, self.port)
         self.navigation = ALProxy("ALNavigation", self.robot_ip, self.port)
     
+    def is_exhibit_occupied(self, mark_id: int) -> bool:
+        """
+        查询展品是否被占用，订阅维护的本地占用表足够新时直接使用（不访问网络），
+        否则使用最近一次单次请求的结果
+        
+        Args:
+            mark_id: 展品标记ID
+        """
+        if self.occupancy_subscriber.is_fresh():
+            return self.occupancy_subscriber.is_occupied(mark_id)
+        return self.occupancy.is_occupied(mark_id)
+    
+    def expected_free_in(self, mark_id: int) -> float:
+        """
+        查询展品预计多少秒后空闲（根据检测服务对访客停留时间的估计），空闲展品为0
+        
+        Args:
+            mark_id: 展品标记ID
+        """
+        if self.occupancy_subscriber.is_fresh():
+            return self.occupancy_subscriber.expected_free_in(mark_id)
+        return self.occupancy.expected_free_in(mark_id)
+    
     def detect_naomark(self) -> Optional[Tuple[int, float, float, float, float]]:
         """
         检测NAOMark并返回展品信息
@@ -72,7 +106,8 @@ class RobotController:
         original_head_yaw = self.motionProxy.getAngles("HeadYaw", True)[0]
         head_yaw_positions = [-1.0, -0.75, -0.5, -0.25, 0.0, 0.25, 0.5, 0.75, 1.0]
         
-        first_candidate = None
+        # 扫描到的被占用展品，全部被占用时选择预计最先空闲的一个
+        candidates = {}
         
         for yaw in head_yaw_positions:
             self.motionProxy.setAngles("HeadYaw", yaw, 0.3)
@@ -96,16 +131,14 @@ class RobotController:
                 height = shape[4]
                 alpha = yaw
                 
-                # 记住第一个检测到的
-                if first_candidate is None:
-                    first_candidate = (mark_id, alpha, beta, width, height)
-                
-                idx = exhibit_config.total_exhibit_ids.index(mark_id)
-                occupied = self.occupied_exhibits[idx] == '1' if idx < len(self.occupied_exhibits) else False
+                occupied = self.is_exhibit_occupied(mark_id)
                 print(occupied, mark_id)
                 
                 if occupied:
-                    print(f"Exhibit {mark_id} is occupied; continuing scan.")
+                    if mark_id not in candidates:
+                        candidates[mark_id] = (mark_id, alpha, beta, width, height)
+                    print(f"Exhibit {mark_id} is occupied "
+                          f"(expected free in {self.expected_free_in(mark_id):.0f}s); continuing scan.")
                     continue  # 继续寻找空闲的
                 
                 # 找到空闲展品，立即前往
@@ -119,13 +152,14 @@ class RobotController:
                 self.motionProxy.setAngles("HeadYaw", original_head_yaw, 0.2)
                 return mark_id, alpha, beta, width, height
         
-        # 没有找到空闲展品，使用第一个候选
+        # 没有找到空闲展品，选择预计最先空闲的候选
         self.landMarkProxy.unsubscribe("Test_LandMark")
         self.motionProxy.setAngles("HeadYaw", original_head_yaw, 0.2)
         
-        if first_candidate:
-            mark_id, alpha, beta, width, height = first_candidate
-            self.tts.say("All exhibits seem occupied, but I'll take you to this one anyway.")
+        if candidates:
+            mark_id = min(candidates, key=self.expected_free_in)
+            mark_id, alpha, beta, width, height = candidates[mark_id]
+            self.tts.say("All exhibits seem occupied, but I'll take you to the one that should free up first.")
             self.detected_exhibit_ids.append(mark_id)
             return mark_id, alpha, beta, width, height
         
@@ -185,35 +219,91 @@ class RobotController:
         
         time.sleep(2)
     
-    def listen_for_exhibit_status(self) -> bytes:
+    def listen_for_exhibit_status(self, max_age: Optional[float] = None) -> Optional[OccupancyMessage]:
         """
-        监听展品状态（从检测服务获取）
+        监听展品状态（从检测服务获取），并更新本地占用表
+        
+        Args:
+            max_age: 可选，可接受的结果最大时长（秒），检测服务缓存过旧时会等待新结果
         
         Returns:
-            展品占用状态字节串
+            按展品标记ID组织的占用消息；检测服务不可用或暂无结果时返回None，
+            此时清空本地占用表（占用状态未知，按空闲处理），导览继续进行
         """
         self.tts.post.say("Let's see if any exhibits are empty...")
         s = socket.socket()
-        s.connect((network_config.host, network_config.detection_port))
-        ret = s.recv(1024)
-        print("[Metadata] Received:", ret)
-        s.close()
-        return ret
+        try:
+            s.connect((network_config.host, network_config.detection_port))
+            request = f"proto={PROTOCOL_VERSION}"
+            if max_age is not None:
+                request += f" max_age={max_age}"
+            s.sendall((request + "\n").encode('utf-8'))
+            message = read_message(s)
+        except (OSError, ProtocolError) as e:
+            print(f"[Metadata] Exhibit status unavailable: {e}")
+            self.occupancy = OccupancyTable()
+            return None
+        finally:
+            s.close()
+        if message.error is not None:
+            print(f"[Metadata] Exhibit status unavailable: {message.error}")
+            self.occupancy = OccupancyTable()
+            return None
+        self.occupancy.apply(message)
+        print("[Metadata] Received:", message.occupancy_string(exhibit_config.total_exhibit_ids))
+        return message
     
-    def listen_for_human_response(self) -> bytes:
+    def listen_for_human_response(self, on_partial=None) -> bytes:
         """
         监听人类响应（从语音识别服务获取）
         
+        启用 network_config.stream_transcripts 时请求流式结果：说话过程中收到部分识别结果，
+        访客说完时立即说 "Hmm, let me think..."，不必等待最终转写完成。
+        
+        Args:
+            on_partial: 可选，收到部分识别结果时以文字调用，可用于提前开始后续处理
+        
         Returns:
             转录的文本字节串
         """
         s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         s.connect((network_config.host, network_config.audio_port))
-        response = s.recv(1024)
-        print("[Dialogue] Response:", response)
-        self.tts.post.say("Hmm, let me think...")
-        s.close()
-        return response
+        try:
+            if not network_config.stream_transcripts:
+                response = s.recv(1024)
+                print("[Dialogue] Response:", response)
+                self.tts.post.say("Hmm, let me think...")
+                return response
+            
+            s.sendall(b"stream=1\n")
+            said_hmm = False
+            with s.makefile("rb") as stream:
+                for line in stream:
+                    try:
+                        event = json.loads(line.decode("utf-8"))
+                    except ValueError:
+                        event = None
+                    if not isinstance(event, dict) or "type" not in event:
+                        # 服务端未收到请求行（或为旧版本）时返回纯文本，整个响应即为最终结果
+                        response = line + stream.read()
+                        print("[Dialogue] Response:", response)
+                        if not said_hmm:
+                            self.tts.post.say("Hmm, let me think...")
+                        return response.strip()
+                    if event["type"] == "partial":
+                        print("[Dialogue] Partial:", event["text"])
+                        if on_partial is not None:
+                            on_partial(event["text"])
+                    elif event["type"] == "end" and not said_hmm:
+                        said_hmm = True
+                        self.tts.post.say("Hmm, let me think...")
+                    elif event["type"] == "final":
+                        print("[Dialogue] Response:", event["text"])
+                        return event["text"].encode("utf-8")
+            # 连接在最终结果之前关闭
+            return b""
+        finally:
+            s.close()
     
     def tracker_face(self):
         """
@@ -402,7 +492,11 @@ class RobotController:
             tokens = user_input.lower().split()
             tokens = [t.strip(string.punctuation) for t in tokens]
             
-            if "stop" in tokens:
+            if not user_input:
+                # 检测服务在等待时间内未检测到语音
+                self.tts.say("Sorry, I didn't catch that. Could you say it again?")
+                continue
+            elif "stop" in tokens:
                 end = True
                 break
             elif "move on" in user_input.lower():
@@ -441,12 +535,20 @@ class RobotController:
         time.sleep(2)
         self.set_home_position()
         
+        self.occupancy_subscriber.start()
+        
         self.tts.say("Hello and welcome to my museum! Allow me to show you around!")
         self.motionProxy.wakeUp()
         
         while True:
-            # 获取展品状态
-            self.occupied_exhibits = self.listen_for_exhibit_status().decode('utf-8')
+            # 获取展品状态：订阅的本地占用表足够新时直接使用，否则（如检测服务中断）单次请求
+            if self.occupancy_subscriber.is_fresh():
+                print(f"[Metadata] Using subscribed occupancy ({self.occupancy_subscriber.age:.1f}s old)")
+            else:
+                if self.occupancy_subscriber.has_data:
+                    print(f"[Metadata] Subscribed occupancy is stale "
+                          f"({self.occupancy_subscriber.age:.1f}s old), requesting status")
+                self.listen_for_exhibit_status()
             
             # 检测NAOMark
             result = self.detect_naomark()
@@ -484,6 +586,7 @@ def main():
     except KeyboardInterrupt:
         print("\nShutting down robot controller...")
     finally:
+        controller.occupancy_subscriber.stop()
         print(controller.attention_records)
 
 
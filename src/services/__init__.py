@@ -1,16 +1,26 @@
 """
 服务模块
 包含各种外部服务集成
+
+各服务按需导入（PEP 562 模块级 __getattr__），避免只使用检测服务时也加载
+whisper、torch 等重量级依赖
 """
-from .llm_service import LLMService, get_llm_service
-from .speech_service import SpeechRecognitionService, get_speech_service
-from .detection_service import DetectionService
+import importlib
+
+_EXPORTS = {
+    'LLMService': '.llm_service',
+    'get_llm_service': '.llm_service',
+    'SpeechRecognitionService': '.speech_service',
+    'get_speech_service': '.speech_service',
+    'DetectionService': '.detection_service'
+}
+
+__all__ = list(_EXPORTS)
 
-__all__ = [
-    'LLMService',
-    'get_llm_service',
-    'SpeechRecognitionService',
-    'get_speech_service',
-    'DetectionService'
-]
 
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
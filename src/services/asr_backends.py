@@ -0,0 +1,99 @@
+"""
+语音识别后端模块
+提供 openai-whisper（PyTorch）和 faster-whisper（CTranslate2，CPU上可用int8量化）两种后端，
+均接受音频文件路径或 16kHz 单声道 float32 数组，返回完整转录文字
+"""
+# 两种后端的模型输入采样率
+MODEL_SAMPLE_RATE = 16000
+
+
+class AsrBackend:
+    """语音识别后端基类"""
+
+    def transcribe(self, audio) -> str:
+        """
+        转写音频
+
+        Args:
+            audio: 音频文件路径，或 16kHz 单声道 float32 数组
+
+        Returns:
+            转录的文字
+        """
+        raise NotImplementedError
+
+    def warmup(self):
+        """对一秒静音做一次转写，完成推理引擎的初始化"""
+        import numpy as np
+
+        self.transcribe(np.zeros(MODEL_SAMPLE_RATE, dtype=np.float32))
+
+
+class WhisperBackend(AsrBackend):
+    """openai-whisper 后端"""
+
+    def __init__(self, model_name: str, language: str, device: str = "auto", beam_size: int = 1):
+        """
+        Args:
+            model_name: 模型大小（tiny/base/small/...）
+            language: 语言代码
+            device: "auto"（有CUDA时用GPU）、"cpu" 或 "cuda"
+            beam_size: 束搜索宽度，1为贪心解码（whisper默认）
+        """
+        import torch
+        import whisper
+
+        if device == "auto":
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        print(f"Loading Whisper model {model_name} on {device}...")
+        self.model = whisper.load_model(model_name, device=device)
+        self.language = language
+        self.options = {"beam_size": beam_size} if beam_size > 1 else {}
+
+    def transcribe(self, audio) -> str:
+        return self.model.transcribe(audio, language=self.language, **self.options)["text"]
+
+
+class FasterWhisperBackend(AsrBackend):
+    """faster-whisper（CTranslate2）后端"""
+
+    def __init__(self, model_name: str, language: str, device: str = "auto", compute_type: str = "int8",
+                 cpu_threads: int = 0, beam_size: int = 1):
+        """
+        Args:
+            model_name: 模型大小（tiny/base/small/...）或已转换的CTranslate2模型目录
+            language: 语言代码
+            device: "auto"、"cpu" 或 "cuda"
+            compute_type: 计算精度，如 "int8"、"int8_float16"、"float16"、"float32"
+            cpu_threads: CPU推理线程数，0表示使用CTranslate2默认值
+            beam_size: 束搜索宽度
+        """
+        from faster_whisper import WhisperModel
+
+        print(f"Loading faster-whisper model {model_name} ({compute_type}) on {device}...")
+        self.model = WhisperModel(model_name, device=device, compute_type=compute_type,
+                                  cpu_threads=cpu_threads)
+        self.language = language
+        self.beam_size = beam_size
+
+    def transcribe(self, audio) -> str:
+        # segments 是惰性生成器，遍历时才真正解码；拼接方式与 openai-whisper 的 result["text"] 一致
+        segments, _ = self.model.transcribe(audio, language=self.language, beam_size=self.beam_size)
+        return "".join(segment.text for segment in segments)
+
+
+def create_asr_backend(config) -> AsrBackend:
+    """
+    根据语音配置创建语音识别后端
+
+    Args:
+        config: SpeechConfig 对象，使用其中 whisper_model、language 和 asr_* 字段
+    """
+    if config.asr_backend == "whisper":
+        return WhisperBackend(config.whisper_model, config.language, device=config.asr_device,
+                              beam_size=config.asr_beam_size)
+    if config.asr_backend == "faster-whisper":
+        return FasterWhisperBackend(config.whisper_model, config.language, device=config.asr_device,
+                                    compute_type=config.asr_compute_type,
+                                    cpu_threads=config.asr_cpu_threads, beam_size=config.asr_beam_size)
+    raise ValueError(f"Unknown ASR backend: {config.asr_backend}")
@@ -0,0 +1,226 @@
+"""
+单相机检测流水线模块
+封装一路相机从取帧、运动门控、人员检测、区域分配到占用平滑的完整流程，
+既可在检测服务进程内运行，也可在多相机模式下运行于独立的工作进程中
+"""
+import os
+import time
+import numpy as np
+from typing import Dict, Optional, Sequence, Tuple
+from ..utils.occupancy_protocol import ExhibitStatus
+from .debug_snapshots import DebugSnapshotWriter
+from .exhibit_regions import ExhibitRegions
+from .frame_sources import FrameSource, create_frame_source
+from .motion_gate import MotionGate
+from .occupancy_heatmap import OccupancyHeatmap
+from .occupancy_smoother import OccupancySmoother
+from .person_detector import PersonDetector, create_person_detector
+from .person_tracker import ExhibitDwell, PersonTracker
+
+
+class CameraPipeline:
+    """单相机展品占用检测流水线"""
+
+    def __init__(self, exhibit_ids: Sequence[int], config, frame_source: Optional[FrameSource] = None,
+                 detector: Optional[PersonDetector] = None):
+        """
+        初始化流水线
+
+        Args:
+            exhibit_ids: 本相机负责的展品标记ID列表
+            config: 检测配置对象（DetectionConfig）
+            frame_source: 帧来源，默认根据 config.frame_source 创建
+            detector: 人员检测器，默认根据 config.detector_backend 创建
+        """
+        self.config = config
+        self.exhibit_ids = list(exhibit_ids)
+        if self.config.depth_filtering:
+            self.regions = ExhibitRegions.from_config(
+                self.exhibit_ids, self.config.exhibit_regions,
+                depth_bands=self.config.exhibit_depth_bands,
+                default_depth_band=self.config.default_depth_band
+            )
+        else:
+            self.regions = ExhibitRegions.from_config(self.exhibit_ids, self.config.exhibit_regions)
+
+        # 逐展品的时间平滑与滞回，发布的占用结果来自平滑后的状态
+        self.smoother = OccupancySmoother(
+            num_regions=len(self.regions),
+            window=self.config.smoothing_window,
+            enter_threshold=self.config.occupancy_enter_threshold,
+            exit_threshold=self.config.occupancy_exit_threshold,
+            min_hold=self.config.occupancy_min_hold
+        )
+
+        # 跨帧跟踪人员并统计各展品的停留时间
+        self.tracker = PersonTracker(
+            iou_threshold=self.config.tracker_iou_threshold,
+            max_age=self.config.tracker_max_age,
+            distance_threshold=self.config.tracker_distance_threshold
+        )
+        self.dwell = ExhibitDwell(
+            num_regions=len(self.regions),
+            prior=self.config.dwell_prior,
+            history=self.config.dwell_history,
+            min_sample=self.config.dwell_min_sample
+        )
+
+        # 运动门控：画面未变化时复用上次推理得到的各区域置信度
+        self.motion_gate: Optional[MotionGate] = None
+        if self.config.motion_gating:
+            self.motion_gate = MotionGate(
+                self.regions,
+                width=self.config.motion_downscale_width,
+                pixel_threshold=self.config.motion_pixel_threshold,
+                changed_fraction=self.config.motion_changed_fraction,
+                refresh_interval=self.config.motion_refresh_interval
+            )
+        self._region_conf = np.zeros(len(self.regions), dtype=np.float32)
+        self._region_counts = np.zeros(len(self.regions), dtype=np.intp)
+        self._boxes = np.zeros((0, 4), dtype=np.float32)
+        self._confidences = np.zeros(0, dtype=np.float32)
+        self._points = np.zeros((0, 2), dtype=np.float32)
+        self._last_timestamp: Optional[float] = None
+        self.stats = {"frames": 0, "inferences": 0, "skipped_inferences": 0, "depth_rejected": 0}
+
+        # 访客落脚点热力图，累积的是人·秒
+        self.heatmap: Optional[OccupancyHeatmap] = None
+        self._last_checkpoint = time.time()
+        if self.config.heatmap_enabled:
+            self.heatmap = OccupancyHeatmap(
+                width=self.config.heatmap_width,
+                height=self.config.heatmap_height,
+                half_life=self.config.heatmap_half_life
+            )
+            if os.path.exists(self.config.heatmap_path):
+                self.heatmap.restore(self.config.heatmap_path)
+
+        # 调试快照在后台线程中采样写入，不阻塞检测
+        self.snapshot_writer: Optional[DebugSnapshotWriter] = None
+        if self.config.save_debug_images:
+            self.snapshot_writer = DebugSnapshotWriter(
+                self.regions,
+                root_dir=self.config.debug_snapshot_dir,
+                sample_interval=self.config.debug_snapshot_interval,
+                on_change=self.config.debug_snapshot_on_change,
+                queue_size=self.config.debug_snapshot_queue_size,
+                dir_snapshots=self.config.debug_snapshot_dir_snapshots,
+                max_bytes=int(self.config.debug_snapshot_max_mb * 1024 * 1024)
+            )
+
+        # 初始化帧来源
+        self.frame_source = frame_source or create_frame_source(self.config)
+
+        # 初始化人员检测后端（ultralytics 或 ONNX Runtime）
+        self.detector = detector or create_person_detector(self.config)
+
+    def process_frame(self) -> Optional[Tuple[float, Dict[int, ExhibitStatus]]]:
+        """
+        读取一帧并更新各展品的占用状态
+
+        整帧以内存中的NumPy数组直接送入模型，只做一次仅限人员类别的推理，
+        再按人员落脚点将结果分配到各展品区域（见 config.exhibit_regions），
+        启用深度过滤时剔除距离不在展品距离范围内的人员，
+        最后经 OccupancySmoother 平滑后得到占用状态。启用运动门控时，
+        若所有区域自上次推理以来均无明显变化则跳过推理、复用上次结果；
+        仅当 config.save_debug_images 为True时才按采样规则提交调试快照（异步写入）。
+
+        Returns:
+            (帧时间戳, {mark_id: ExhibitStatus}) 元组，其中占用状态为平滑后的结果，
+            人数和最大置信度为本帧结果，停留时间和预计剩余时间来自人员跟踪；取帧失败时返回None
+        """
+        frame = self.frame_source.read()
+        if frame is None:
+            return None
+
+        timestamp = time.time()
+        self.stats["frames"] += 1
+
+        if self.motion_gate is None or self.motion_gate.changed_regions(frame, timestamp).any():
+            # 整帧只做一次推理，再把人员框分配到各展品区域
+            self._boxes, self._confidences = self.detector.detect(frame)
+            self._points = self.regions.anchor_points(self._boxes, frame.shape)
+            membership = self.regions.contains(self._points)
+            if self.config.depth_filtering and self.frame_source.depth is not None:
+                # 剔除不在展品距离范围内的人员（如远处路过的行人）
+                depths = ExhibitRegions.box_depths(
+                    self.frame_source.depth, self._boxes, samples=self.config.depth_samples
+                )
+                filtered = self.regions.filter_by_depth(membership, depths)
+                self.stats["depth_rejected"] += int(np.count_nonzero(membership.any(axis=1) & ~filtered.any(axis=1)))
+                membership = filtered
+            self._region_conf = np.where(
+                membership, self._confidences[:, None], 0.0
+            ).max(axis=0, initial=0.0)
+            self._region_counts = np.count_nonzero(membership, axis=0)
+            track_ids, removed_ids = self.tracker.update(self._boxes, timestamp)
+            self.dwell.update(track_ids, membership, removed_ids, timestamp)
+            self.stats["inferences"] += 1
+            if self.motion_gate is not None:
+                self.motion_gate.mark_inferred(timestamp)
+        else:
+            # 所有区域均无变化，复用上次结果，轨迹视为仍然可见
+            self.tracker.touch(timestamp)
+            self.stats["skipped_inferences"] += 1
+
+        occupied = self.smoother.update(self._region_conf, timestamp)
+        dwell, remaining = self.dwell.summary(timestamp)
+        if self.heatmap is not None:
+            self._update_heatmap(timestamp)
+        if self.snapshot_writer is not None:
+            self.snapshot_writer.submit(frame, timestamp, self._boxes, self._confidences, occupied)
+        return timestamp, {
+            mark_id: ExhibitStatus(
+                bool(occupied[i]), int(self._region_counts[i]), float(self._region_conf[i]),
+                float(dwell[i]), float(remaining[i])
+            )
+            for i, mark_id in enumerate(self.exhibit_ids)
+        }
+
+    def _update_heatmap(self, timestamp: float):
+        """
+        把当前人员位置按距上一帧的时长（最多1秒）累加到热力图，并按需保存检查点；
+        跳过推理的帧沿用上次推理得到的位置
+        """
+        dt = 0.0 if self._last_timestamp is None else min(timestamp - self._last_timestamp, 1.0)
+        self._last_timestamp = timestamp
+        self.heatmap.add_points(self._points, timestamp, weight=dt)
+
+        if timestamp - self._last_checkpoint >= self.config.heatmap_checkpoint_interval:
+            self.save_heatmap(timestamp)
+
+    def save_heatmap(self, timestamp: Optional[float] = None):
+        """保存热力图检查点到 config.heatmap_path"""
+        if self.heatmap is None:
+            return
+        try:
+            self.heatmap.save(self.config.heatmap_path, timestamp)
+            self._last_checkpoint = time.time() if timestamp is None else timestamp
+        except OSError as e:
+            print(f"Error saving heatmap checkpoint: {e}")
+
+    def get_counts(self) -> Dict[int, int]:
+        """各展品最近一次推理得到的人数"""
+        return {mark_id: int(self._region_counts[i]) for i, mark_id in enumerate(self.exhibit_ids)}
+
+    def get_heatmap(self) -> Optional[np.ndarray]:
+        """当前热力图，未启用时返回None"""
+        return self.heatmap.snapshot() if self.heatmap is not None else None
+
+    def get_stats(self) -> dict:
+        """
+        获取检测统计信息
+
+        Returns:
+            包含帧数、推理次数、跳过推理次数及跳过比例的字典
+        """
+        stats = dict(self.stats)
+        stats["skip_ratio"] = stats["skipped_inferences"] / stats["frames"] if stats["frames"] else 0.0
+        return stats
+
+    def close(self):
+        """保存热力图、写完调试快照并关闭帧来源"""
+        self.save_heatmap()
+        if self.snapshot_writer is not None:
+            self.snapshot_writer.close()
+        self.frame_source.close()
@@ -0,0 +1,232 @@
+"""
+多相机工作进程池模块
+每路相机在独立进程中运行各自的取帧与推理流水线，避免GIL成为瓶颈；
+各进程的结果通过队列汇总，由检测服务合并为按展品ID组织的全局占用表
+"""
+import dataclasses
+import multiprocessing as mp
+import os
+import queue
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from ..utils.occupancy_protocol import ExhibitStatus
+from .occupancy_heatmap import OccupancyHeatmap
+
+
+def camera_config(base_config, camera: dict, index: int):
+    """
+    生成单路相机的检测配置
+
+    Args:
+        base_config: 全局 DetectionConfig
+        camera: 该相机覆盖的配置字段，必须包含 exhibit_regions
+        index: 相机序号，用于区分各相机的热力图文件和调试快照目录
+    """
+    if not camera.get("exhibit_regions"):
+        raise ValueError(f"Camera {camera!r} must define exhibit_regions")
+    overrides = dict(camera, cameras=None)
+    if "heatmap_path" not in camera:
+        stem, ext = os.path.splitext(base_config.heatmap_path)
+        overrides["heatmap_path"] = f"{stem}_cam{index}{ext}"
+    if "debug_snapshot_dir" not in camera:
+        overrides["debug_snapshot_dir"] = os.path.join(base_config.debug_snapshot_dir, f"cam{index}")
+    return dataclasses.replace(base_config, **overrides)
+
+
+def merge_statuses(results: List[Dict[int, ExhibitStatus]]) -> Dict[int, ExhibitStatus]:
+    """
+    合并多路相机的展品状态：同一展品被多路相机覆盖时，任一相机判定占用即为占用，
+    人数、置信度、停留时间和预计剩余时间取最大值（避免同一人被重复计数）
+    """
+    merged: Dict[int, ExhibitStatus] = {}
+    for statuses in results:
+        for mark_id, status in statuses.items():
+            current = merged.get(mark_id)
+            if current is None:
+                merged[mark_id] = dataclasses.replace(status)
+            else:
+                current.occupied = current.occupied or status.occupied
+                current.count = max(current.count, status.count)
+                current.max_conf = max(current.max_conf, status.max_conf)
+                current.dwell = max(current.dwell, status.dwell)
+                current.remaining = max(current.remaining, status.remaining)
+    return merged
+
+
+def _camera_worker(index: int, config, results: mp.Queue, stop_event, threads: int):
+    """
+    工作进程入口：循环运行单相机流水线，把结果放入队列
+
+    队列满时（例如没有后台检测循环在消费结果）先移除最旧的结果再放入新结果，
+    队列中始终保留最近的结果，单次请求不会读到过期的检测结果
+    """
+    if threads > 0:
+        import cv2
+        cv2.setNumThreads(threads)
+        if config.detector_backend == "ultralytics":
+            import torch
+            torch.set_num_threads(threads)
+        elif config.onnx_intra_op_threads <= 0:
+            config = dataclasses.replace(config, onnx_intra_op_threads=threads)
+
+    from .camera_pipeline import CameraPipeline
+
+    exhibit_ids = list(config.exhibit_regions)
+    pipeline = CameraPipeline(exhibit_ids, config)
+    print(f"[Camera {index}] Worker {os.getpid()} ready for exhibits {exhibit_ids}")
+    try:
+        while not stop_event.is_set():
+            started = time.monotonic()
+            try:
+                result = pipeline.process_frame()
+            except Exception as e:
+                print(f"[Camera {index}] An error occurred during detection: {e}")
+                result = None
+            if result is not None:
+                timestamp, statuses = result
+                _put_latest(results, (index, timestamp, statuses, pipeline.get_stats()))
+            elapsed = time.monotonic() - started
+            stop_event.wait(max(0.0, config.detection_interval - elapsed))
+    finally:
+        pipeline.close()
+
+
+def _put_latest(results: mp.Queue, item):
+    """放入结果；队列已满时丢弃最旧的结果而不是新结果"""
+    for _ in range(2):
+        try:
+            results.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                results.get_nowait()
+            except queue.Empty:
+                pass
+
+
+class CameraWorkerPool:
+    """多相机工作进程池"""
+
+    def __init__(self, config):
+        """
+        Args:
+            config: 全局 DetectionConfig，其中 cameras 列出每路相机的配置覆盖
+        """
+        self.configs = [camera_config(config, camera, i) for i, camera in enumerate(config.cameras)]
+        self.exhibit_ids = []
+        for camera in self.configs:
+            self.exhibit_ids.extend(m for m in camera.exhibit_regions if m not in self.exhibit_ids)
+
+        # spawn 方式启动，避免子进程继承父进程中的相机句柄和推理线程状态
+        self._context = mp.get_context("spawn")
+        self._results = self._context.Queue(maxsize=len(self.configs) * 4)
+        self._stop_event = self._context.Event()
+        self._processes: List[mp.Process] = []
+        self._threads = max(1, (os.cpu_count() or 1) // len(self.configs))
+        # 已退出的工作进程 {相机序号: 发现退出的时刻（time.monotonic()）}
+        self._exited: Dict[int, float] = {}
+        self._latest: Dict[int, Tuple[float, Dict[int, ExhibitStatus]]] = {}
+        self.stats: Dict[int, dict] = {}
+
+    def _start_worker(self, index: int) -> mp.Process:
+        process = self._context.Process(
+            target=_camera_worker,
+            args=(index, self.configs[index], self._results, self._stop_event, self._threads),
+            name=f"camera-{index}",
+            daemon=True
+        )
+        process.start()
+        return process
+
+    def start(self):
+        """启动所有相机工作进程"""
+        if self._processes:
+            return
+        self._processes = [self._start_worker(index) for index in range(len(self.configs))]
+
+    def _check_workers(self):
+        """丢弃已退出的工作进程的结果，并在 config.camera_restart_delay 秒后重启该进程"""
+        now = time.monotonic()
+        for index, process in enumerate(self._processes):
+            if process.is_alive():
+                continue
+            if index not in self._exited:
+                print(f"[Camera {index}] Worker exited with code {process.exitcode}, "
+                      f"its exhibits are reported as free")
+                self._exited[index] = now
+                self._latest.pop(index, None)
+                self.stats.pop(index, None)
+            elif now - self._exited[index] >= self.configs[index].camera_restart_delay:
+                print(f"[Camera {index}] Restarting worker")
+                del self._exited[index]
+                self._processes[index] = self._start_worker(index)
+
+    def _drop_stale(self, now: float):
+        """丢弃超过 camera_stale_intervals 个检测周期未更新的相机结果（取帧持续失败等）"""
+        for index in list(self._latest):
+            config = self.configs[index]
+            if now - self._latest[index][0] > config.detection_interval * config.camera_stale_intervals:
+                print(f"[Camera {index}] No result for {now - self._latest[index][0]:.1f}s, "
+                      f"its exhibits are reported as free")
+                del self._latest[index]
+
+    def next_result(self, timeout: float = 1.0) -> Optional[Tuple[float, Dict[int, ExhibitStatus]]]:
+        """
+        等待任一相机的下一个结果，并取出队列中积压的全部结果，每路相机只保留时间戳最新的一个，
+        再与其他相机的最新结果合并
+
+        已退出的工作进程和长时间没有新结果的相机不参与合并，其负责的展品按空闲上报；
+        时间戳取参与合并的结果中最旧的一个，客户端据此判断数据是否过期。
+
+        Returns:
+            (合并结果的时间戳, 全局展品状态) 元组，超时或没有可用的相机结果时返回None
+        """
+        self._check_workers()
+        try:
+            items = [self._results.get(timeout=timeout)]
+        except queue.Empty:
+            return None
+        while True:
+            try:
+                items.append(self._results.get_nowait())
+            except queue.Empty:
+                break
+
+        for index, timestamp, statuses, stats in items:
+            latest = self._latest.get(index)
+            if latest is None or timestamp >= latest[0]:
+                self._latest[index] = (timestamp, statuses)
+                self.stats[index] = stats
+
+        self._drop_stale(time.time())
+        if not self._latest:
+            return None
+        timestamp = min(timestamp for timestamp, _ in self._latest.values())
+        merged = merge_statuses([statuses for _, statuses in self._latest.values()])
+        for mark_id in self.exhibit_ids:
+            merged.setdefault(mark_id, ExhibitStatus(False))
+        return timestamp, merged
+
+    def load_heatmap(self, index: int) -> Optional[np.ndarray]:
+        """
+        读取某路相机最近一次保存的热力图检查点（热力图在工作进程中累积）
+
+        Returns:
+            热力图数组，尚无检查点时返回None
+        """
+        path = self.configs[index].heatmap_path
+        if not os.path.exists(path):
+            return None
+        heatmap, _ = OccupancyHeatmap.load_checkpoint(path)
+        return heatmap
+
+    def stop(self):
+        """停止所有工作进程"""
+        self._stop_event.set()
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        self._exited.clear()
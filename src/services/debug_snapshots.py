@@ -0,0 +1,187 @@
+"""
+调试快照模块
+在后台线程中按采样间隔或占用变化保存带人员框和展品区域标注的图像，
+写入按数量轮换的目录并限制总占用空间，不阻塞检测热路径
+"""
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import deque
+from typing import Optional
+import cv2
+import numpy as np
+from .exhibit_regions import ExhibitRegions
+
+# 标注颜色（BGR）
+_BOX_COLOR = (0, 255, 255)
+_FREE_COLOR = (0, 200, 0)
+_OCCUPIED_COLOR = (0, 0, 255)
+
+
+class DebugSnapshotWriter:
+    """
+    异步调试快照写入器
+
+    submit() 只做采样判断和一次帧拷贝，标注、JPEG编码和写盘都在后台线程完成；
+    队列已满时直接丢弃该帧。
+    """
+
+    def __init__(self, regions: ExhibitRegions, root_dir: str, sample_interval: float = 5.0,
+                 on_change: bool = False, queue_size: int = 4, dir_snapshots: int = 100,
+                 max_bytes: int = 200 * 1024 * 1024, jpeg_quality: int = 85):
+        """
+        Args:
+            regions: 展品区域，用于绘制区域轮廓和裁剪各展品图像
+            root_dir: 快照根目录，其下按轮换创建子目录
+            sample_interval: 两次快照之间的最小间隔（秒），0表示每帧都保存
+            on_change: 为True时只在展品占用状态变化时保存
+            queue_size: 待写入队列长度
+            dir_snapshots: 每个子目录最多保存的快照数，超过后轮换到新目录
+            max_bytes: 所有快照目录的总大小上限（字节），超出时删除最旧的目录
+            jpeg_quality: JPEG编码质量
+        """
+        self.regions = regions
+        self.root_dir = root_dir
+        self.sample_interval = sample_interval
+        self.on_change = on_change
+        self.dir_snapshots = dir_snapshots
+        self.max_bytes = max_bytes
+        self.jpeg_quality = jpeg_quality
+        self.stats = {"submitted": 0, "dropped": 0, "written": 0}
+
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._last_sample: Optional[float] = None
+        self._last_occupied: Optional[np.ndarray] = None
+
+        # 已有快照目录及其大小（从旧到新），用于按总大小淘汰
+        os.makedirs(self.root_dir, exist_ok=True)
+        self._dirs = deque(
+            (path, self._dir_size(path))
+            for path in sorted(
+                entry.path for entry in os.scandir(self.root_dir) if entry.is_dir()
+            )
+        )
+        self._total_bytes = sum(size for _, size in self._dirs)
+        self._current_dir: Optional[str] = None
+        self._current_count = 0
+
+        self._thread = threading.Thread(target=self._run, name="debug-snapshots", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _dir_size(path: str) -> int:
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+    def submit(self, frame: np.ndarray, timestamp: float, boxes_xyxy: np.ndarray,
+               confidences: np.ndarray, occupied: np.ndarray) -> bool:
+        """
+        提交一帧，按采样规则决定是否保存
+
+        Args:
+            frame: BGR图像（帧来源可能复用缓冲区，需要保存时会拷贝）
+            timestamp: 帧时间戳（秒）
+            boxes_xyxy: 像素坐标人员框 (N, 4)
+            confidences: 人员置信度 (N,)
+            occupied: 各展品的平滑后占用状态 (R,)
+
+        Returns:
+            是否已加入写入队列
+        """
+        # 只有成功入队后才更新上次状态和采样时刻，队列满时被丢弃的状态变化会在下一帧重试
+        changed = self._last_occupied is None or not np.array_equal(occupied, self._last_occupied)
+        if self.on_change:
+            if not changed:
+                return False
+        elif self._last_sample is not None and timestamp - self._last_sample < self.sample_interval:
+            return False
+
+        self.stats["submitted"] += 1
+        try:
+            self._queue.put_nowait(
+                (frame.copy(), timestamp, boxes_xyxy.copy(), confidences.copy(), occupied.copy())
+            )
+        except queue.Full:
+            self.stats["dropped"] += 1
+            return False
+        self._last_occupied = occupied.copy()
+        self._last_sample = timestamp
+        return True
+
+    def close(self, timeout: float = 5.0):
+        """写完队列中剩余的快照后停止后台线程"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self._write(*item)
+            except (OSError, cv2.error) as e:
+                print(f"Error writing debug snapshot: {e}")
+
+    def _annotate(self, frame: np.ndarray, boxes_xyxy: np.ndarray, confidences: np.ndarray,
+                  occupied: np.ndarray) -> np.ndarray:
+        """在帧上绘制展品区域（占用为红色，空闲为绿色）和人员框"""
+        height, width = frame.shape[:2]
+        scale = np.array([width, height], dtype=np.float32)
+        for i, polygon in enumerate(self.regions.polygons):
+            color = _OCCUPIED_COLOR if occupied[i] else _FREE_COLOR
+            points = (polygon * scale).astype(np.int32)
+            cv2.polylines(frame, [points], True, color, 2)
+            cv2.putText(frame, str(self.regions.exhibit_ids[i]), tuple(int(v) for v in points[0]),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+        for (x1, y1, x2, y2), conf in zip(boxes_xyxy.astype(int), confidences):
+            cv2.rectangle(frame, (x1, y1), (x2, y2), _BOX_COLOR, 2)
+            cv2.putText(frame, f"{conf:.2f}", (x1, max(y1 - 4, 12)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, _BOX_COLOR, 1)
+        return frame
+
+    def _target_dir(self) -> str:
+        """返回当前写入目录，写满后轮换到新目录"""
+        if self._current_dir is None or self._current_count >= self.dir_snapshots:
+            name = time.strftime("%Y%m%d-%H%M%S") + f"-{len(self._dirs):04d}"
+            self._current_dir = os.path.join(self.root_dir, name)
+            os.makedirs(self._current_dir, exist_ok=True)
+            self._dirs.append((self._current_dir, 0))
+            self._current_count = 0
+        return self._current_dir
+
+    def _write(self, frame: np.ndarray, timestamp: float, boxes_xyxy: np.ndarray,
+               confidences: np.ndarray, occupied: np.ndarray):
+        """标注并保存完整图像及各展品区域图像"""
+        annotated = self._annotate(frame, boxes_xyxy, confidences, occupied)
+        directory = self._target_dir()
+        stem = time.strftime("%H%M%S", time.localtime(timestamp)) + f"{timestamp % 1:.3f}"[1:]
+
+        images = {f"{stem}_full.jpg": annotated}
+        for mark_id, (x1, y1, x2, y2) in zip(self.regions.exhibit_ids, self.regions.pixel_bounds(frame.shape)):
+            images[f"{stem}_exhibit_{mark_id}.jpg"] = annotated[y1:y2, x1:x2]
+
+        written = 0
+        for filename, image in images.items():
+            ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if not ok:
+                continue
+            with open(os.path.join(directory, filename), "wb") as f:
+                f.write(encoded.tobytes())
+            written += len(encoded)
+
+        path, size = self._dirs[-1]
+        self._dirs[-1] = (path, size + written)
+        self._total_bytes += written
+        self._current_count += 1
+        self.stats["written"] += 1
+        self._enforce_size_cap()
+
+    def _enforce_size_cap(self):
+        """删除最旧的目录直到总大小不超过上限（保留当前目录）"""
+        while self._total_bytes > self.max_bytes and len(self._dirs) > 1:
+            path, size = self._dirs.popleft()
+            shutil.rmtree(path, ignore_errors=True)
+            self._total_bytes -= size
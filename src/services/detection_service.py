@@ -2,198 +2,731 @@
 检测服务模块
 提供展品占用检测功能，使用ZED相机和YOLO模型进行人员检测
 """
-import socket
+import asyncio
+import json
+import signal
 import threading
-import cv2
+import time
+from collections import deque
 import numpy as np
-import pyzed.sl as sl
-from datetime import datetime
-from typing import Optional
-from ultralytics import YOLO
-from ..utils.config import network_config, detection_config
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from ..utils.config import network_config, detection_config, exhibit_config
+from ..utils.occupancy_protocol import OccupancyMessage, encode_message, make_delta
 from .speech_service import get_speech_service
 
+if TYPE_CHECKING:
+    # 流水线和帧来源会导入 cv2，在预热线程中才真正导入，不拖慢服务启动
+    from .camera_pipeline import CameraPipeline
+    from .camera_workers import CameraWorkerPool
+    from .frame_sources import FrameSource
+
 
 class DetectionService:
     """展品占用检测服务"""
     
-    def __init__(self, num_exhibits: int = 2, config=None, network_config_obj=None):
+    def __init__(self, num_exhibits: int = 2, config=None, network_config_obj=None,
+                 exhibit_ids: Optional[List[int]] = None, frame_source: Optional["FrameSource"] = None,
+                 started_at: Optional[float] = None):
         """
         初始化检测服务
+
+        相机和模型不在此处加载，而是由 start_warmup() 在后台并行加载，
+        未预热时在首次检测时加载。
         
         Args:
             num_exhibits: 展品数量
             config: 检测配置对象
             network_config_obj: 网络配置对象
+            exhibit_ids: 展品标记ID列表，默认使用 exhibit_config.total_exhibit_ids
+            frame_source: 帧来源，默认根据 config.frame_source 创建（ZED相机）；多相机模式下忽略
+            started_at: 进程启动时刻（time.monotonic()），用于统计启动到就绪的耗时，默认为当前时刻
         """
+        self._started_at = started_at if started_at is not None else time.monotonic()
         self.num_exhibits = num_exhibits
         self.config = config or detection_config
         self.network_config = network_config_obj or network_config
         
-        # 初始化ZED相机
-        self.zed = sl.Camera()
-        self._init_zed_camera()
+        # 展品区域，占用结果按 exhibit_ids 的顺序输出
+        self.exhibit_ids = list(exhibit_ids if exhibit_ids is not None else exhibit_config.total_exhibit_ids)
+        if len(self.exhibit_ids) != num_exhibits:
+            raise ValueError(
+                f"num_exhibits ({num_exhibits}) does not match exhibit IDs {self.exhibit_ids}"
+            )
+        
+        # 多相机模式下每路相机运行于独立的工作进程，否则在本进程内运行单相机流水线（延迟创建）
+        self.pipeline: Optional["CameraPipeline"] = None
+        self.camera_pool: Optional["CameraWorkerPool"] = None
+        self._frame_source = frame_source
+        if self.config.cameras:
+            from .camera_workers import CameraWorkerPool
+            
+            self.camera_pool = CameraWorkerPool(self.config)
+            missing = [m for m in self.exhibit_ids if m not in self.camera_pool.exhibit_ids]
+            if missing:
+                raise ValueError(f"No camera covers exhibit IDs: {missing}")
+        
+        # 同一时刻只允许一个线程访问相机和模型
+        self._capture_lock = threading.Lock()
+        self._pipeline_lock = threading.Lock()
+        
+        # 模型就绪状态：{"detection"/"speech": 从启动到就绪的耗时（秒）}
+        self.ready_times: Dict[str, float] = {}
+        self._ready_lock = threading.Lock()
         
-        # 初始化YOLO模型
-        self.model = YOLO(self.config.yolo_model_path)
+        # 后台检测循环及最新占用结果缓存
+        self._occupancy_cond = threading.Condition()
+        self._latest_message: Optional[OccupancyMessage] = None
+        self._message_history = deque(maxlen=self.config.message_history)
+        self._seq = 0
+        self._stop_event = threading.Event()
+        self._detection_thread: Optional[threading.Thread] = None
         
-        # 创建图像存储对象
-        self.image = sl.Mat()
-        self.runtime_parameters = sl.RuntimeParameters()
+        # asyncio服务器状态，在 serve() 中初始化
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._shutdown_event: Optional[asyncio.Event] = None
+        self._detection_executor: Optional[ThreadPoolExecutor] = None
+        self._audio_executor: Optional[ThreadPoolExecutor] = None
+        self._connection_tasks = set()
+        self._subscription_tasks = set()
+        self._subscriber_events = set()
         
         # 语音识别服务
         self.speech_service = get_speech_service()
     
-    def _init_zed_camera(self):
-        """初始化ZED相机"""
-        init_params = sl.InitParameters()
-        if self.zed.open(init_params) != sl.ERROR_CODE.SUCCESS:
-            raise RuntimeError("Unable to open ZED camera")
+    def _ensure_pipeline(self) -> "CameraPipeline":
+        """创建单相机流水线（打开相机、加载并预热检测模型），只执行一次"""
+        with self._pipeline_lock:
+            if self.pipeline is None:
+                from .camera_pipeline import CameraPipeline
+                
+                self.pipeline = CameraPipeline(self.exhibit_ids, self.config, frame_source=self._frame_source)
+                self._mark_ready("detection")
+            return self.pipeline
     
-    def capture_and_detect(self) -> str:
+    def _mark_ready(self, component: str):
+        """记录组件从启动到就绪的耗时，全部就绪时打印总启动时间"""
+        with self._ready_lock:
+            if component in self.ready_times:
+                return
+            elapsed = time.monotonic() - self._started_at
+            self.ready_times[component] = elapsed
+            print(f"[Startup] {component} ready after {elapsed:.2f}s")
+            if len(self.ready_times) == 2:
+                print(f"[Startup] Service ready after {max(self.ready_times.values()):.2f}s "
+                      f"(detection {self.ready_times['detection']:.2f}s, speech {self.ready_times['speech']:.2f}s)")
+    
+    def _warm_up(self, component: str, load):
+        try:
+            load()
+        except Exception as e:
+            print(f"[Startup] Failed to load {component}: {e}")
+            return
+        self._mark_ready(component)
+    
+    def start_warmup(self):
         """
-        捕获图像并检测展品占用情况
-        
+        在后台线程中并行加载检测模型（含相机）和Whisper模型，各自执行一次预热推理
+
+        多相机模式下各工作进程自行加载模型，收到第一个检测结果时视为检测就绪。
+        """
+        if self.speech_service.config.always_on_capture:
+            # 麦克风在服务启动时即开始持续录音，访客抢先开口的音频也会进入环形缓冲区
+            try:
+                self.speech_service.start_capture()
+            except Exception as e:
+                print(f"Error starting microphone capture: {e}")
+        warmups = [("speech", self.speech_service.warmup)]
+        if self.camera_pool is not None:
+            # 只需启动工作进程，不必占用线程
+            self.camera_pool.start()
+        else:
+            warmups.append(("detection", self._ensure_pipeline))
+        for component, load in warmups:
+            threading.Thread(
+                target=self._warm_up, args=(component, load), name=f"warmup-{component}", daemon=True
+            ).start()
+    
+    def get_readiness(self) -> dict:
+        """
+        获取就绪状态
+
         Returns:
-            占用状态字符串，例如 "01" 表示第一个展品空闲，第二个展品被占用
+            {"ready": 全部就绪, "detection": 是否就绪, "speech": 是否就绪,
+             "ready_s": {组件: 启动到就绪的耗时}, "uptime_s": 启动至今的时长}
         """
-        occupied_exhibits = ""
+        with self._ready_lock:
+            ready_times = dict(self.ready_times)
+        return {
+            "ready": len(ready_times) == 2,
+            "detection": "detection" in ready_times,
+            "speech": "speech" in ready_times,
+            "ready_s": {k: round(v, 3) for k, v in ready_times.items()},
+            "uptime_s": round(time.monotonic() - self._started_at, 3),
+        }
+    
+    def detect_exhibits(self) -> Optional[OccupancyMessage]:
+        """
+        捕获图像并检测各展品的占用情况（处理流程见 CameraPipeline.process_frame）
+
+        多相机模式下等待任一工作进程的下一个结果，并与其他相机的最新结果合并。
         
+        Returns:
+            按展品标记ID组织的占用消息（平滑后的占用状态、本帧人数和最大置信度），
+            抓帧或检测失败时返回None
+        """
         try:
-            # 抓取新帧
-            if self.zed.grab(self.runtime_parameters) == sl.ERROR_CODE.SUCCESS:
-                # 检索左图像
-                self.zed.retrieve_image(self.image, sl.VIEW.LEFT)
-                
-                # 转换为numpy数组
-                frame = self.image.get_data()
-                if frame is None:
-                    return occupied_exhibits
-                
-                frame = np.array(frame)
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
-                
-                # 保存完整图像
-                filename = f"{self.config.exhibit_detection_dir}/{self.config.exhibit_image_filename}"
-                cv2.imwrite(filename, frame)
-                print("Image saved!")
-                
-                # 分割并保存垂直区域
-                img = cv2.imread(filename)
-                height, width, _ = img.shape
-                section_width = width // self.num_exhibits
-                
-                for i in range(self.num_exhibits):
-                    start_x = i * section_width
-                    end_x = (i + 1) * section_width if i < self.num_exhibits - 1 else width
-                    section = img[:, start_x:end_x]
-                    
-                    section_filename = f"{self.config.exhibit_detection_dir}/exhibit_section_{i + 1}.jpg"
-                    cv2.imwrite(section_filename, section)
-                    print(f"Saved section {i + 1} to {section_filename}")
-                
-                # 检测每个区域是否有人
-                for i in range(self.num_exhibits):
-                    section_filename = f"{self.config.exhibit_detection_dir}/exhibit_section_{i + 1}.jpg"
-                    section_img = cv2.imread(section_filename)
-                    results = self.model(section_img)
-                    
-                    person_found = any(
-                        self.model.names[int(box.cls[0])] == "person" 
-                        and float(box.conf[0]) > self.config.confidence_threshold
-                        for result in results 
-                        for box in result.boxes
-                    )
-                    
-                    if person_found:
-                        occupied_exhibits += "1"
-                        print(f"Person detected in Exhibit {i + 1}")
-                    else:
-                        occupied_exhibits += "0"
-                        print(f"No one detected in Exhibit {i + 1}")
+            if self.camera_pool is not None:
+                self.camera_pool.start()
+                result = self.camera_pool.next_result(timeout=self.config.max_wait_for_fresh)
+                if result is not None:
+                    self._mark_ready("detection")
+            else:
+                pipeline = self._ensure_pipeline()
+                with self._capture_lock:
+                    result = pipeline.process_frame()
+            if result is None:
+                return None
+            
+            timestamp, exhibits = result
+            with self._capture_lock:
+                self._seq += 1
+                return OccupancyMessage(seq=self._seq, timestamp=timestamp, exhibits=exhibits)
         
         except Exception as e:
             print(f"An error occurred during detection: {e}")
         
-        return occupied_exhibits
+        return None
     
-    def send_exhibits_occupied_metadata(self, conn: socket.socket):
+    def capture_and_detect(self) -> str:
         """
-        发送展品占用元数据到NAO机器人
+        捕获图像并检测展品占用情况
+        
+        Returns:
+            占用状态字符串，例如 "01" 表示第一个展品空闲，第二个展品被占用
+        """
+        message = self.detect_exhibits()
+        return message.occupancy_string(self.exhibit_ids) if message else ""
+    
+    def get_stats(self) -> dict:
+        """
+        获取检测统计信息
+
+        Returns:
+            包含帧数、推理次数、跳过推理次数及跳过比例的字典；
+            多相机模式下为 {相机序号: 统计信息}
+        """
+        if self.camera_pool is not None:
+            return dict(self.camera_pool.stats)
+        return self.pipeline.get_stats() if self.pipeline is not None else {}
+    
+    def get_exhibit_counts(self) -> Dict[int, int]:
+        """
+        获取各展品的最新人数
+
+        Returns:
+            {mark_id: 人数}，尚无检测结果时为空字典
+        """
+        message = self._latest_message
+        if message is None:
+            return {}
+        return {mark_id: status.count for mark_id, status in message.exhibits.items()}
+    
+    def get_heatmap(self, camera_index: int = 0) -> Optional[np.ndarray]:
+        """
+        获取访客落脚点热力图（归一化画面坐标上的降采样网格，单位为人·秒）
+
+        Args:
+            camera_index: 多相机模式下的相机序号，读取该相机最近一次保存的检查点
+
+        Returns:
+            形状为 (heatmap_height, heatmap_width) 的数组，未启用或尚无数据时返回None
+        """
+        if self.camera_pool is not None:
+            return self.camera_pool.load_heatmap(camera_index)
+        if self.pipeline is None:
+            return None
+        with self._capture_lock:
+            return self.pipeline.get_heatmap()
+    
+    def _publish_occupancy(self, message: OccupancyMessage):
+        """
+        更新最新占用结果缓存并唤醒等待新结果的客户端
+
+        Args:
+            message: 检测得到的占用消息
+        """
+        with self._occupancy_cond:
+            previous = self._latest_message
+            old_state = previous.occupancy_string(self.exhibit_ids) if previous else "-"
+            new_state = message.occupancy_string(self.exhibit_ids)
+            if new_state != old_state:
+                print(f"[Metadata] Occupancy changed: {old_state} -> {new_state}")
+            self._latest_message = message
+            self._message_history.append(message)
+            self._occupancy_cond.notify_all()
         
+        # 通知事件循环中的订阅连接
+        loop = self._loop
+        if loop is not None and self._subscriber_events:
+            loop.call_soon_threadsafe(self._notify_subscribers)
+    
+    def _detection_loop(self):
+        """后台检测循环，按 config.detection_interval 持续抓帧并推理"""
+        interval = self.config.detection_interval
+        print(f"[Metadata] Background detection running every {interval:.3f}s")
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            message = self.detect_exhibits()
+            if message:
+                self._publish_occupancy(message)
+            if self.camera_pool is not None:
+                # 多相机模式下由各工作进程控制节奏
+                continue
+            elapsed = time.monotonic() - started
+            self._stop_event.wait(max(0.0, interval - elapsed))
+    
+    def start_detection_loop(self):
+        """启动后台检测线程（重复调用无副作用）"""
+        if self._detection_thread is not None and self._detection_thread.is_alive():
+            return
+        self._stop_event.clear()
+        if self.camera_pool is not None:
+            self.camera_pool.start()
+        self._detection_thread = threading.Thread(target=self._detection_loop, daemon=True)
+        self._detection_thread.start()
+    
+    def stop_detection_loop(self):
+        """停止后台检测线程"""
+        self._stop_event.set()
+        if self._detection_thread is not None:
+            self._detection_thread.join(timeout=5)
+            self._detection_thread = None
+    
+    def _background_running(self) -> bool:
+        """后台检测循环是否在运行"""
+        return self._detection_thread is not None and self._detection_thread.is_alive()
+    
+    def get_latest_message(self, max_age: Optional[float] = None) -> Optional[OccupancyMessage]:
+        """
+        获取缓存的最新占用消息
+
         Args:
-            conn: 已建立的socket连接
+            max_age: 可接受的最大结果时长（秒）；缓存结果过旧时等待下一次检测结果，
+                最多等待 config.max_wait_for_fresh 秒。为None时直接返回缓存
+
+        Returns:
+            最新占用消息，尚无结果时返回None
         """
+        with self._occupancy_cond:
+            if max_age is not None:
+                self._occupancy_cond.wait_for(
+                    lambda: (self._latest_message is not None
+                             and time.time() - self._latest_message.timestamp <= max_age),
+                    timeout=self.config.max_wait_for_fresh
+                )
+            return self._latest_message
+    
+    def get_latest_occupancy(self, max_age: Optional[float] = None) -> Tuple[str, float]:
+        """
+        获取缓存的最新占用结果
+
+        Args:
+            max_age: 同 get_latest_message
+
+        Returns:
+            (占用状态字符串, 帧时间戳) 元组；尚无结果时为 ("", 0.0)
+        """
+        message = self.get_latest_message(max_age)
+        if message is None:
+            return "", 0.0
+        return message.occupancy_string(self.exhibit_ids), message.timestamp
+    
+    def _current_message(self, max_age: Optional[float] = None) -> Optional[OccupancyMessage]:
+        """
+        获取当前占用消息：后台循环运行时读取缓存，否则立即抓帧检测（阻塞调用）
+        """
+        if self._background_running():
+            return self.get_latest_message(max_age)
+        message = self.detect_exhibits()
+        if message:
+            self._publish_occupancy(message)
+        return message
+    
+    def _message_since(self, message: OccupancyMessage, since_seq: Optional[int]) -> OccupancyMessage:
+        """
+        若历史中仍保留客户端已有的序列号，则返回相对它的增量消息，否则返回完整快照
+        """
+        if since_seq is None:
+            return message
+        with self._occupancy_cond:
+            base = next((m for m in self._message_history if m.seq == since_seq), None)
+        return make_delta(base, message) if base is not None else message
+    
+    @staticmethod
+    def _parse_request(request: str) -> Dict[str, str]:
+        """
+        解析客户端请求行，由空格分隔的 key=value 组成，例如 "proto=1 max_age=0.5 since=42"
+
+        旧客户端只发送 "max_age=<秒>" 或空行，此时不含 proto，使用旧的字符串响应。
+        """
+        params = {}
+        for token in request.split():
+            key, sep, value = token.partition("=")
+            if sep:
+                params[key] = value
+        return params
+    
+    @staticmethod
+    def _parse_number(params: Dict[str, str], key: str, kind=float):
+        """读取数值参数，缺失或格式错误时返回None"""
         try:
-            occupied_exhibits = self.capture_and_detect()
-            if occupied_exhibits:
-                conn.sendall(occupied_exhibits.encode('utf-8'))
-                print("[Metadata] Sent to NAO:", occupied_exhibits)
+            return kind(params[key])
+        except (KeyError, ValueError):
+            return None
+    
+    def _record_and_transcribe(self) -> str:
+        """录制访客的一句话（按语音活动检测结束）并直接在内存中转写（阻塞调用）"""
+        print("[Dialogue] Connected")
+        recording, fs = self.speech_service.record_utterance()
+        if len(recording) == 0:
+            return ""
+        if self.speech_service.config.save_recordings:
+            self.speech_service.save_audio_async(recording, fs)
+        return self.speech_service.transcribe_array(recording, fs)
+    
+    def _stream_record_and_transcribe(self, on_event) -> str:
+        """
+        录制访客的一句话，说话过程中经 on_event 推送部分结果，说完后推送 "end"，
+        最后推送完整片段的最终结果 "final"（阻塞调用）
+        """
+        print("[Dialogue] Connected (streaming)")
+        try:
+            recording, fs = self.speech_service.stream_utterance(on_event)
+            text = ""
+            if len(recording) > 0:
+                if self.speech_service.config.save_recordings:
+                    self.speech_service.save_audio_async(recording, fs)
+                text = self.speech_service.transcribe_array(recording, fs)
         except Exception as e:
-            print("Error during metadata handling:", e)
+            print(f"Error handling audio: {e}")
+            text = "Error processing audio"
+        on_event("final", text)
+        return text
+    
+    async def _handle_detection_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        发送展品占用元数据到NAO机器人
+        
+        客户端可先发送一行请求（见 _parse_request）；不发送时最多等待 config.request_wait 秒。
+        请求包含 proto=1 时返回带长度前缀的占用消息（见 utils.occupancy_protocol），
+        否则返回旧格式的占用字符串；同时包含 subscribe=1 时保持连接并推送占用变化。
+        请求为 ready=1 时返回就绪状态（见 _send_readiness）。
+        """
+        params = await self._read_request(reader)
+        if params.get("ready") == "1":
+            await self._send_readiness(writer)
+        elif "proto" in params and params.get("subscribe") == "1":
+            await self._serve_subscription(reader, writer, self._parse_number(params, "since", int))
+        else:
+            await asyncio.wait_for(
+                self._reply_once(writer, params), timeout=self.network_config.connection_timeout
+            )
+    
+    async def _read_request(self, reader: asyncio.StreamReader, timeout: Optional[float] = None) -> Dict[str, str]:
+        """读取可选的请求行，最多等待 timeout（默认 config.request_wait）秒，未发送时返回空字典"""
+        if timeout is None:
+            timeout = self.config.request_wait
+        try:
+            request = await asyncio.wait_for(reader.readline(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return {}
+        return self._parse_request(request.decode('utf-8'))
+    
+    async def _send_readiness(self, writer: asyncio.StreamWriter):
+        """就绪探针：返回一行JSON（见 get_readiness），模型加载期间也可立即响应"""
+        writer.write((json.dumps(self.get_readiness(), separators=(",", ":")) + "\n").encode('utf-8'))
+        await writer.drain()
+    
+    async def _reply_once(self, writer: asyncio.StreamWriter, params: Dict[str, str]):
+        """对单次请求返回当前占用结果"""
+        max_age = self._parse_number(params, "max_age")
+        if max_age is None and self._background_running() and self._latest_message is not None:
+            # 缓存读取不阻塞，直接在事件循环中完成
+            message = self.get_latest_message()
+        else:
+            # 尚无缓存结果（例如模型仍在加载）时最多等待 config.max_wait_for_fresh 秒
+            if max_age is None and self._background_running():
+                max_age = float("inf")
+            loop = asyncio.get_running_loop()
+            message = await loop.run_in_executor(self._detection_executor, self._current_message, max_age)
+        if message is None:
+            if "proto" in params:
+                # 取帧失败或模型仍在加载：返回带错误说明的空快照，客户端视占用为未知
+                writer.write(encode_message(OccupancyMessage(
+                    seq=self._seq, timestamp=time.time(), error="no detection result available"
+                )))
+                await writer.drain()
+                print("[Metadata] No detection result available, sent error frame to NAO")
+            return
+        
+        if "proto" in params:
+            reply = self._message_since(message, self._parse_number(params, "since", int))
+            writer.write(encode_message(reply))
+            print(f"[Metadata] Sent {'delta' if reply.delta else 'snapshot'} #{reply.seq} to NAO")
+        else:
+            occupied_exhibits = message.occupancy_string(self.exhibit_ids)
+            writer.write(occupied_exhibits.encode('utf-8'))
+            print("[Metadata] Sent to NAO:", occupied_exhibits)
+        await writer.drain()
+    
+    def _notify_subscribers(self):
+        """唤醒所有订阅连接（在事件循环线程中调用）"""
+        for event in self._subscriber_events:
+            event.set()
+    
+    @staticmethod
+    async def _read_until_closed(reader: asyncio.StreamReader):
+        """读取并丢弃订阅客户端发来的数据，直到对端关闭连接"""
+        try:
+            while await reader.read(1024):
+                pass
+        except ConnectionError:
+            pass
+    
+    @staticmethod
+    async def _wait_for_update(event: asyncio.Event, peer_closed: asyncio.Future, timeout: float) -> bool:
+        """
+        等待 event 被设置，最多 timeout 秒
+
+        Returns:
+            event 是否被设置；超时返回False
+
+        Raises:
+            ConnectionResetError: 等待期间对端关闭了连接
+        """
+        waiter = asyncio.ensure_future(event.wait())
+        try:
+            await asyncio.wait({waiter, peer_closed}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
         finally:
-            conn.close()
+            waiter.cancel()
+        if peer_closed.done():
+            raise ConnectionResetError("Subscriber disconnected")
+        return event.is_set()
     
-    def handle_audio(self, conn: socket.socket):
+    async def _serve_subscription(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                                  since_seq: Optional[int]):
         """
-        处理音频请求，进行语音识别
+        订阅模式：先发送快照（或相对 since_seq 的增量），之后仅在展品占用状态变化时推送增量，
+        空闲超过 network_config.subscription_heartbeat 秒时发送空增量作为心跳
+
+        尚无检测结果时（模型加载中或取帧失败）按心跳间隔发送错误快照，客户端视占用为未知。
+        等待期间同时读取连接，对端关闭时立即结束，不占用连接名额。
+        """
+        # 订阅依赖后台检测循环持续产生结果
+        self.start_detection_loop()
         
-        Args:
-            conn: 已建立的socket连接
+        event = asyncio.Event()
+        self._subscriber_events.add(event)
+        self._subscription_tasks.add(asyncio.current_task())
+        peer_closed = asyncio.ensure_future(self._read_until_closed(reader))
+        heartbeat = self.network_config.subscription_heartbeat
+        try:
+            while self._latest_message is None:
+                event.clear()
+                writer.write(encode_message(OccupancyMessage(
+                    seq=self._seq, timestamp=time.time(), error="no detection result available"
+                )))
+                await writer.drain()
+                await self._wait_for_update(event, peer_closed, heartbeat)
+            
+            last_sent = self._latest_message
+            writer.write(encode_message(self._message_since(last_sent, since_seq)))
+            await writer.drain()
+            print(f"[Metadata] Subscriber attached at #{last_sent.seq}")
+            
+            while True:
+                if not await self._wait_for_update(event, peer_closed, heartbeat):
+                    reply = OccupancyMessage(
+                        seq=last_sent.seq,
+                        timestamp=self._latest_message.timestamp,
+                        delta=True,
+                        base_seq=last_sent.seq
+                    )
+                else:
+                    event.clear()
+                    current = self._latest_message
+                    reply = make_delta(last_sent, current, occupancy_only=True)
+                    if not reply.exhibits:
+                        continue
+                    last_sent = current
+                writer.write(encode_message(reply))
+                await writer.drain()
+        finally:
+            peer_closed.cancel()
+            self._subscriber_events.discard(event)
+            self._subscription_tasks.discard(asyncio.current_task())
+    
+    async def _handle_audio_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        处理音频请求，进行语音识别；请求行为 ready=1 时只返回就绪状态，不录音
+        
+        请求包含 stream=1 时以每行一个JSON对象的形式推送识别进度（见 _stream_transcript），
+        否则在识别完成后一次性返回文字。
         """
+        params = await self._read_request(reader, self.config.audio_request_wait)
+        if params.get("ready") == "1":
+            await self._send_readiness(writer)
+            return
+        if params.get("stream") == "1":
+            await self._stream_transcript(writer)
+            return
+        
+        loop = asyncio.get_running_loop()
         try:
-            recording, fs = self.speech_service.record_audio(5)
-            print(f"[Dialogue] Connected")
-            timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-            filename = f"audio-{timestamp}.wav"
-            audio_file = self.speech_service.save_audio(recording, fs, filename)
-            text = self.speech_service.transcribe_audio(audio_file)
-            conn.sendall(text.encode('utf-8'))
+            text = await loop.run_in_executor(self._audio_executor, self._record_and_transcribe)
         except Exception as e:
             print(f"Error handling audio: {e}")
-            conn.sendall("Error processing audio".encode('utf-8'))
+            text = "Error processing audio"
+        writer.write(text.encode('utf-8'))
+        await writer.drain()
+    
+    async def _stream_transcript(self, writer: asyncio.StreamWriter):
+        """
+        流式返回识别进度，每行一个JSON对象 {"type": ..., "text": ...}：
+        说话过程中的若干 "partial"（至今的部分结果），说话结束时的 "end"，最后是 "final"（最终结果）
+        """
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        
+        def on_event(kind: str, text: str):
+            try:
+                loop.call_soon_threadsafe(events.put_nowait, (kind, text))
+            except RuntimeError:
+                # 事件循环已关闭（服务正在停止）
+                pass
+        
+        task = loop.run_in_executor(self._audio_executor, self._stream_record_and_transcribe, on_event)
+        while True:
+            kind, text = await events.get()
+            writer.write((json.dumps({"type": kind, "text": text}) + "\n").encode('utf-8'))
+            await writer.drain()
+            if kind == "final":
+                break
+        await task
+    
+    def _connection_handler(self, handler, name: str, timeout: Optional[float] = None):
+        """
+        为连接处理协程加上连接数限制、超时控制和资源清理
+
+        Args:
+            handler: 连接处理协程函数
+            name: 日志前缀
+            timeout: 整个连接的最长处理时间（秒），为None时由处理函数自行控制
+
+        注意：超时只会取消协程本身，已提交到线程池的任务仍会执行完毕。
+        """
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            if len(self._connection_tasks) >= self.network_config.max_connections:
+                print(f"[{name}] Too many connections, rejecting client")
+                writer.close()
+                return
+            
+            task = asyncio.current_task()
+            self._connection_tasks.add(task)
+            try:
+                await asyncio.wait_for(handler(reader, writer), timeout=timeout)
+            except asyncio.TimeoutError:
+                print(f"[{name}] Connection timed out")
+            except asyncio.CancelledError:
+                pass
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                print(f"[{name}] Connection lost: {e}")
+            except Exception as e:
+                print(f"[{name}] Error during request handling: {e}")
+            finally:
+                self._connection_tasks.discard(task)
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except Exception:
+                    pass
+        
+        return handle
+    
+    async def serve(self):
+        """
+        在同一个事件循环中运行展品占用检测和音频两个服务器，直到调用 request_shutdown()
+        或收到 SIGINT/SIGTERM
+        """
+        self._loop = asyncio.get_running_loop()
+        self._shutdown_event = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self._loop.add_signal_handler(sig, self._shutdown_event.set)
+            except (NotImplementedError, RuntimeError):
+                # Windows或非主线程下不支持，依赖KeyboardInterrupt
+                pass
+        
+        # 有界线程池：限制同时进行的抓帧/推理和录音/转写数量
+        self._detection_executor = ThreadPoolExecutor(
+            max_workers=self.network_config.detection_workers, thread_name_prefix="detection"
+        )
+        self._audio_executor = ThreadPoolExecutor(
+            max_workers=self.network_config.audio_workers, thread_name_prefix="audio"
+        )
+        
+        host = self.network_config.host
+        backlog = self.network_config.backlog
+        detection_server = await asyncio.start_server(
+            self._connection_handler(self._handle_detection_client, "Metadata"),
+            host, self.network_config.detection_port, backlog=backlog
+        )
+        audio_server = await asyncio.start_server(
+            self._connection_handler(self._handle_audio_client, "Dialogue", self.network_config.connection_timeout),
+            host, self.network_config.audio_port, backlog=backlog
+        )
+        print(f"[Metadata] Listening on port {self.network_config.detection_port}...")
+        print(f"[Dialogue] Listening on port {self.network_config.audio_port}...")
+        
+        try:
+            await self._shutdown_event.wait()
         finally:
-            conn.close()
-    
-    def start_audio_server(self):
-        """启动音频处理服务器"""
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.bind((self.network_config.host, self.network_config.audio_port))
-            s.listen(1)
-            print(f"[Dialogue] Listening on port {self.network_config.audio_port}...")
-            while True:
-                conn, addr = s.accept()
-                threading.Thread(target=self.handle_audio, args=(conn,)).start()
-    
-    def start_occupied_detector(self):
-        """启动展品占用检测服务器"""
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.bind((self.network_config.host, self.network_config.detection_port))
-            s.listen(1)
-            print(f"[Metadata] Listening on port {self.network_config.detection_port}...")
-            while True:
-                conn, addr = s.accept()
-                threading.Thread(
-                    target=self.send_exhibits_occupied_metadata,
-                    args=(conn,)
-                ).start()
+            print("Shutting down servers...")
+            detection_server.close()
+            audio_server.close()
+            
+            # 订阅连接不会自行结束，直接取消；再等待进行中的单次请求处理完毕
+            for task in list(self._subscription_tasks):
+                task.cancel()
+            if self._connection_tasks:
+                await asyncio.wait(set(self._connection_tasks), timeout=self.network_config.shutdown_grace)
+            
+            self._detection_executor.shutdown(wait=False)
+            self._audio_executor.shutdown(wait=False)
+            self._loop = None
+    
+    def request_shutdown(self):
+        """请求停止服务器（可从任意线程调用）"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._shutdown_event.set)
     
     def start_all_services(self):
-        """启动所有服务（阻塞调用）"""
-        audio_thread = threading.Thread(target=self.start_audio_server)
-        occupied_thread = threading.Thread(target=self.start_occupied_detector)
-        
-        audio_thread.start()
-        occupied_thread.start()
+        """并行预热模型后启动所有服务（阻塞调用）；服务器立即开始监听，可通过 ready=1 探测就绪状态"""
+        self.start_warmup()
+        if self.config.background_detection:
+            self.start_detection_loop()
         
-        # 阻塞主线程
-        audio_thread.join()
-        occupied_thread.join()
+        asyncio.run(self.serve())
     
     def close(self):
-        """关闭相机资源"""
-        if self.zed:
-            self.zed.close()
+        """停止后台检测、关闭帧来源或相机工作进程，并停止麦克风录音"""
+        self.stop_detection_loop()
+        if self.camera_pool is not None:
+            self.camera_pool.stop()
+        elif self.pipeline is not None:
+            self.pipeline.close()
+        self.speech_service.close()
 
 
 def main():
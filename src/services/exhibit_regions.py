@@ -0,0 +1,233 @@
+"""
+展品区域模块
+将每个展品ID映射到画面中的多边形/矩形区域，并以向量化方式判断人员所在区域
+"""
+import warnings
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+class ExhibitRegions:
+    """展品区域集合，坐标均为相对画面宽高的归一化坐标 [0, 1]"""
+    
+    def __init__(self, exhibit_ids: Sequence[int], polygons: Sequence[np.ndarray]):
+        """
+        初始化展品区域
+        
+        Args:
+            exhibit_ids: 展品标记ID列表，顺序即占用结果的顺序
+            polygons: 与 exhibit_ids 一一对应的多边形顶点数组，形状为 (V, 2)
+        """
+        if len(exhibit_ids) != len(polygons):
+            raise ValueError("Each exhibit ID needs exactly one region")
+        if not exhibit_ids:
+            raise ValueError("At least one exhibit region is required")
+        
+        self.exhibit_ids = list(exhibit_ids)
+        self.polygons = [np.asarray(p, dtype=np.float32) for p in polygons]
+        
+        # 将所有多边形补齐到相同顶点数（重复最后一个顶点，产生长度为0的边，不影响射线法）
+        max_vertices = max(len(p) for p in self.polygons)
+        padded = np.empty((len(self.polygons), max_vertices, 2), dtype=np.float32)
+        for i, polygon in enumerate(self.polygons):
+            padded[i, :len(polygon)] = polygon
+            padded[i, len(polygon):] = polygon[-1]
+        
+        # 预计算每条边的起点和终点，形状为 (R, V)
+        start = padded
+        end = np.roll(padded, -1, axis=1)
+        self._x0, self._y0 = start[..., 0], start[..., 1]
+        self._x1, self._y1 = end[..., 0], end[..., 1]
+        dy = self._y1 - self._y0
+        self._slope = np.divide(
+            self._x1 - self._x0, dy,
+            out=np.zeros_like(dy), where=dy != 0
+        )
+        
+        # 各区域允许的人员距离范围（米），为None时不按深度过滤
+        self.depth_near: Optional[np.ndarray] = None
+        self.depth_far: Optional[np.ndarray] = None
+    
+    def set_depth_bands(self, bands: Sequence[Optional[Sequence[float]]]):
+        """
+        设置各区域的距离范围
+        
+        Args:
+            bands: 与展品一一对应的 (near, far) 距离范围（米），None表示不限制
+        """
+        if len(bands) != len(self.exhibit_ids):
+            raise ValueError("Each exhibit ID needs exactly one depth band")
+        limits = np.array(
+            [band if band is not None else (0.0, np.inf) for band in bands], dtype=np.float32
+        )
+        self.depth_near, self.depth_far = limits[:, 0], limits[:, 1]
+    
+    @staticmethod
+    def _to_polygon(spec) -> np.ndarray:
+        """
+        将区域配置转换为多边形顶点数组
+        
+        Args:
+            spec: [x1, y1, x2, y2] 矩形，或 [[x, y], ...] 多边形（至少3个顶点）
+        """
+        array = np.asarray(spec, dtype=np.float32)
+        if array.shape == (4,):
+            x1, y1, x2, y2 = array
+            return np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], dtype=np.float32)
+        if array.ndim == 2 and array.shape[1] == 2 and array.shape[0] >= 3:
+            return array
+        raise ValueError(f"Invalid exhibit region: {spec!r}")
+    
+    @classmethod
+    def vertical_strips(cls, exhibit_ids: Sequence[int]) -> "ExhibitRegions":
+        """按展品数量将画面均分为等宽垂直区域（未配置区域时的默认行为）"""
+        n = len(exhibit_ids)
+        edges = np.linspace(0.0, 1.0, n + 1)
+        polygons = [cls._to_polygon([edges[i], 0.0, edges[i + 1], 1.0]) for i in range(n)]
+        return cls(exhibit_ids, polygons)
+    
+    @classmethod
+    def from_config(cls, exhibit_ids: Sequence[int], regions: Optional[Dict] = None,
+                    depth_bands: Optional[Dict] = None,
+                    default_depth_band: Optional[Sequence[float]] = None) -> "ExhibitRegions":
+        """
+        根据配置创建展品区域
+        
+        Args:
+            exhibit_ids: 展品标记ID列表（通常为 ExhibitConfig.total_exhibit_ids）
+            regions: {mark_id: 区域} 字典；为None时使用等宽垂直区域
+            depth_bands: {mark_id: (near, far)} 距离范围（米）
+            default_depth_band: 未在 depth_bands 中列出的展品使用的距离范围；
+                与 depth_bands 均为None时不按深度过滤
+        """
+        if not regions:
+            instance = cls.vertical_strips(exhibit_ids)
+        else:
+            missing = [mark_id for mark_id in exhibit_ids if mark_id not in regions]
+            if missing:
+                raise ValueError(f"No region configured for exhibit IDs: {missing}")
+            instance = cls(exhibit_ids, [cls._to_polygon(regions[mark_id]) for mark_id in exhibit_ids])
+        
+        if depth_bands or default_depth_band is not None:
+            depth_bands = depth_bands or {}
+            instance.set_depth_bands([depth_bands.get(mark_id, default_depth_band) for mark_id in exhibit_ids])
+        return instance
+    
+    def __len__(self) -> int:
+        return len(self.exhibit_ids)
+    
+    def contains(self, points: np.ndarray) -> np.ndarray:
+        """
+        射线法判断点是否位于各区域内
+        
+        Args:
+            points: 归一化坐标点数组，形状为 (N, 2)
+            
+        Returns:
+            形状为 (N, R) 的布尔矩阵
+        """
+        px = points[:, 0, None, None]
+        py = points[:, 1, None, None]
+        straddles = (self._y0 > py) != (self._y1 > py)
+        crossing_x = self._x0 + (py - self._y0) * self._slope
+        crossings = straddles & (px < crossing_x)
+        return np.count_nonzero(crossings, axis=2) % 2 == 1
+    
+    @staticmethod
+    def anchor_points(boxes_xyxy: np.ndarray, frame_shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        计算人员框的落脚点（底边中点）的归一化坐标
+        
+        Args:
+            boxes_xyxy: 像素坐标人员框，形状为 (N, 4)
+            frame_shape: 图像形状 (height, width, ...)
+        """
+        height, width = frame_shape[:2]
+        points = np.empty((len(boxes_xyxy), 2), dtype=np.float32)
+        points[:, 0] = (boxes_xyxy[:, 0] + boxes_xyxy[:, 2]) * (0.5 / width)
+        # 略微上移，避免底边恰好落在画面边缘 y=1.0 时被判定在区域外
+        points[:, 1] = np.minimum(boxes_xyxy[:, 3] / height, 1.0 - 1e-6)
+        return points
+    
+    @staticmethod
+    def box_depths(depth: np.ndarray, boxes_xyxy: np.ndarray, samples: int = 7,
+                   inner: float = 0.5) -> np.ndarray:
+        """
+        估计每个人员框的距离：在框中心区域取 samples x samples 个采样点，求有效深度的中位数
+        
+        只采样框中央（人体躯干）可避免框角落处背景的影响，且开销与框大小无关。
+        
+        Args:
+            depth: 深度图（米），形状为 (H, W)，无效值为NaN、inf或非正数
+            boxes_xyxy: 像素坐标人员框，形状为 (N, 4)
+            samples: 每个方向的采样点数
+            inner: 采样区域占框宽高的比例
+            
+        Returns:
+            长度为 N 的距离数组，没有有效深度的框为NaN
+        """
+        if len(boxes_xyxy) == 0:
+            return np.zeros(0, dtype=np.float32)
+        height, width = depth.shape[:2]
+        centers = (boxes_xyxy[:, :2] + boxes_xyxy[:, 2:]) * 0.5
+        half_sizes = (boxes_xyxy[:, 2:] - boxes_xyxy[:, :2]) * (0.5 * inner)
+        offsets = np.linspace(-1.0, 1.0, samples)
+        xs = np.clip(centers[:, 0, None] + offsets * half_sizes[:, 0, None], 0, width - 1).astype(np.intp)
+        ys = np.clip(centers[:, 1, None] + offsets * half_sizes[:, 1, None], 0, height - 1).astype(np.intp)
+        
+        values = depth[ys[:, :, None], xs[:, None, :]].reshape(len(boxes_xyxy), -1).astype(np.float32)
+        values[~np.isfinite(values) | (values <= 0)] = np.nan
+        with warnings.catch_warnings():
+            # 没有有效深度的框返回NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return np.nanmedian(values, axis=1)
+    
+    def filter_by_depth(self, membership: np.ndarray, depths: np.ndarray) -> np.ndarray:
+        """
+        剔除不在对应区域距离范围内的人员
+        
+        Args:
+            membership: assign_boxes 得到的 (N, R) 布尔矩阵
+            depths: 各人员框的距离 (N,)，NaN表示未知（保留）
+            
+        Returns:
+            过滤后的 (N, R) 布尔矩阵
+        """
+        if self.depth_near is None:
+            return membership
+        d = depths[:, None]
+        within = (d >= self.depth_near) & (d <= self.depth_far)
+        return membership & (within | np.isnan(d))
+    
+    def assign_boxes(self, boxes_xyxy: np.ndarray, frame_shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        将人员框分配到展品区域
+        
+        Returns:
+            形状为 (N, R) 的布尔矩阵，True表示第n个人位于第r个区域
+        """
+        return self.contains(self.anchor_points(boxes_xyxy, frame_shape))
+    
+    def occupancy(self, boxes_xyxy: np.ndarray, frame_shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        计算各区域是否有人
+        
+        Returns:
+            长度为 R 的布尔数组
+        """
+        return self.assign_boxes(boxes_xyxy, frame_shape).any(axis=0)
+    
+    def pixel_bounds(self, frame_shape: Tuple[int, ...]) -> List[Tuple[int, int, int, int]]:
+        """
+        计算各区域的像素外接矩形
+        
+        Returns:
+            [(x1, y1, x2, y2), ...] 列表
+        """
+        height, width = frame_shape[:2]
+        bounds = []
+        for polygon in self.polygons:
+            x1, y1 = np.clip(polygon.min(axis=0), 0.0, 1.0)
+            x2, y2 = np.clip(polygon.max(axis=0), 0.0, 1.0)
+            bounds.append((int(x1 * width), int(y1 * height), int(x2 * width), int(y2 * height)))
+        return bounds
@@ -0,0 +1,42 @@
+"""
+帧缓冲区复用模块
+为颜色转换、缩放和填充等逐帧操作提供按名称和分辨率复用的预分配缓冲区，
+避免高分辨率下每帧分配数MB内存
+"""
+import numpy as np
+from typing import Dict, Tuple
+
+
+class BufferPool:
+    """
+    按名称复用的预分配缓冲区
+
+    同一名称只保留最近一次请求的形状和类型对应的缓冲区：分辨率不变时始终返回同一数组，
+    分辨率变化时重新分配并替换旧缓冲区，因此内存占用有上限。
+    """
+    
+    def __init__(self):
+        self._buffers: Dict[str, np.ndarray] = {}
+        # 累计分配次数，稳定运行时应不再增长（用于基准测试验证）
+        self.allocations = 0
+    
+    def get(self, name: str, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """
+        获取缓冲区，内容为上一次使用后的残留数据
+        
+        Args:
+            name: 缓冲区名称
+            shape: 数组形状
+            dtype: 元素类型
+        """
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buffer
+            self.allocations += 1
+        return buffer
+    
+    @property
+    def nbytes(self) -> int:
+        """当前持有的缓冲区总字节数"""
+        return sum(buffer.nbytes for buffer in self._buffers.values())
@@ -0,0 +1,339 @@
+"""
+帧来源模块
+为检测服务提供统一的图像输入接口：ZED相机、视频文件、图片目录和合成图像，
+便于在没有相机硬件的机器上回放、分析和测试检测流程
+"""
+import glob
+import os
+import time
+import cv2
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Union
+from .frame_buffers import BufferPool
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class FrameSource:
+    """
+    帧来源基类，read() 返回BGR图像，没有更多帧时返回None
+    
+    支持深度的来源在每次 read() 后把对应的深度图（米，float32，与图像同尺寸）放在 depth 属性中。
+    read() 返回的图像可能是来源内部复用的缓冲区，内容在下一次 read() 时被覆盖，需要保留时应自行拷贝。
+    """
+    
+    def __init__(self, fps: float = 0.0, realtime: bool = False):
+        """
+        初始化帧来源
+        
+        Args:
+            fps: 回放帧率，仅在 realtime 为True时生效
+            realtime: 是否按 fps 实时节奏输出帧；False时尽可能快地输出
+        """
+        self.fps = fps
+        self.realtime = realtime
+        self._next_frame_time: Optional[float] = None
+        self.depth: Optional[np.ndarray] = None
+        self.buffers = BufferPool()
+        # 最近一次 read() 各阶段耗时（秒）：grab（取帧）、convert（格式转换），不含节奏等待
+        self.last_timings: Dict[str, float] = {}
+    
+    def _pace(self):
+        """按实时节奏等待到下一帧的时间点"""
+        if not self.realtime or self.fps <= 0:
+            return
+        period = 1.0 / self.fps
+        now = time.monotonic()
+        if self._next_frame_time is None or self._next_frame_time < now - period:
+            # 首帧或已明显落后时重新对齐，避免连续追帧
+            self._next_frame_time = now
+        delay = self._next_frame_time - now
+        if delay > 0:
+            time.sleep(delay)
+        self._next_frame_time += period
+    
+    def read(self) -> Optional[np.ndarray]:
+        """读取下一帧BGR图像"""
+        raise NotImplementedError
+    
+    def close(self):
+        """释放资源"""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ZedFrameSource(FrameSource):
+    """ZED相机左目图像，可选同时获取左目对齐的深度图"""
+    
+    def __init__(self, camera_id: int = 0, depth: bool = False):
+        """
+        Args:
+            camera_id: 相机编号，多台ZED相机时用于区分
+            depth: 是否计算并获取深度图；不需要时关闭深度计算以节省GPU
+        """
+        super().__init__()
+        import pyzed.sl as sl
+        
+        self._sl = sl
+        self.zed = sl.Camera()
+        init_params = sl.InitParameters()
+        init_params.set_from_camera_id(camera_id)
+        if depth:
+            init_params.depth_mode = sl.DEPTH_MODE.PERFORMANCE
+            init_params.coordinate_units = sl.UNIT.METER
+        else:
+            init_params.depth_mode = sl.DEPTH_MODE.NONE
+        if self.zed.open(init_params) != sl.ERROR_CODE.SUCCESS:
+            raise RuntimeError("Unable to open ZED camera")
+        
+        # 创建图像存储对象
+        self.image = sl.Mat()
+        self.depth_measure = sl.Mat() if depth else None
+        self.runtime_parameters = sl.RuntimeParameters()
+    
+    def read(self) -> Optional[np.ndarray]:
+        t0 = time.perf_counter()
+        if self.zed.grab(self.runtime_parameters) != self._sl.ERROR_CODE.SUCCESS:
+            return None
+        t1 = time.perf_counter()
+        
+        self.zed.retrieve_image(self.image, self._sl.VIEW.LEFT)
+        
+        # get_data() 直接返回sl.Mat内存的视图，无需额外拷贝；
+        # BGRA→BGR 写入按分辨率预分配的缓冲区，不再逐帧分配
+        bgra = self.image.get_data()
+        if bgra is None:
+            return None
+        frame = self.buffers.get("bgr", bgra.shape[:2] + (3,))
+        cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=frame)
+        
+        if self.depth_measure is not None:
+            # 深度图同样是sl.Mat内存的视图（float32，单位米，无效值为NaN/inf）
+            self.zed.retrieve_measure(self.depth_measure, self._sl.MEASURE.DEPTH)
+            self.depth = self.depth_measure.get_data()
+        self.last_timings = {"grab": t1 - t0, "convert": time.perf_counter() - t1}
+        return frame
+    
+    def close(self):
+        if self.zed:
+            self.zed.close()
+            self.zed = None
+
+
+class VideoFileFrameSource(FrameSource):
+    """视频文件回放"""
+    
+    def __init__(self, path: str, realtime: bool = False, loop: bool = False, fps: Optional[float] = None):
+        """
+        Args:
+            path: 视频文件路径
+            realtime: 是否按视频帧率实时输出
+            loop: 播放结束后是否从头循环
+            fps: 覆盖视频自带的帧率
+        """
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise RuntimeError(f"Unable to open video file: {path}")
+        super().__init__(fps=fps or self.capture.get(cv2.CAP_PROP_FPS) or 0.0, realtime=realtime)
+        self.loop = loop
+        self._frame: Optional[np.ndarray] = None
+    
+    def read(self) -> Optional[np.ndarray]:
+        self._pace()
+        t0 = time.perf_counter()
+        # 传入上一帧的数组，分辨率不变时OpenCV直接解码到其中
+        ok, frame = self.capture.read(self._frame)
+        if not ok and self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.capture.read(self._frame)
+        if ok:
+            if frame is not self._frame:
+                self.buffers.allocations += 1
+            self._frame = frame
+        self.last_timings = {"grab": time.perf_counter() - t0, "convert": 0.0}
+        return frame if ok else None
+    
+    def close(self):
+        self.capture.release()
+
+
+class ImageFolderFrameSource(FrameSource):
+    """图片目录或通配符回放，例如 exhibit_detection/*.jpg、datasets/coco8/images"""
+    
+    def __init__(self, paths: Union[str, Sequence[str]], fps: float = 5.0, realtime: bool = False,
+                 loop: bool = False, preload: bool = True):
+        """
+        Args:
+            paths: 目录、通配符或其列表；目录会递归查找图片文件
+            fps: 实时回放时的帧率
+            realtime: 是否按 fps 实时输出
+            loop: 播放结束后是否从头循环
+            preload: 是否预先解码全部图片，使回放时不包含磁盘读取和解码耗时
+        """
+        super().__init__(fps=fps, realtime=realtime)
+        self.files = self.find_images(paths)
+        if not self.files:
+            raise RuntimeError(f"No images found in {paths!r}")
+        self.loop = loop
+        self._index = 0
+        self._frames: Optional[List[np.ndarray]] = None
+        if preload:
+            self._frames = [self._load(f) for f in self.files]
+    
+    @staticmethod
+    def find_images(paths: Union[str, Sequence[str]]) -> List[str]:
+        """展开目录和通配符，返回排序后的图片文件列表"""
+        if isinstance(paths, str):
+            paths = [paths]
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                candidates = glob.glob(os.path.join(path, "**", "*"), recursive=True)
+            else:
+                candidates = glob.glob(path)
+            files.extend(sorted(f for f in candidates if f.lower().endswith(IMAGE_EXTENSIONS)))
+        return files
+    
+    @staticmethod
+    def _load(filename: str) -> np.ndarray:
+        image = cv2.imread(filename)
+        if image is None:
+            raise RuntimeError(f"Unable to read image: {filename}")
+        return image
+    
+    def __len__(self) -> int:
+        return len(self.files)
+    
+    @property
+    def current_file(self) -> str:
+        """最近一次 read() 返回的图片文件名"""
+        return self.files[(self._index - 1) % len(self.files)]
+    
+    def rewind(self):
+        """回到第一张图片"""
+        self._index = 0
+    
+    def read(self) -> Optional[np.ndarray]:
+        if self._index >= len(self.files):
+            if not self.loop:
+                return None
+            self._index = 0
+        self._pace()
+        t0 = time.perf_counter()
+        index = self._index
+        self._index += 1
+        frame = self._frames[index] if self._frames is not None else self._load(self.files[index])
+        self.last_timings = {"grab": time.perf_counter() - t0, "convert": 0.0}
+        return frame
+
+
+class SyntheticFrameSource(FrameSource):
+    """
+    合成图像：静态噪声背景上移动的人形矩形，用于无数据时的吞吐量测试
+    
+    启用深度时同时生成深度图：背景为固定距离，每个矩形有各自的距离，便于测试深度过滤。
+    read() 返回内部复用的缓冲区，内容在下一次 read() 时被覆盖
+    """
+    
+    def __init__(self, width: int = 1280, height: int = 720, num_people: int = 3,
+                 fps: float = 15.0, realtime: bool = False, num_frames: Optional[int] = None,
+                 seed: int = 0, depth: bool = False, depth_range: Sequence[float] = (1.0, 8.0),
+                 background_depth: float = 12.0):
+        """
+        Args:
+            width: 图像宽度
+            height: 图像高度
+            num_people: 画面中移动矩形的数量
+            fps: 实时输出时的帧率
+            realtime: 是否按 fps 实时输出
+            num_frames: 输出帧数上限，为None时无限输出
+            seed: 随机种子
+            depth: 是否生成深度图
+            depth_range: 矩形距离的随机范围（米）
+            background_depth: 背景距离（米）
+        """
+        super().__init__(fps=fps, realtime=realtime)
+        self.width = width
+        self.height = height
+        self.num_frames = num_frames
+        self._rng = np.random.default_rng(seed)
+        self._background = self._rng.integers(0, 64, size=(height, width, 3), dtype=np.uint8)
+        self._frame = np.empty_like(self._background)
+        
+        box_w, box_h = max(width // 12, 4), max(height // 3, 8)
+        self._size = np.array([box_w, box_h])
+        self._pos = self._rng.uniform([0, 0], [width - box_w, height - box_h], size=(num_people, 2))
+        self._vel = self._rng.uniform(-0.01, 0.01, size=(num_people, 2)) * [width, height]
+        self._count = 0
+        
+        self._background_depth = background_depth
+        self._depth_buffer: Optional[np.ndarray] = None
+        if depth:
+            self._depth_buffer = np.empty((height, width), dtype=np.float32)
+            self.person_depths = self._rng.uniform(*depth_range, size=num_people).astype(np.float32)
+    
+    def read(self) -> Optional[np.ndarray]:
+        if self.num_frames is not None and self._count >= self.num_frames:
+            return None
+        self._pace()
+        t0 = time.perf_counter()
+        self._count += 1
+        
+        # 更新位置并在边界处反弹
+        limit = np.array([self.width, self.height]) - self._size
+        self._pos += self._vel
+        bounced = (self._pos < 0) | (self._pos > limit)
+        self._vel[bounced] *= -1
+        np.clip(self._pos, 0, limit, out=self._pos)
+        
+        np.copyto(self._frame, self._background)
+        for x, y in self._pos.astype(int):
+            self._frame[y:y + self._size[1], x:x + self._size[0]] = (180, 160, 140)
+        
+        if self._depth_buffer is not None:
+            self._depth_buffer.fill(self._background_depth)
+            for (x, y), distance in zip(self._pos.astype(int), self.person_depths):
+                self._depth_buffer[y:y + self._size[1], x:x + self._size[0]] = distance
+            self.depth = self._depth_buffer
+        self.last_timings = {"grab": time.perf_counter() - t0, "convert": 0.0}
+        return self._frame
+
+
+def create_frame_source(config) -> FrameSource:
+    """
+    根据检测配置创建帧来源
+    
+    Args:
+        config: DetectionConfig 对象，使用其中 frame_source* 字段
+        
+    Returns:
+        FrameSource 实例
+    """
+    kind = config.frame_source
+    if kind == "zed":
+        return ZedFrameSource(camera_id=config.frame_source_camera_id, depth=config.depth_filtering)
+    if kind == "video":
+        return VideoFileFrameSource(
+            config.frame_source_path,
+            realtime=config.frame_source_realtime,
+            loop=config.frame_source_loop
+        )
+    if kind == "images":
+        return ImageFolderFrameSource(
+            config.frame_source_path,
+            fps=config.frame_source_fps,
+            realtime=config.frame_source_realtime,
+            loop=config.frame_source_loop
+        )
+    if kind == "synthetic":
+        return SyntheticFrameSource(
+            fps=config.frame_source_fps,
+            realtime=config.frame_source_realtime,
+            depth=config.depth_filtering
+        )
+    raise ValueError(f"Unknown frame source: {kind}")
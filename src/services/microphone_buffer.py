@@ -0,0 +1,132 @@
+"""
+麦克风环形缓冲区模块
+在 PortAudio 回调线程中持续把麦克风音频写入固定大小的NumPy环形缓冲区，
+录音请求可以从请求到达之前的预录点开始读取，避免访客抢先开口时丢失开头的音节
+"""
+import threading
+from typing import Optional
+import numpy as np
+
+
+class MicrophoneRingBuffer:
+    """
+    常开麦克风环形缓冲区
+
+    位置以自启动以来的样本总数表示（单调递增），样本 p 存放在缓冲区下标 p % capacity 处；
+    capacity 为 frame_length 的整数倍，因此从帧边界开始的帧不会跨越缓冲区末尾，可以直接返回视图。
+    回调中只做切片赋值，运行期间不分配新数组，内存占用固定为 capacity × channels × 2 字节。
+    """
+
+    def __init__(self, sample_rate: int, channels: int, seconds: float, frame_length: int):
+        """
+        Args:
+            sample_rate: 采样率
+            channels: 声道数
+            seconds: 缓冲区时长（秒），向上取整到帧长的整数倍
+            frame_length: 帧长（样本数），也是音频流的块大小
+        """
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frame_length = frame_length
+        frames = max(1, int(np.ceil(seconds * sample_rate / frame_length)))
+        self.capacity = frames * frame_length
+        self.buffer = np.zeros((self.capacity, channels), dtype=np.int16)
+        self.overflows = 0
+
+        self._written = 0
+        self._condition = threading.Condition()
+        self._stream = None
+
+    @property
+    def running(self) -> bool:
+        return self._stream is not None
+
+    @property
+    def position(self) -> int:
+        """已写入的样本总数"""
+        return self._written
+
+    @property
+    def oldest(self) -> int:
+        """缓冲区中仍可读取的最早样本位置"""
+        return max(self._written - self.capacity, 0)
+
+    def start(self):
+        """打开麦克风并开始持续录音"""
+        if self._stream is not None:
+            return
+        import sounddevice as sd
+
+        self._stream = sd.InputStream(
+            samplerate=self.sample_rate, channels=self.channels, dtype="int16",
+            blocksize=self.frame_length, callback=self._callback
+        )
+        self._stream.start()
+        print(f"Microphone capture started ({self.capacity / self.sample_rate:.1f}s ring buffer)")
+
+    def stop(self):
+        """停止录音并关闭麦克风，唤醒所有等待者"""
+        if self._stream is None:
+            return
+        stream, self._stream = self._stream, None
+        stream.stop()
+        stream.close()
+        with self._condition:
+            self._condition.notify_all()
+
+    def _callback(self, indata, frames, time_info, status):
+        if status.input_overflow:
+            self.overflows += 1
+        offset = self._written % self.capacity
+        first = min(frames, self.capacity - offset)
+        self.buffer[offset:offset + first] = indata[:first]
+        if first < frames:
+            self.buffer[:frames - first] = indata[first:]
+        with self._condition:
+            self._written += frames
+            self._condition.notify_all()
+
+    def wait_for(self, position: int, timeout: Optional[float] = None) -> bool:
+        """
+        等待直到至少写入 position 个样本
+
+        Returns:
+            是否已写入；超时或录音已停止时返回False
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._written >= position or self._stream is None, timeout=timeout
+            ) and self._written >= position
+
+    def frame(self, start: int) -> np.ndarray:
+        """
+        返回从帧边界 start 开始的一帧的视图（不拷贝）；调用方需保证该帧已写入且未被覆盖
+        """
+        offset = start % self.capacity
+        return self.buffer[offset:offset + self.frame_length]
+
+    def read(self, start: int, end: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        拷贝 [start, end) 区间的样本
+
+        Args:
+            start: 起始位置
+            end: 结束位置（不含）
+            out: 可选，写入的数组，长度至少为 end - start
+
+        Returns:
+            形状为 (end - start, channels) 的数组
+        """
+        if start < self.oldest:
+            raise ValueError(f"Samples from {start} have been overwritten (oldest is {self.oldest})")
+        length = end - start
+        if out is None:
+            out = np.empty((length, self.channels), dtype=np.int16)
+        else:
+            out = out[:length]
+        offset = start % self.capacity
+        first = min(length, self.capacity - offset)
+        out[:first] = self.buffer[offset:offset + first]
+        if first < length:
+            out[first:] = self.buffer[:length - first]
+        return out
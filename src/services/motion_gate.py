@@ -0,0 +1,94 @@
+"""
+运动门控模块
+在缩小的灰度图上做帧差，判断各展品区域自上次推理以来是否发生变化，从而跳过不必要的YOLO推理
+"""
+import time
+import cv2
+import numpy as np
+from typing import Optional
+from .exhibit_regions import ExhibitRegions
+from .frame_buffers import BufferPool
+
+
+class MotionGate:
+    """基于帧差的逐区域变化检测器"""
+    
+    def __init__(self, regions: ExhibitRegions, width: int = 160, pixel_threshold: int = 25,
+                 changed_fraction: float = 0.01, refresh_interval: float = 10.0):
+        """
+        初始化运动门控
+        
+        Args:
+            regions: 展品区域
+            width: 缩小后灰度图的宽度（像素）
+            pixel_threshold: 灰度差超过该值的像素视为变化
+            changed_fraction: 区域内变化像素比例达到该值时需要重新推理
+            refresh_interval: 距上次推理超过该时间（秒）时强制重新推理
+        """
+        self.regions = regions
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.changed_fraction = changed_fraction
+        self.refresh_interval = refresh_interval
+        
+        self._reference: Optional[np.ndarray] = None
+        self._last_inference = -np.inf
+        self._current: Optional[np.ndarray] = None
+        self._region_masks: Optional[np.ndarray] = None
+        self._region_pixels: Optional[np.ndarray] = None
+        self.buffers = BufferPool()
+    
+    def _build_masks(self, height: int, width: int):
+        """在缩小后的像素网格上预计算各区域的掩码，形状为 (H*W, R)"""
+        ys, xs = np.mgrid[0:height, 0:width]
+        points = np.stack([(xs.ravel() + 0.5) / width, (ys.ravel() + 0.5) / height], axis=1)
+        masks = self.regions.contains(points.astype(np.float32))
+        self._region_masks = masks.astype(np.float32)
+        self._region_pixels = np.maximum(masks.sum(axis=0), 1).astype(np.float32)
+    
+    def changed_regions(self, frame: np.ndarray, timestamp: Optional[float] = None) -> np.ndarray:
+        """
+        判断各区域相对上次推理时的画面是否发生变化
+        
+        Args:
+            frame: BGR图像数组
+            timestamp: 帧时间戳（秒），默认为当前时间
+            
+        Returns:
+            长度为区域数量的布尔数组，True表示该区域需要重新推理
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        
+        # 先缩小再转灰度，避免在全分辨率上分配灰度图；中间结果均写入预分配缓冲区
+        height = max(1, round(frame.shape[0] * self.width / frame.shape[1]))
+        small = self.buffers.get("small", (height, self.width, 3))
+        cv2.resize(frame, (self.width, height), dst=small, interpolation=cv2.INTER_AREA)
+        if self._current is None or self._current.shape != (height, self.width):
+            self._current = np.empty((height, self.width), dtype=np.uint8)
+        cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self._current)
+        
+        if self._region_masks is None or self._region_masks.shape[0] != self._current.size:
+            self._build_masks(height, self.width)
+            self._reference = None
+        
+        if self._reference is None or timestamp - self._last_inference >= self.refresh_interval:
+            return np.ones(len(self.regions), dtype=bool)
+        
+        diff = self.buffers.get("diff", self._current.shape)
+        cv2.absdiff(self._current, self._reference, dst=diff)
+        cv2.threshold(diff, self.pixel_threshold, 1, cv2.THRESH_BINARY, dst=diff)
+        changed = self.buffers.get("changed", (diff.size,), np.float32)
+        np.copyto(changed, diff.reshape(-1))
+        changed_pixels = changed @ self._region_masks
+        return changed_pixels / self._region_pixels >= self.changed_fraction
+    
+    def mark_inferred(self, timestamp: Optional[float] = None):
+        """记录本帧已推理，将其作为后续帧差的参考帧（与当前帧缓冲区交换，不拷贝）"""
+        self._reference, self._current = self._current, self._reference
+        self._last_inference = time.time() if timestamp is None else timestamp
+    
+    def reset(self):
+        """清除参考帧，下一帧将强制推理"""
+        self._reference = None
+        self._last_inference = -np.inf
@@ -0,0 +1,130 @@
+"""
+占用热力图模块
+在降采样网格上累积访客落脚点，按半衰期指数衰减，并定期保存为 .npz 文件
+"""
+import math
+import os
+import time
+import numpy as np
+from typing import Optional
+
+# 缩放因子超过该值时做一次整体归一化，避免浮点溢出
+_RENORMALIZE_SCALE = 1e12
+_RENORMALIZE_EXPONENT = math.log(_RENORMALIZE_SCALE)
+
+
+class OccupancyHeatmap:
+    """
+    指数衰减的访客热力图
+
+    衰减不逐帧作用于整张网格：新增量按 exp((t - t0) / tau) 放大后累加，读取时再整体缩小，
+    因此每帧开销只与人员框数量有关。
+    """
+    
+    def __init__(self, width: int = 64, height: int = 36, half_life: float = 3600.0):
+        """
+        Args:
+            width: 网格列数
+            height: 网格行数
+            half_life: 热度衰减的半衰期（秒）
+        """
+        self.width = width
+        self.height = height
+        self.half_life = half_life
+        self._tau = half_life / math.log(2.0)
+        self._grid = np.zeros((height, width), dtype=np.float64)
+        self._t0: Optional[float] = None
+        self.last_timestamp: Optional[float] = None
+    
+    def add_points(self, points: np.ndarray, timestamp: float, weight: float = 1.0):
+        """
+        累加一帧的访客位置
+        
+        Args:
+            points: 归一化落脚点坐标，形状为 (N, 2)
+            timestamp: 帧时间戳（秒）
+            weight: 每个点的权重，例如距上一帧的时长
+        """
+        if self._t0 is None:
+            self._t0 = timestamp
+        self.last_timestamp = timestamp
+        # 先判断指数再求 exp：长时间无人或从很旧的检查点恢复时，exp 会溢出
+        exponent = (timestamp - self._t0) / self._tau
+        if exponent > _RENORMALIZE_EXPONENT:
+            self._rebase(timestamp)
+            exponent = 0.0
+        if len(points) == 0:
+            return
+        
+        scale = math.exp(exponent)
+        cols = np.clip((points[:, 0] * self.width).astype(np.intp), 0, self.width - 1)
+        rows = np.clip((points[:, 1] * self.height).astype(np.intp), 0, self.height - 1)
+        np.add.at(self._grid, (rows, cols), weight * scale)
+    
+    def _rebase(self, timestamp: float):
+        """把网格衰减到 timestamp 并以其为新的基准时刻（exp(-x) 下溢为0，不会溢出）"""
+        self._grid *= math.exp(-(timestamp - self._t0) / self._tau)
+        self._t0 = timestamp
+    
+    def snapshot(self, timestamp: Optional[float] = None) -> np.ndarray:
+        """
+        获取衰减到指定时刻的热力图
+        
+        Args:
+            timestamp: 时刻（秒），默认为最近一次累加的时间
+            
+        Returns:
+            形状为 (height, width) 的float32数组
+        """
+        if self._t0 is None:
+            return np.zeros((self.height, self.width), dtype=np.float32)
+        if timestamp is None:
+            timestamp = self.last_timestamp
+        return (self._grid * math.exp(-(timestamp - self._t0) / self._tau)).astype(np.float32)
+    
+    def save(self, path: str, timestamp: Optional[float] = None):
+        """
+        保存热力图检查点（先写临时文件再替换，避免读到半写的文件）
+        
+        Args:
+            path: .npz 文件路径
+            timestamp: 时刻（秒），默认为最近一次累加的时间
+        """
+        if timestamp is None:
+            timestamp = self.last_timestamp or 0.0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            heatmap=self.snapshot(timestamp),
+            timestamp=timestamp,
+            half_life=self.half_life
+        )
+        os.replace(tmp_path, path)
+    
+    @staticmethod
+    def load_checkpoint(path: str):
+        """
+        读取热力图检查点
+        
+        Returns:
+            (热力图数组, 时间戳) 元组
+        """
+        with np.load(path) as data:
+            return data["heatmap"], float(data["timestamp"])
+    
+    def restore(self, path: str):
+        """从检查点恢复累积结果（网格尺寸不一致时忽略）"""
+        heatmap, timestamp = self.load_checkpoint(path)
+        if heatmap.shape != self._grid.shape:
+            print(f"Ignoring heatmap checkpoint {path}: shape {heatmap.shape} != {self._grid.shape}")
+            return
+        self._grid = heatmap.astype(np.float64)
+        self._t0 = timestamp
+        # 检查点可能已很旧，恢复时先衰减到当前时刻
+        now = time.time()
+        if now > timestamp:
+            self._rebase(now)
+        self.last_timestamp = self._t0
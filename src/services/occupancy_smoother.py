@@ -0,0 +1,76 @@
+"""
+占用状态平滑模块
+对每个展品的逐帧检测置信度做滑动平均，并通过双阈值和最短保持时间避免状态抖动
+"""
+import time
+import numpy as np
+from typing import Optional
+
+
+class OccupancySmoother:
+    """基于环形缓冲区的逐展品占用状态平滑器"""
+    
+    def __init__(self, num_regions: int, window: int = 5, enter_threshold: float = 0.3,
+                 exit_threshold: float = 0.15, min_hold: float = 1.0):
+        """
+        初始化平滑器
+        
+        Args:
+            num_regions: 展品区域数量
+            window: 环形缓冲区长度（帧数）
+            enter_threshold: 平滑得分达到该值时判定为占用
+            exit_threshold: 平滑得分降到该值时判定为空闲
+            min_hold: 状态切换后的最短保持时间（秒）
+        """
+        if window < 1:
+            raise ValueError("Smoothing window must be at least 1 frame")
+        if exit_threshold > enter_threshold:
+            raise ValueError("exit_threshold must not exceed enter_threshold")
+        
+        self.window = window
+        self.enter_threshold = enter_threshold
+        self.exit_threshold = exit_threshold
+        self.min_hold = min_hold
+        
+        # 每行为一帧中各区域的最大人员置信度，未观测到时为0
+        self._buffer = np.zeros((window, num_regions), dtype=np.float32)
+        self._index = 0
+        self.state = np.zeros(num_regions, dtype=bool)
+        self.scores = np.zeros(num_regions, dtype=np.float32)
+        self._last_change = np.full(num_regions, -np.inf)
+    
+    def update(self, confidences: np.ndarray, timestamp: Optional[float] = None) -> np.ndarray:
+        """
+        写入一帧的各区域置信度并更新占用状态
+        
+        Args:
+            confidences: 长度为区域数量的数组，各区域本帧的最大人员置信度
+            timestamp: 帧时间戳（秒），默认为当前时间
+            
+        Returns:
+            平滑后的占用状态布尔数组（内部状态的拷贝）
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        
+        self._buffer[self._index] = confidences
+        self._index = (self._index + 1) % self.window
+        np.mean(self._buffer, axis=0, out=self.scores)
+        
+        can_change = (timestamp - self._last_change) >= self.min_hold
+        flip = can_change & np.where(
+            self.state,
+            self.scores <= self.exit_threshold,
+            self.scores >= self.enter_threshold
+        )
+        self.state ^= flip
+        self._last_change[flip] = timestamp
+        return self.state.copy()
+    
+    def reset(self):
+        """清空历史，所有区域恢复为空闲"""
+        self._buffer.fill(0.0)
+        self._index = 0
+        self.state.fill(False)
+        self.scores.fill(0.0)
+        self._last_change.fill(-np.inf)
@@ -0,0 +1,428 @@
+"""
+人员检测后端模块
+封装不同推理后端（ultralytics PyTorch、ONNX Runtime CPU），统一输出人员框和置信度，
+使区域分配、平滑等后处理与具体后端无关
+"""
+import ast
+import os
+import time
+import cv2
+import numpy as np
+from typing import Dict, Optional, Tuple
+from .frame_buffers import BufferPool
+
+
+class PersonDetector:
+    """人员检测器基类"""
+    
+    def __init__(self, confidence_threshold: float = 0.5, imgsz: int = 640):
+        """
+        Args:
+            confidence_threshold: 人员置信度阈值
+            imgsz: 推理输入尺寸（像素）
+        """
+        self.confidence_threshold = confidence_threshold
+        self.imgsz = imgsz
+        # 最近一次 detect() 各阶段耗时（秒）：preprocess、inference、postprocess
+        self.last_timings: Dict[str, float] = {}
+        # 预处理使用的预分配缓冲区
+        self.buffers = BufferPool()
+    
+    def detect(self, frame: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        检测整帧中的人员
+        
+        Args:
+            frame: BGR图像数组
+            
+        Returns:
+            (boxes_xyxy, confidences) 元组，像素坐标，形状分别为 (N, 4) 和 (N,)
+        """
+        raise NotImplementedError
+    
+    def warmup(self, runs: int = 1):
+        """用空白图像做若干次推理，避免首个真实请求承担初始化开销"""
+        dummy = np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+        for _ in range(runs):
+            self.detect(dummy)
+
+
+class UltralyticsPersonDetector(PersonDetector):
+    """基于ultralytics YOLO（PyTorch）的人员检测器"""
+    
+    def __init__(self, model_path: str, confidence_threshold: float = 0.5, imgsz: int = 640):
+        super().__init__(confidence_threshold, imgsz)
+        from ultralytics import YOLO
+        
+        self.model = YOLO(model_path)
+        self.person_class_id = self._find_person_class_id()
+    
+    def _find_person_class_id(self) -> int:
+        """查找模型类别表中 "person" 对应的类别ID"""
+        for class_id, name in self.model.names.items():
+            if name == "person":
+                return int(class_id)
+        raise RuntimeError("Model has no 'person' class")
+    
+    def detect(self, frame: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # 直接传入帧数组（可为帧来源缓冲区的视图），缩放和填充由ultralytics内部完成
+        results = self.model(
+            frame,
+            classes=[self.person_class_id],
+            conf=self.confidence_threshold,
+            imgsz=self.imgsz,
+            verbose=False
+        )
+        speed = results[0].speed
+        self.last_timings = {stage: speed[stage] / 1000.0 for stage in ("preprocess", "inference", "postprocess")}
+        boxes = results[0].boxes
+        return boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy()
+
+
+class OnnxPersonDetector(PersonDetector):
+    """基于ONNX Runtime CPU推理的人员检测器，输入为ultralytics导出的YOLO ONNX模型"""
+    
+    def __init__(self, model_path: str, confidence_threshold: float = 0.5, imgsz: int = 640,
+                 iou_threshold: float = 0.45, intra_op_threads: int = 0):
+        """
+        Args:
+            model_path: ONNX模型路径（可为int8量化模型）
+            confidence_threshold: 人员置信度阈值
+            imgsz: 推理输入尺寸，需与导出时一致
+            iou_threshold: NMS的IoU阈值
+            intra_op_threads: ONNX Runtime算子内线程数，0表示由运行时决定
+        """
+        super().__init__(confidence_threshold, imgsz)
+        import onnxruntime as ort
+        
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # 导出时固定的输入尺寸 (高, 宽)，动态维度为None
+        self.input_size = tuple(d if isinstance(d, int) else None for d in model_input.shape[2:4])
+        if any(d is not None and d != imgsz for d in self.input_size):
+            raise ValueError(
+                f"{model_path} was exported with input size {self.input_size}, "
+                f"but imgsz={imgsz} was requested (export a model with --imgsz {imgsz})"
+            )
+        self.iou_threshold = iou_threshold
+        self.person_class_id = self._find_person_class_id()
+        self._layout: Optional[Tuple[int, int]] = None
+    
+    def _find_person_class_id(self) -> int:
+        """从ultralytics写入的模型元数据中查找 "person" 类别ID，缺省为COCO的0"""
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        names = ast.literal_eval(metadata["names"]) if "names" in metadata else {0: "person"}
+        for class_id, name in names.items():
+            if name == "person":
+                return int(class_id)
+        raise RuntimeError("Model has no 'person' class")
+    
+    def _preprocess(self, frame: np.ndarray) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+        """
+        等比缩放并填充到 imgsz x imgsz，转换为NCHW float32输入
+        
+        缩放结果直接写入预分配的填充画布中对应区域，再一次性完成 BGR→RGB、HWC→CHW 和归一化，
+        写入预分配的输入张量；输入分辨率不变时不分配新内存。返回的张量在下一次调用时被覆盖。
+        
+        Returns:
+            (输入张量, 缩放比例, (左侧填充, 上侧填充)) 元组
+        """
+        height, width = frame.shape[:2]
+        scale = min(self.imgsz / height, self.imgsz / width)
+        new_w, new_h = int(round(width * scale)), int(round(height * scale))
+        pad_x, pad_y = (self.imgsz - new_w) // 2, (self.imgsz - new_h) // 2
+        
+        padded = self.buffers.get("letterbox", (self.imgsz, self.imgsz, 3))
+        if self._layout != (height, width):
+            # 输入分辨率变化时重新填充边框，之后只覆盖中间的图像区域
+            padded.fill(114)
+            self._layout = (height, width)
+        roi = padded[pad_y:pad_y + new_h, pad_x:pad_x + new_w]
+        resized = cv2.resize(frame, (new_w, new_h), dst=roi, interpolation=cv2.INTER_LINEAR)
+        if resized is not roi:
+            # OpenCV未能直接写入视图时退回拷贝
+            np.copyto(roi, resized)
+        
+        blob = self.buffers.get("blob", (1, 3, self.imgsz, self.imgsz), np.float32)
+        np.multiply(padded[..., ::-1].transpose(2, 0, 1), np.float32(1.0 / 255.0), out=blob[0], dtype=np.float32)
+        return blob, scale, (pad_x, pad_y)
+    
+    def _postprocess(self, output: np.ndarray, scale: float, pad: Tuple[int, int],
+                     frame_shape: Tuple[int, ...]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        解码YOLO输出 (1, 4 + 类别数, 锚点数)，仅保留人员类别并做NMS
+        """
+        predictions = output[0]
+        scores = predictions[4 + self.person_class_id]
+        keep = scores >= self.confidence_threshold
+        if not keep.any():
+            return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32)
+        
+        cx, cy, w, h = predictions[:4, keep]
+        scores = scores[keep]
+        boxes_xywh = np.stack([cx - w / 2, cy - h / 2, w, h], axis=1)
+        indices = np.asarray(
+            cv2.dnn.NMSBoxes(boxes_xywh.tolist(), scores.tolist(),
+                             self.confidence_threshold, self.iou_threshold),
+            dtype=np.intp
+        ).reshape(-1)
+        boxes_xywh, scores = boxes_xywh[indices], scores[indices]
+        
+        # 还原到原图像素坐标
+        boxes_xyxy = np.empty_like(boxes_xywh)
+        boxes_xyxy[:, 0] = (boxes_xywh[:, 0] - pad[0]) / scale
+        boxes_xyxy[:, 1] = (boxes_xywh[:, 1] - pad[1]) / scale
+        boxes_xyxy[:, 2] = boxes_xyxy[:, 0] + boxes_xywh[:, 2] / scale
+        boxes_xyxy[:, 3] = boxes_xyxy[:, 1] + boxes_xywh[:, 3] / scale
+        height, width = frame_shape[:2]
+        np.clip(boxes_xyxy[:, 0::2], 0, width, out=boxes_xyxy[:, 0::2])
+        np.clip(boxes_xyxy[:, 1::2], 0, height, out=boxes_xyxy[:, 1::2])
+        return boxes_xyxy.astype(np.float32), scores.astype(np.float32)
+    
+    def detect(self, frame: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        t0 = time.perf_counter()
+        blob, scale, pad = self._preprocess(frame)
+        t1 = time.perf_counter()
+        output = self.session.run(None, {self.input_name: blob})[0]
+        t2 = time.perf_counter()
+        detections = self._postprocess(output, scale, pad, frame.shape)
+        t3 = time.perf_counter()
+        self.last_timings = {"preprocess": t1 - t0, "inference": t2 - t1, "postprocess": t3 - t2}
+        return detections
+
+
+class CoarseToFineDetector(PersonDetector):
+    """
+    粗到细多尺度人员检测器
+
+    先对整帧做一次低分辨率推理；置信度接近阈值（confidence_threshold ± margin）的人员框视为不确定，
+    在其周围裁剪原始分辨率的图像窗口再推理一次，以更高的有效分辨率确认远处的小目标。
+    置信度明显高于阈值的结果直接采用，明显低于阈值的结果直接丢弃。
+    """
+    
+    def __init__(self, detector: PersonDetector, confidence_threshold: float = 0.5, margin: float = 0.15,
+                 coarse_imgsz: Optional[int] = None, crop_context: float = 1.0, max_crops: int = 4,
+                 iou_threshold: float = 0.45):
+        """
+        Args:
+            detector: 底层检测器，两次推理共用（其置信度阈值会被设为 confidence_threshold - margin）
+            confidence_threshold: 最终的人员置信度阈值
+            margin: 不确定区间的半宽
+            coarse_imgsz: 整帧推理的输入尺寸，为None时与底层检测器相同（仅ultralytics后端支持不同尺寸）
+            crop_context: 裁剪窗口在人员框四周各扩展的比例（相对框的宽高）
+            max_crops: 每帧最多裁剪的窗口数，超出的不确定框直接按阈值判断
+            iou_threshold: 合并粗、细两次结果时NMS的IoU阈值
+        """
+        super().__init__(confidence_threshold, detector.imgsz)
+        self.detector = detector
+        self.detector.confidence_threshold = max(confidence_threshold - margin, 0.01)
+        self.margin = margin
+        self.coarse_imgsz = coarse_imgsz or detector.imgsz
+        self.crop_context = crop_context
+        self.max_crops = max_crops
+        self.iou_threshold = iou_threshold
+        self.buffers = detector.buffers
+        # 最近一次 detect() 裁剪的窗口数
+        self.last_crops = 0
+    
+    def _run(self, image: np.ndarray, imgsz: int) -> Tuple[np.ndarray, np.ndarray]:
+        """用指定输入尺寸推理一次，并累加各阶段耗时"""
+        original = self.detector.imgsz
+        self.detector.imgsz = imgsz
+        try:
+            boxes, confidences = self.detector.detect(image)
+        finally:
+            self.detector.imgsz = original
+        for stage, elapsed in self.detector.last_timings.items():
+            self.last_timings[stage] = self.last_timings.get(stage, 0.0) + elapsed
+        return boxes, confidences
+    
+    def _crop_windows(self, boxes_xyxy: np.ndarray, frame_shape: Tuple[int, ...]):
+        """
+        为不确定的人员框生成裁剪窗口，重叠的窗口合并为外接矩形
+
+        Returns:
+            (窗口列表 [(x1, y1, x2, y2), ...], 每个框所属窗口下标，未分配为-1) 元组
+        """
+        height, width = frame_shape[:2]
+        sizes = boxes_xyxy[:, 2:] - boxes_xyxy[:, :2]
+        # 窗口至少为输入尺寸的一半，保证有足够的上下文
+        half = np.maximum(sizes * (0.5 + self.crop_context), self.imgsz / 4)
+        centers = (boxes_xyxy[:, :2] + boxes_xyxy[:, 2:]) * 0.5
+        candidates = np.concatenate([centers - half, centers + half], axis=1)
+        np.clip(candidates[:, 0::2], 0, width, out=candidates[:, 0::2])
+        np.clip(candidates[:, 1::2], 0, height, out=candidates[:, 1::2])
+        
+        windows = []
+        owner = np.full(len(boxes_xyxy), -1, dtype=np.intp)
+        for i, (x1, y1, x2, y2) in enumerate(candidates.astype(int).tolist()):
+            for j, (wx1, wy1, wx2, wy2) in enumerate(windows):
+                if x1 < wx2 and wx1 < x2 and y1 < wy2 and wy1 < y2:
+                    windows[j] = (min(x1, wx1), min(y1, wy1), max(x2, wx2), max(y2, wy2))
+                    owner[i] = j
+                    break
+            else:
+                if len(windows) < self.max_crops:
+                    owner[i] = len(windows)
+                    windows.append((x1, y1, x2, y2))
+        return windows, owner
+    
+    def detect(self, frame: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        self.last_timings = {}
+        boxes, confidences = self._run(frame, self.coarse_imgsz)
+        
+        certain = confidences >= self.confidence_threshold + self.margin
+        uncertain = np.flatnonzero(~certain)
+        # 置信度高的不确定框优先获得裁剪窗口
+        uncertain = uncertain[np.argsort(-confidences[uncertain])]
+        windows, owner = self._crop_windows(boxes[uncertain], frame.shape)
+        self.last_crops = len(windows)
+        
+        # 未分配到窗口的不确定框直接按阈值判断
+        leftover = uncertain[(owner < 0) & (confidences[uncertain] >= self.confidence_threshold)]
+        keep = np.concatenate([np.flatnonzero(certain), leftover])
+        all_boxes, all_confidences = [boxes[keep]], [confidences[keep]]
+        
+        for x1, y1, x2, y2 in windows:
+            # 以原始分辨率的图像视图送入检测器
+            crop_boxes, crop_confidences = self._run(frame[y1:y2, x1:x2], self.imgsz)
+            confident = crop_confidences >= self.confidence_threshold
+            all_boxes.append(crop_boxes[confident] + np.array([x1, y1, x1, y1], dtype=np.float32))
+            all_confidences.append(crop_confidences[confident])
+        
+        boxes = np.concatenate(all_boxes).astype(np.float32)
+        confidences = np.concatenate(all_confidences).astype(np.float32)
+        if windows and len(boxes) > 1:
+            # 去除粗、细两次推理以及相邻窗口之间的重复框
+            boxes_xywh = np.concatenate([boxes[:, :2], boxes[:, 2:] - boxes[:, :2]], axis=1)
+            indices = np.asarray(
+                cv2.dnn.NMSBoxes(boxes_xywh.tolist(), confidences.tolist(),
+                                 self.confidence_threshold, self.iou_threshold),
+                dtype=np.intp
+            ).reshape(-1)
+            boxes, confidences = boxes[indices], confidences[indices]
+        return boxes, confidences
+
+
+def create_person_detector(config) -> PersonDetector:
+    """
+    根据检测配置创建人员检测器并预热；config.adaptive_inference 为True时包装为粗到细多尺度检测器
+    
+    Args:
+        config: DetectionConfig 对象
+        
+    Returns:
+        PersonDetector 实例
+    """
+    backend = config.detector_backend
+    if backend == "ultralytics":
+        detector = UltralyticsPersonDetector(
+            config.yolo_model_path,
+            confidence_threshold=config.confidence_threshold,
+            imgsz=config.inference_imgsz
+        )
+    elif backend == "onnxruntime":
+        detector = OnnxPersonDetector(
+            config.onnx_model_path,
+            confidence_threshold=config.confidence_threshold,
+            imgsz=config.inference_imgsz,
+            iou_threshold=config.nms_iou_threshold,
+            intra_op_threads=config.onnx_intra_op_threads
+        )
+    else:
+        raise ValueError(f"Unknown detector backend: {backend}")
+    
+    if config.warmup_runs > 0:
+        detector.warmup(config.warmup_runs)
+    
+    if config.adaptive_inference:
+        coarse_imgsz = config.adaptive_coarse_imgsz or None
+        if coarse_imgsz and backend != "ultralytics" and coarse_imgsz != config.inference_imgsz:
+            raise ValueError("adaptive_coarse_imgsz requires the ultralytics backend (ONNX input size is fixed)")
+        detector = CoarseToFineDetector(
+            detector,
+            confidence_threshold=config.confidence_threshold,
+            margin=config.adaptive_margin,
+            coarse_imgsz=coarse_imgsz,
+            crop_context=config.adaptive_crop_context,
+            max_crops=config.adaptive_max_crops,
+            iou_threshold=config.nms_iou_threshold
+        )
+    return detector
+
+
+def onnx_model_path(weights: str, imgsz: int, int8: bool = False) -> str:
+    """
+    导出的ONNX模型路径，文件名包含输入尺寸，例如 yolo11n.pt -> yolo11n-640.onnx
+    
+    Args:
+        weights: .pt 权重路径
+        imgsz: 导出的固定输入尺寸
+        int8: 是否为int8量化模型（*-int8.onnx）
+    """
+    return f"{os.path.splitext(weights)[0]}-{imgsz}{'-int8' if int8 else ''}.onnx"
+
+
+def export_onnx(weights: str, imgsz: int = 640, int8: bool = False,
+                calibration_images: Optional[str] = None, calibration_count: int = 32) -> str:
+    """
+    将ultralytics .pt 权重导出为ONNX模型，可选int8静态量化
+    
+    Args:
+        weights: .pt 权重路径，例如 yolo11n.pt
+        imgsz: 导出的固定输入尺寸
+        int8: 是否额外生成int8量化模型
+        calibration_images: 量化校准图片目录或通配符
+        calibration_count: 最多使用的校准图片数
+        
+    Returns:
+        最终ONNX模型路径（见 onnx_model_path，量化时为 *-<imgsz>-int8.onnx）
+    """
+    from ultralytics import YOLO
+    
+    exported = YOLO(weights).export(format="onnx", imgsz=imgsz, dynamic=False, simplify=True)
+    # 不同输入尺寸导出到不同文件，避免互相覆盖
+    onnx_path = onnx_model_path(weights, imgsz)
+    os.replace(exported, onnx_path)
+    print(f"Exported ONNX model to {onnx_path}")
+    if not int8:
+        return onnx_path
+    
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    )
+    from .frame_sources import ImageFolderFrameSource
+    
+    if calibration_images is None:
+        raise ValueError("int8 quantization requires calibration images")
+    
+    helper = OnnxPersonDetector(onnx_path, imgsz=imgsz)
+    files = ImageFolderFrameSource.find_images(calibration_images)[:calibration_count]
+    
+    class _ImageReader(CalibrationDataReader):
+        def __init__(self):
+            self._files = iter(files)
+        
+        def get_next(self):
+            filename = next(self._files, None)
+            if filename is None:
+                return None
+            blob, _, _ = helper._preprocess(cv2.imread(filename))
+            return {helper.input_name: blob.copy()}
+    
+    int8_path = onnx_model_path(weights, imgsz, int8=True)
+    quantize_static(
+        onnx_path, int8_path, _ImageReader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8
+    )
+    print(f"Quantized int8 model saved to {int8_path} ({len(files)} calibration images)")
+    return int8_path
@@ -0,0 +1,233 @@
+"""
+人员跟踪模块
+用向量化的IoU/质心匹配在帧间关联人员框并分配ID，
+进而统计每个展品前访客的停留时间，并估计展品预计多久后空闲
+"""
+from collections import deque
+from typing import Dict, Tuple
+import numpy as np
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """计算两组xyxy框的IoU矩阵 (len(a), len(b))"""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def _mutual_best_matches(score: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    贪心匹配：反复接受互为最佳（行、列均取最大值）的配对，直到没有可匹配的项
+
+    每轮至少接受全局最大值所在的配对，人数较少时通常一到三轮即可完成。
+
+    Args:
+        score: (T, N) 得分矩阵，越大越好，不可匹配的项为 -inf（会被原地修改）
+
+    Returns:
+        (行索引, 列索引) 数组
+    """
+    rows, cols = [], []
+    track_index = np.arange(score.shape[0])
+    while True:
+        best_col = score.argmax(axis=1)
+        best_row = score.argmax(axis=0)
+        mutual = (best_row[best_col] == track_index) & np.isfinite(score[track_index, best_col])
+        if not mutual.any():
+            break
+        matched_rows, matched_cols = track_index[mutual], best_col[mutual]
+        rows.append(matched_rows)
+        cols.append(matched_cols)
+        score[matched_rows, :] = -np.inf
+        score[:, matched_cols] = -np.inf
+    if not rows:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    return np.concatenate(rows), np.concatenate(cols)
+
+
+class PersonTracker:
+    """
+    轻量级多目标跟踪器
+
+    先按IoU匹配轨迹与检测框，剩余的再按质心距离（相对轨迹框对角线长度）匹配，
+    以覆盖帧间移动较大的人员；未匹配的检测框创建新轨迹，超过 max_age 秒未出现的轨迹被删除。
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_age: float = 1.0, distance_threshold: float = 0.5):
+        """
+        Args:
+            iou_threshold: IoU匹配的最小IoU
+            max_age: 轨迹未被匹配的最长保留时间（秒）
+            distance_threshold: 质心匹配的最大距离，相对轨迹框对角线长度
+        """
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.distance_threshold = distance_threshold
+
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.last_seen = np.zeros(0, dtype=np.float64)
+        self._next_id = 1
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _match(self, boxes_xyxy: np.ndarray) -> np.ndarray:
+        """
+        Returns:
+            长度为 N 的数组，每个检测框匹配到的轨迹下标，未匹配为-1
+        """
+        assigned = np.full(len(boxes_xyxy), -1, dtype=np.intp)
+        if len(self.ids) == 0 or len(boxes_xyxy) == 0:
+            return assigned
+
+        iou = box_iou(self.boxes, boxes_xyxy)
+        rows, cols = _mutual_best_matches(np.where(iou >= self.iou_threshold, iou, -np.inf))
+        assigned[cols] = rows
+
+        free_tracks = np.ones(len(self.ids), dtype=bool)
+        free_tracks[rows] = False
+        free_boxes = assigned < 0
+        if free_tracks.any() and free_boxes.any():
+            track_centers = (self.boxes[:, :2] + self.boxes[:, 2:]) * 0.5
+            box_centers = (boxes_xyxy[:, :2] + boxes_xyxy[:, 2:]) * 0.5
+            diagonals = np.maximum(np.hypot(*(self.boxes[:, 2:] - self.boxes[:, :2]).T), 1e-6)
+            distance = np.hypot(*(track_centers[:, None, :] - box_centers[None, :, :]).transpose(2, 0, 1))
+            distance /= diagonals[:, None]
+            valid = (distance <= self.distance_threshold) & free_tracks[:, None] & free_boxes[None, :]
+            rows, cols = _mutual_best_matches(np.where(valid, -distance, -np.inf))
+            assigned[cols] = rows
+        return assigned
+
+    def update(self, boxes_xyxy: np.ndarray, timestamp: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        用一帧检测结果更新轨迹
+
+        Args:
+            boxes_xyxy: 像素坐标人员框 (N, 4)
+            timestamp: 帧时间戳（秒）
+
+        Returns:
+            (各检测框的轨迹ID (N,), 本帧删除的轨迹ID) 元组
+        """
+        assigned = self._match(boxes_xyxy)
+        matched = assigned >= 0
+        self.boxes[assigned[matched]] = boxes_xyxy[matched]
+        self.last_seen[assigned[matched]] = timestamp
+
+        track_ids = np.empty(len(boxes_xyxy), dtype=np.int64)
+        track_ids[matched] = self.ids[assigned[matched]]
+        new_count = int(np.count_nonzero(~matched))
+        if new_count:
+            new_ids = np.arange(self._next_id, self._next_id + new_count, dtype=np.int64)
+            self._next_id += new_count
+            track_ids[~matched] = new_ids
+            self.ids = np.concatenate([self.ids, new_ids])
+            self.boxes = np.concatenate([self.boxes, boxes_xyxy[~matched].astype(np.float32)])
+            self.last_seen = np.concatenate([self.last_seen, np.full(new_count, timestamp)])
+
+        alive = timestamp - self.last_seen <= self.max_age
+        removed = self.ids[~alive]
+        if len(removed):
+            self.ids, self.boxes, self.last_seen = self.ids[alive], self.boxes[alive], self.last_seen[alive]
+        return track_ids, removed
+
+    def touch(self, timestamp: float):
+        """画面未变化（跳过推理）时调用，视所有轨迹在本帧仍然可见"""
+        self.last_seen[:] = timestamp
+
+    def reset(self):
+        """清除所有轨迹"""
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.boxes = np.zeros((0, 4), dtype=np.float32)
+        self.last_seen = np.zeros(0, dtype=np.float64)
+
+
+class ExhibitDwell:
+    """
+    按展品统计访客停留时间
+
+    记录每条轨迹进入当前展品区域的时刻；轨迹离开区域或消失时，把完整的停留时长加入该展品的历史样本。
+    预计剩余停留时间取历史样本中比当前已停留时间更长者的平均剩余时长（平均剩余寿命），
+    样本不足时使用先验平均停留时间。
+    """
+
+    def __init__(self, num_regions: int, prior: float = 60.0, history: int = 200,
+                 min_sample: float = 2.0):
+        """
+        Args:
+            num_regions: 展品区域数量
+            prior: 没有足够历史样本时假设的平均停留时间（秒）
+            history: 每个展品保留的停留时长样本数
+            min_sample: 短于该时长（秒）的停留视为路过或误检，不计入样本
+        """
+        self.num_regions = num_regions
+        self.prior = prior
+        self.min_sample = min_sample
+        self._samples = [deque(maxlen=history) for _ in range(num_regions)]
+        # 轨迹ID -> (展品区域下标, 进入时刻)
+        self._visits: Dict[int, Tuple[int, float]] = {}
+
+    def _finish(self, track_id: int, timestamp: float):
+        region, since = self._visits.pop(track_id)
+        duration = timestamp - since
+        if duration >= self.min_sample:
+            self._samples[region].append(duration)
+
+    def update(self, track_ids: np.ndarray, membership: np.ndarray, removed_ids: np.ndarray,
+               timestamp: float):
+        """
+        更新各轨迹所在的展品区域
+
+        Args:
+            track_ids: 各检测框的轨迹ID (N,)
+            membership: (N, R) 布尔矩阵，人员所在的展品区域
+            removed_ids: 本帧被删除的轨迹ID
+            timestamp: 帧时间戳（秒）
+        """
+        for track_id in removed_ids.tolist():
+            if track_id in self._visits:
+                self._finish(track_id, timestamp)
+
+        # 每个人取所在的第一个区域，不在任何区域内为-1
+        regions = np.where(membership.any(axis=1), membership.argmax(axis=1), -1) if len(track_ids) else []
+        for track_id, region in zip(track_ids.tolist(), np.asarray(regions).tolist()):
+            visit = self._visits.get(track_id)
+            if visit is not None and visit[0] == region:
+                continue
+            if visit is not None:
+                self._finish(track_id, timestamp)
+            if region >= 0:
+                self._visits[track_id] = (region, timestamp)
+
+    def expected_remaining(self, region: int, dwell: float) -> float:
+        """
+        估计已停留 dwell 秒的访客在该展品前还会停留多久（秒）
+        """
+        samples = np.fromiter(self._samples[region], dtype=np.float64)
+        longer = samples[samples > dwell]
+        if len(longer):
+            return float(longer.mean() - dwell)
+        # 没有更长的历史样本：按先验估计，且不低于先验的四分之一
+        return max(self.prior - dwell, self.prior * 0.25)
+
+    def summary(self, timestamp: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            (各展品当前访客的最长停留时间 (R,), 各展品预计空闲前的剩余时间 (R,)) 元组，
+            无人的展品均为0
+        """
+        dwell = np.zeros(self.num_regions)
+        remaining = np.zeros(self.num_regions)
+        for region, since in self._visits.values():
+            elapsed = timestamp - since
+            dwell[region] = max(dwell[region], elapsed)
+            remaining[region] = max(remaining[region], self.expected_remaining(region, elapsed))
+        return dwell, remaining
+
+    def reset(self):
+        """清除当前访客（保留历史样本）"""
+        self._visits.clear()
@@ -1,15 +1,18 @@
 """
 语音识别服务模块
-使用Whisper模型进行语音转文字功能
+使用Whisper模型进行语音转文字功能，推理后端可选 openai-whisper 或 faster-whisper（见 asr_backends）
+
+sounddevice、scipy、whisper、torch、faster_whisper 均在使用处导入，导入本模块不会加载这些依赖
 """
-import sounddevice as sd
-from scipy.io.wavfile import write
-import whisper
 import os
-import sys
-import torch
-from typing import Tuple, Optional
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Tuple, Optional
 from ..utils.config import speech_config
+from .asr_backends import MODEL_SAMPLE_RATE, AsrBackend, create_asr_backend
+from .microphone_buffer import MicrophoneRingBuffer
+from .voice_activity import UtteranceEndpointer, create_vad
 
 
 class SpeechRecognitionService:
@@ -23,17 +26,63 @@ class SpeechRecognitionService:
             config: 语音识别配置对象，如果为None则使用默认配置
         """
         self.config = config or speech_config
-        self.model: Optional[whisper.Whisper] = None
+        self.backend: Optional[AsrBackend] = None
         self._model_loaded = False
+        self._model_lock = threading.Lock()
+        self._vad = None
+        self._save_executor: Optional[ThreadPoolExecutor] = None
+        self._microphone: Optional[MicrophoneRingBuffer] = None
+        self._microphone_lock = threading.Lock()
     
     def _load_model(self):
-        """延迟加载Whisper模型"""
-        if not self._model_loaded:
-            print("Loading Whisper model...")
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-            print(f"Using device: {device}")
-            self.model = whisper.load_model(self.config.whisper_model, device=device)
-            self._model_loaded = True
+        """延迟加载语音识别模型（线程安全，预热与首个请求并发时只加载一次）"""
+        with self._model_lock:
+            if not self._model_loaded:
+                self.backend = create_asr_backend(self.config)
+                self._model_loaded = True
+    
+    def warmup(self):
+        """加载模型并对一秒静音做一次转写，使首个真实请求不必等待模型加载和初始化"""
+        self._load_model()
+        self.backend.warmup()
+    
+    def start_capture(self, fs: Optional[int] = None) -> MicrophoneRingBuffer:
+        """
+        启动麦克风持续录音（可重复调用），音频写入固定大小的环形缓冲区
+        
+        Args:
+            fs: 采样率，如果为None则使用配置中的采样率
+        """
+        if fs is None:
+            fs = self.config.sample_rate
+        with self._microphone_lock:
+            if self._microphone is not None and self._microphone.sample_rate != fs:
+                self._microphone.stop()
+                self._microphone = None
+            if self._microphone is None:
+                # 缓冲区至少容纳预录部分和一次录音的最长时长，录音过程中不会被覆盖
+                required = (self.config.preroll + self.config.vad_max_wait
+                            + self.config.vad_max_utterance + 1.0)
+                self._microphone = MicrophoneRingBuffer(
+                    fs, self.config.channels,
+                    seconds=max(self.config.capture_buffer_seconds, required),
+                    frame_length=int(fs * self.config.vad_frame_ms / 1000)
+                )
+            self._microphone.start()
+            return self._microphone
+    
+    def stop_capture(self):
+        """停止麦克风录音"""
+        with self._microphone_lock:
+            if self._microphone is not None:
+                self._microphone.stop()
+    
+    def close(self):
+        """停止麦克风录音并等待后台保存的录音写完"""
+        self.stop_capture()
+        if self._save_executor is not None:
+            self._save_executor.shutdown(wait=True)
+            self._save_executor = None
     
     def record_audio(self, seconds: int = 3, fs: Optional[int] = None) -> Tuple:
         """
@@ -49,6 +98,18 @@ class SpeechRecognitionService:
         if fs is None:
             fs = self.config.sample_rate
         
+        microphone = self._microphone
+        if microphone is not None and microphone.running and microphone.sample_rate == fs:
+            # 麦克风已在持续录音，直接从环形缓冲区读取，避免重复打开设备
+            print("Starting recording...")
+            start = microphone.position
+            end = start + int(seconds * fs)
+            if not microphone.wait_for(end, timeout=seconds + 1.0):
+                raise RuntimeError("Microphone stopped delivering audio")
+            return microphone.read(start, end), fs
+        
+        import sounddevice as sd
+        
         try:
             print("Starting recording...")
             recording = sd.rec(
@@ -63,6 +124,174 @@ class SpeechRecognitionService:
             print(f"Error during recording: {str(e)}")
             raise
     
+    def _create_endpointer(self, frame_duration: float) -> UtteranceEndpointer:
+        return UtteranceEndpointer(
+            frame_duration,
+            silence_timeout=self.config.vad_silence_timeout,
+            min_utterance=self.config.vad_min_utterance,
+            max_utterance=self.config.vad_max_utterance,
+            max_wait=self.config.vad_max_wait,
+            padding=self.config.vad_padding
+        )
+    
+    def _capture_utterance(self, fs: int, on_frame: Optional[Callable] = None):
+        """
+        从麦克风环形缓冲区逐帧读取并做语音活动检测，直到端点检测器判定结束
+        
+        麦克风已在持续录音时（config.always_on_capture），从请求到达前 config.preroll 秒开始读取，
+        访客在请求到达前开口的部分也不会丢失；帧直接以缓冲区视图送入VAD，不逐帧拷贝或分配内存。
+        
+        Args:
+            fs: 采样率
+            on_frame: 可选，每帧判定后以 (起始位置, 端点检测器) 调用（在录音线程中执行，应尽快返回）
+            
+        Returns:
+            (环形缓冲区, 起始位置, 端点检测器) 元组，第 i 帧位于 起始位置 + i × 帧长
+        """
+        if self._vad is None:
+            # 噪声底估计在多次录音之间保留
+            self._vad = create_vad(self.config)
+        was_running = self._microphone is not None and self._microphone.running
+        microphone = self.start_capture(fs)
+        frame_length = microphone.frame_length
+        endpointer = self._create_endpointer(frame_length / fs)
+        max_frames = endpointer.wait_frames + endpointer.max_frames
+        
+        # 预录起点：仅在请求前已在录音时可用，并对齐到帧边界
+        preroll = int(self.config.preroll * fs) if was_running else 0
+        base = max(microphone.position - preroll, microphone.oldest)
+        base = -(-base // frame_length) * frame_length
+        
+        try:
+            print("Starting recording...")
+            while not endpointer.done and endpointer.frame_index < max_frames:
+                start = base + endpointer.frame_index * frame_length
+                if not microphone.wait_for(start + frame_length, timeout=1.0):
+                    raise RuntimeError("Microphone stopped delivering audio")
+                frame = microphone.frame(start)
+                endpointer.push(self._vad.is_speech(frame[:, 0]))
+                if on_frame is not None:
+                    on_frame(base, endpointer)
+        except Exception as e:
+            print(f"Error during recording: {str(e)}")
+            raise
+        finally:
+            if not self.config.always_on_capture:
+                self.stop_capture()
+        return microphone, base, endpointer
+    
+    @staticmethod
+    def _voiced_span(microphone: MicrophoneRingBuffer, base: int, endpointer: UtteranceEndpointer, fs: int):
+        """从环形缓冲区拷贝出有声片段（含首尾填充），没有有效语音时返回长度为0的数组"""
+        frame_length = microphone.frame_length
+        span = endpointer.span()
+        elapsed = endpointer.frame_index * frame_length / fs
+        if span is None:
+            print(f"No speech detected after {elapsed:.1f}s")
+            return microphone.read(base, base)
+        voiced = microphone.read(base + span[0] * frame_length, base + span[1] * frame_length)
+        print(f"Recording stopped after {elapsed:.1f}s ({len(voiced) / fs:.1f}s of speech)")
+        return voiced
+    
+    def record_utterance(self, fs: Optional[int] = None) -> Tuple:
+        """
+        录制一句话：从音频流中逐帧做语音活动检测，说完（静音超过 vad_silence_timeout）即停止，
+        只返回有声片段（含少量首尾填充）
+        
+        Args:
+            fs: 采样率，如果为None则使用配置中的采样率
+            
+        Returns:
+            (录音数据, 采样率) 元组；等待超时仍未检测到语音时录音数据长度为0
+        """
+        if fs is None:
+            fs = self.config.sample_rate
+        microphone, base, endpointer = self._capture_utterance(fs)
+        return self._voiced_span(microphone, base, endpointer, fs), fs
+    
+    def stream_utterance(self, on_event: Callable[[str, str], None], fs: Optional[int] = None) -> Tuple:
+        """
+        录制一句话，并在说话过程中以滑动窗口分块解码，持续推送部分识别结果
+        
+        录音线程每积累 stream_interval 秒新音频就唤醒解码线程；解码线程只解码最近至多
+        stream_window 秒的音频，窗口向前滑动时把上一次的窗口结果固定下来，与新窗口的结果拼接。
+        部分结果仅供提前展示，最终结果由调用方对完整片段重新解码得到。
+        
+        Args:
+            on_event: 事件回调 on_event(kind, text)，kind 为 "partial"（部分结果）或 "end"（说话结束）；
+                在录音线程或解码线程中调用
+            fs: 采样率，如果为None则使用配置中的采样率
+            
+        Returns:
+            (录音数据, 采样率) 元组，与 record_utterance 相同
+        """
+        if fs is None:
+            fs = self.config.sample_rate
+        self._load_model()
+        frame_length = int(fs * self.config.vad_frame_ms / 1000)
+        interval_frames = max(1, int(round(self.config.stream_interval * fs / frame_length)))
+        window_frames = max(interval_frames, int(round(self.config.stream_window * fs / frame_length)))
+        
+        condition = threading.Condition()
+        # 录音线程发布的进度：起始位置、已录帧数、当前语音起始帧（含填充）、是否结束
+        progress = {"base": 0, "frames": 0, "start": None, "done": False}
+        
+        def on_frame(base: int, endpointer: UtteranceEndpointer):
+            progress["base"] = base
+            start = None
+            if endpointer.speaking:
+                start = max(endpointer.start - endpointer.padding_frames, 0)
+            with condition:
+                progress["frames"], progress["start"] = endpointer.frame_index, start
+                if endpointer.done or (start is not None and endpointer.frame_index % interval_frames == 0):
+                    condition.notify()
+        
+        def decode_partials():
+            utterance_start = window_start = None
+            committed = hypothesis = last_sent = ""
+            decoded_until = hypothesis_end = 0
+            while True:
+                with condition:
+                    condition.wait_for(lambda: progress["done"] or (
+                        progress["start"] is not None and progress["frames"] - decoded_until >= interval_frames
+                    ))
+                    if progress["done"]:
+                        return
+                    end, start = progress["frames"], progress["start"]
+                if start != utterance_start:
+                    # 新的一句（之前的声音被判为噪声时起始帧会变化）
+                    utterance_start = window_start = start
+                    committed = hypothesis = ""
+                elif end - window_start > window_frames and hypothesis_end > window_start:
+                    # 窗口向前滑动：固定上一次解码的结果
+                    committed += hypothesis
+                    window_start = hypothesis_end
+                base = progress["base"]
+                audio = self._microphone.read(base + window_start * frame_length, base + end * frame_length)
+                try:
+                    hypothesis = self.backend.transcribe(self._to_model_input(audio, fs))
+                except Exception as e:
+                    print(f"Error during partial transcription: {str(e)}")
+                    return
+                decoded_until = hypothesis_end = end
+                text = (committed + hypothesis).strip()
+                if text and text != last_sent:
+                    last_sent = text
+                    on_event("partial", text)
+        
+        decoder = threading.Thread(target=decode_partials, name="partial-transcripts", daemon=True)
+        decoder.start()
+        try:
+            microphone, base, endpointer = self._capture_utterance(fs, on_frame)
+        finally:
+            with condition:
+                progress["done"] = True
+                condition.notify()
+        on_event("end", "")
+        # 等待进行中的部分解码结束，避免与最终解码同时使用模型
+        decoder.join()
+        return self._voiced_span(microphone, base, endpointer, fs), fs
+    
     def save_audio(self, recording, fs: int, filename: str = "output.wav") -> str:
         """
         保存音频文件
@@ -75,6 +304,8 @@ class SpeechRecognitionService:
         Returns:
             保存的文件路径
         """
+        from scipy.io.wavfile import write
+        
         try:
             write(filename, fs, recording)
             print(f"Recording completed, saved as {filename}")
@@ -83,6 +314,70 @@ class SpeechRecognitionService:
             print(f"Error saving audio file: {str(e)}")
             raise
     
+    def save_audio_async(self, recording, fs: int, filename: Optional[str] = None) -> Future:
+        """
+        在后台线程中保存音频文件，不阻塞转写
+        
+        Args:
+            recording: 录音数据（保存完成前不应被修改）
+            fs: 采样率
+            filename: 保存的文件名，默认为 recordings_dir 下的 audio-<时间戳>.wav
+            
+        Returns:
+            保存完成后结果为文件路径的Future
+        """
+        if filename is None:
+            os.makedirs(self.config.recordings_dir, exist_ok=True)
+            timestamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+            filename = os.path.join(self.config.recordings_dir, f"audio-{timestamp}.wav")
+        if self._save_executor is None:
+            self._save_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audio-save")
+        return self._save_executor.submit(self.save_audio, recording, fs, filename)
+    
+    @staticmethod
+    def _to_model_input(recording, fs: int):
+        """
+        将 int16 录音转换为Whisper所需的 16kHz 单声道 float32 数组
+        
+        Args:
+            recording: 形状为 (N,) 或 (N, 声道数) 的录音数据
+            fs: 采样率
+        """
+        import numpy as np
+        
+        audio = np.asarray(recording)
+        if audio.ndim == 2:
+            audio = audio[:, 0] if audio.shape[1] == 1 else audio.mean(axis=1)
+        audio = audio.astype(np.float32) / 32768.0
+        if fs != MODEL_SAMPLE_RATE:
+            from math import gcd
+            from scipy.signal import resample_poly
+            
+            divisor = gcd(fs, MODEL_SAMPLE_RATE)
+            audio = resample_poly(audio, MODEL_SAMPLE_RATE // divisor, fs // divisor).astype(np.float32)
+        return audio
+    
+    def transcribe_array(self, recording, fs: Optional[int] = None) -> str:
+        """
+        直接转写内存中的录音，无需写入WAV文件再经ffmpeg读取和重采样
+        
+        Args:
+            recording: int16 录音数据，形状为 (N,) 或 (N, 声道数)
+            fs: 采样率，如果为None则使用配置中的采样率
+            
+        Returns:
+            转录的文字
+        """
+        if fs is None:
+            fs = self.config.sample_rate
+        try:
+            self._load_model()
+            print("Converting speech to text...")
+            return self.backend.transcribe(self._to_model_input(recording, fs))
+        except Exception as e:
+            print(f"Error during speech conversion: {str(e)}")
+            raise
+    
     def transcribe_audio(self, audio_file: str) -> str:
         """
         将音频文件转换为文字
@@ -101,37 +396,33 @@ class SpeechRecognitionService:
             if not os.path.isabs(audio_file):
                 audio_file = os.path.join(os.getcwd(), audio_file)
             
-            result = self.model.transcribe(
-                audio_file,
-                language=self.config.language
-            )
-            return result["text"]
+            return self.backend.transcribe(audio_file)
         except Exception as e:
             print(f"Error during speech conversion: {str(e)}")
             raise
     
-    def record_and_transcribe(self, seconds: int = 3, save_file: Optional[str] = None) -> str:
+    def record_and_transcribe(self, seconds: Optional[int] = 3, save_file: Optional[str] = None) -> str:
         """
         录制音频并直接转换为文字（便捷方法）
         
         Args:
-            seconds: 录制时长（秒）
-            save_file: 可选，保存音频文件的路径
+            seconds: 固定录制时长（秒）；传入None时改为按语音活动检测录制一句话
+            save_file: 可选，在后台保存音频文件的路径；为None时按 config.save_recordings 决定是否保存
             
         Returns:
-            转录的文字
+            转录的文字，未检测到语音时为空字符串
         """
-        recording, fs = self.record_audio(seconds)
-        
-        if save_file:
-            audio_file = self.save_audio(recording, fs, save_file)
+        if seconds is None:
+            recording, fs = self.record_utterance()
+            if len(recording) == 0:
+                return ""
         else:
-            import datetime
-            timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
-            audio_file = f"audio-{timestamp}.wav"
-            audio_file = self.save_audio(recording, fs, audio_file)
+            recording, fs = self.record_audio(seconds)
+        
+        if save_file or self.config.save_recordings:
+            self.save_audio_async(recording, fs, save_file)
         
-        return self.transcribe_audio(audio_file)
+        return self.transcribe_array(recording, fs)
 
 
 # 全局服务实例
@@ -0,0 +1,192 @@
+"""
+语音活动检测模块
+逐帧判断音频是否为语音（能量阈值或 webrtcvad），并据此确定一句话的起止位置，
+使录音在说话结束后及时停止，且只把有声片段交给语音识别
+"""
+import numpy as np
+from typing import Optional, Tuple
+
+
+class EnergyVAD:
+    """
+    基于帧能量的语音活动检测
+
+    阈值取固定下限与自适应噪声底（非语音帧能量的指数滑动平均）加余量中的较大者，
+    在嘈杂的展厅中也不会把背景噪声当作语音。
+    """
+
+    def __init__(self, threshold_db: float = -45.0, noise_margin_db: float = 10.0,
+                 noise_smoothing: float = 0.05):
+        """
+        Args:
+            threshold_db: 语音帧的最低能量（dBFS）
+            noise_margin_db: 语音帧能量需高出噪声底的分贝数
+            noise_smoothing: 噪声底滑动平均的更新系数
+        """
+        self.threshold_db = threshold_db
+        self.noise_margin_db = noise_margin_db
+        self.noise_smoothing = noise_smoothing
+        self.noise_floor_db: Optional[float] = None
+        self._samples: Optional[np.ndarray] = None
+
+    @staticmethod
+    def frame_db(frame: np.ndarray, out: Optional[np.ndarray] = None) -> float:
+        """
+        int16 音频帧的均方根能量（dBFS）
+
+        Args:
+            frame: 音频帧
+            out: 可选，长度不小于帧长的 float32 数组，用于转换，避免每帧分配内存
+        """
+        if frame.dtype == np.float32:
+            samples = frame
+        elif out is not None and len(out) >= len(frame):
+            samples = out[:len(frame)]
+            np.copyto(samples, frame)
+        else:
+            samples = frame.astype(np.float32)
+        rms = np.sqrt(np.dot(samples, samples) / max(len(samples), 1)) / 32768.0
+        return 20.0 * np.log10(max(rms, 1e-10))
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        """判断单声道 int16 帧是否为语音"""
+        if self._samples is None or len(self._samples) < len(frame):
+            self._samples = np.empty(len(frame), dtype=np.float32)
+        level = self.frame_db(frame, self._samples)
+        threshold = self.threshold_db
+        if self.noise_floor_db is not None:
+            threshold = max(threshold, self.noise_floor_db + self.noise_margin_db)
+        speech = level >= threshold
+        if not speech:
+            if self.noise_floor_db is None:
+                self.noise_floor_db = level
+            else:
+                self.noise_floor_db += self.noise_smoothing * (level - self.noise_floor_db)
+        return speech
+
+    def reset(self):
+        """清除噪声底估计"""
+        self.noise_floor_db = None
+
+
+class WebRtcVAD:
+    """基于 webrtcvad 的语音活动检测（帧长须为10/20/30毫秒，采样率为8/16/32/48kHz）"""
+
+    def __init__(self, sample_rate: int, aggressiveness: int = 2):
+        """
+        Args:
+            sample_rate: 采样率
+            aggressiveness: 0-3，越大越倾向于判为非语音
+        """
+        import webrtcvad
+
+        self.sample_rate = sample_rate
+        self.vad = webrtcvad.Vad(aggressiveness)
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        """判断单声道 int16 帧是否为语音"""
+        return self.vad.is_speech(np.ascontiguousarray(frame, dtype=np.int16).tobytes(), self.sample_rate)
+
+    def reset(self):
+        """webrtcvad 无需重置"""
+
+
+def create_vad(config):
+    """
+    根据语音配置创建语音活动检测器
+
+    Args:
+        config: SpeechConfig 对象，使用其中 vad_* 字段
+    """
+    if config.vad_backend == "energy":
+        return EnergyVAD(threshold_db=config.vad_energy_threshold_db, noise_margin_db=config.vad_noise_margin_db)
+    if config.vad_backend == "webrtc":
+        return WebRtcVAD(config.sample_rate, aggressiveness=config.vad_aggressiveness)
+    raise ValueError(f"Unknown VAD backend: {config.vad_backend}")
+
+
+class UtteranceEndpointer:
+    """
+    按帧的语音/非语音判断确定一句话的起止帧
+
+    状态按帧推进：等待语音开始（最长 max_wait 秒）；开始后在最后一个语音帧之后静音达到
+    silence_timeout 秒时结束，总时长达到 max_utterance 秒时强制结束。
+    有声部分短于 min_utterance 秒的片段（咳嗽、碰撞声等）被忽略，继续等待。
+    """
+
+    def __init__(self, frame_duration: float, silence_timeout: float = 0.8, min_utterance: float = 0.3,
+                 max_utterance: float = 15.0, max_wait: float = 8.0, padding: float = 0.2):
+        """
+        Args:
+            frame_duration: 每帧时长（秒）
+            silence_timeout: 语音结束后判定说完所需的静音时长（秒）
+            min_utterance: 有效语音的最短时长（秒）
+            max_utterance: 一句话的最长时长（秒）
+            max_wait: 等待语音开始的最长时间（秒）
+            padding: 返回片段在首尾语音帧之外保留的时长（秒）
+        """
+        self.silence_frames = max(1, int(round(silence_timeout / frame_duration)))
+        self.min_frames = max(1, int(round(min_utterance / frame_duration)))
+        self.max_frames = max(1, int(round(max_utterance / frame_duration)))
+        self.wait_frames = max(1, int(round(max_wait / frame_duration)))
+        self.padding_frames = int(round(padding / frame_duration))
+        self.reset()
+
+    def reset(self):
+        """开始新的一句话"""
+        self.frame_index = 0
+        self.start: Optional[int] = None
+        self.last_speech: Optional[int] = None
+        self.done = False
+
+    @property
+    def speaking(self) -> bool:
+        """是否已检测到语音开始"""
+        return self.start is not None
+
+    def push(self, speech: bool) -> bool:
+        """
+        推进一帧
+
+        Args:
+            speech: 该帧是否为语音
+
+        Returns:
+            是否已结束（说完、超过最长时长或等待超时）
+        """
+        index = self.frame_index
+        self.frame_index += 1
+        if self.done:
+            return True
+
+        if self.start is None:
+            if speech:
+                self.start = self.last_speech = index
+            elif index + 1 >= self.wait_frames:
+                self.done = True
+            return self.done
+
+        if speech:
+            self.last_speech = index
+        if index - self.start + 1 >= self.max_frames:
+            self.done = True
+        elif index - self.last_speech >= self.silence_frames:
+            if self.last_speech - self.start + 1 < self.min_frames:
+                # 有声部分过短，视为噪声，继续等待下一句
+                self.start = self.last_speech = None
+                if index + 1 >= self.wait_frames:
+                    self.done = True
+            else:
+                self.done = True
+        return self.done
+
+    def span(self) -> Optional[Tuple[int, int]]:
+        """
+        Returns:
+            语音片段的 [起始帧, 结束帧) 区间（含首尾填充），没有有效语音时返回None
+        """
+        if self.start is None or self.last_speech - self.start + 1 < self.min_frames:
+            return None
+        start = max(self.start - self.padding_frames, 0)
+        end = min(self.last_speech + 1 + self.padding_frames, self.frame_index)
+        return start, end
@@ -15,6 +15,19 @@ from .config import (
     speech_config,
     exhibit_config
 )
+from .occupancy_protocol import (
+    PROTOCOL_VERSION,
+    ProtocolError,
+    ExhibitStatus,
+    OccupancyMessage,
+    OccupancyTable,
+    OccupancySubscriber,
+    encode_message,
+    decode_payload,
+    read_message,
+    read_message_async,
+    make_delta
+)
 
 __all__ = [
     'RobotConfig',
@@ -28,6 +41,17 @@ __all__ = [
     'network_config',
     'detection_config',
     'speech_config',
-    'exhibit_config'
+    'exhibit_config',
+    'PROTOCOL_VERSION',
+    'ProtocolError',
+    'ExhibitStatus',
+    'OccupancyMessage',
+    'OccupancyTable',
+    'OccupancySubscriber',
+    'encode_message',
+    'decode_payload',
+    'read_message',
+    'read_message_async',
+    'make_delta'
 ]
 
@@ -35,15 +35,95 @@ class NetworkConfig:
     host: str = "localhost"
     detection_port: int = 5001
     audio_port: int = 5002
+    backlog: int = 16  # 监听队列长度
+    max_connections: int = 32  # 同时处理的最大连接数，超出时直接关闭新连接
+    connection_timeout: float = 60.0  # 单个连接的最长处理时间（秒）
+    detection_workers: int = 2  # 检测线程池大小
+    audio_workers: int = 1  # 录音/转写线程池大小
+    shutdown_grace: float = 5.0  # 关闭时等待进行中连接的时间（秒）
+    subscription_heartbeat: float = 5.0  # 占用订阅无变化时的心跳间隔（秒）
+    stream_transcripts: bool = True  # 机器人从语音服务接收流式的部分识别结果
 
 
 @dataclass
 class DetectionConfig:
     """检测服务配置"""
     yolo_model_path: str = "yolo11n.pt"
+    detector_backend: str = "ultralytics"  # 推理后端："ultralytics" 或 "onnxruntime"
+    onnx_model_path: str = "yolo11n-640.onnx"  # ONNX模型路径，可由 export_detection_model.py 生成（文件名含输入尺寸）
+    onnx_intra_op_threads: int = 0  # ONNX Runtime算子内线程数，0表示自动
+    inference_imgsz: int = 640  # 推理输入尺寸
+    nms_iou_threshold: float = 0.45  # ONNX后端NMS的IoU阈值
+    warmup_runs: int = 1  # 启动时的预热推理次数
+    adaptive_inference: bool = False  # 粗到细：整帧低分辨率推理，仅对置信度接近阈值的区域裁剪原图再推理
+    adaptive_margin: float = 0.15  # 置信度在 confidence_threshold ± margin 内视为不确定
+    adaptive_coarse_imgsz: int = 0  # 整帧推理的输入尺寸，0表示与 inference_imgsz 相同（仅ultralytics后端可不同）
+    adaptive_crop_context: float = 1.0  # 裁剪窗口在人员框四周各扩展的比例
+    adaptive_max_crops: int = 4  # 每帧最多裁剪的窗口数
+    frame_source: str = "zed"  # 帧来源："zed"、"video"、"images" 或 "synthetic"
+    frame_source_path: Optional[str] = None  # 视频文件路径，或图片目录/通配符
+    frame_source_camera_id: int = 0  # ZED相机编号
+    frame_source_fps: float = 5.0  # 图片/合成来源实时回放的帧率
+    frame_source_realtime: bool = False  # 按帧率实时回放；False时尽可能快
+    frame_source_loop: bool = True  # 回放结束后从头循环
     exhibit_detection_dir: str = "exhibit_detection"
-    exhibit_image_filename: str = "exhibits.jpg"
     confidence_threshold: float = 0.5
+    save_debug_images: bool = False  # 调试模式：在后台保存带人员框和区域标注的快照
+    debug_snapshot_dir: str = "debug_snapshots"  # 快照根目录，其下按轮换创建子目录
+    debug_snapshot_interval: float = 5.0  # 两次快照之间的最小间隔（秒），0表示每帧
+    debug_snapshot_on_change: bool = False  # 仅在展品占用状态变化时保存快照
+    debug_snapshot_queue_size: int = 4  # 待写入快照队列长度，满时丢弃新帧
+    debug_snapshot_dir_snapshots: int = 100  # 每个子目录的快照数，超过后轮换目录
+    debug_snapshot_max_mb: float = 200.0  # 快照总大小上限（MB），超出时删除最旧的目录
+    background_detection: bool = True  # 后台持续检测，客户端直接读取缓存结果
+    detection_interval: float = 0.2  # 后台检测周期（秒）
+    max_wait_for_fresh: float = 5.0  # 客户端要求新鲜结果时的最长等待时间（秒）
+    # 检测端口等待请求行的时间（秒）：proto=1/subscribe=1 请求因网络延迟晚到时会被当作旧客户端，
+    # 收到旧格式字符串或空连接；当前机器人客户端总是先发送请求行，只有不发送请求行的旧客户端多等这段时间
+    request_wait: float = 0.5
+    # 语音端口等待请求行的时间（秒）：录音本身耗时数秒，且有预录音频，多等一会不影响响应，
+    # 可避免 stream=1 请求因网络延迟晚到而被当作旧客户端
+    audio_request_wait: float = 0.5
+    message_history: int = 64  # 为增量消息保留的历史结果数量
+    # 多相机模式：每项为一路相机覆盖的配置字段，每路相机在独立进程中运行，
+    # 必须包含该相机负责的 exhibit_regions，例如
+    # [{"frame_source_camera_id": 0, "exhibit_regions": {84: [0.0, 0.0, 0.5, 1.0]}},
+    #  {"frame_source_camera_id": 1, "exhibit_regions": {80: [0.2, 0.0, 0.9, 1.0]}}]
+    # 为None时使用单相机模式
+    cameras: list = None
+    # 多相机模式下某路相机的结果超过 camera_stale_intervals 个 detection_interval 未更新时不再合并，
+    # 其负责的展品按空闲上报
+    camera_stale_intervals: int = 10
+    camera_restart_delay: float = 5.0  # 相机工作进程退出后等待多久重启（秒）
+    # 各展品的画面区域 {mark_id: 区域}，坐标为归一化坐标 [0, 1]；
+    # 区域可以是矩形 [x1, y1, x2, y2] 或多边形 [[x, y], ...]。
+    # 为None时按展品数量将画面均分为等宽垂直区域
+    exhibit_regions: dict = None
+    smoothing_window: int = 5  # 占用平滑的环形缓冲区长度（帧）
+    occupancy_enter_threshold: float = 0.3  # 平滑置信度达到该值时判定为占用
+    occupancy_exit_threshold: float = 0.15  # 平滑置信度降到该值时判定为空闲
+    occupancy_min_hold: float = 1.0  # 占用状态切换后的最短保持时间（秒）
+    motion_gating: bool = True  # 画面无变化时跳过YOLO推理
+    motion_downscale_width: int = 160  # 帧差所用灰度缩略图的宽度（像素）
+    motion_pixel_threshold: int = 25  # 灰度差超过该值的像素视为变化
+    motion_changed_fraction: float = 0.01  # 区域内变化像素比例达到该值时重新推理
+    motion_refresh_interval: float = 10.0  # 无变化时强制重新推理的间隔（秒）
+    depth_filtering: bool = False  # 使用ZED深度剔除不在展品距离范围内的人员（如远处路过的行人）
+    exhibit_depth_bands: dict = None  # {mark_id: [near, far]} 各展品允许的人员距离（米）
+    default_depth_band: tuple = (0.0, 4.0)  # 未单独配置的展品使用的距离范围（米）
+    depth_samples: int = 7  # 每个人员框中心区域每个方向的深度采样点数
+    tracker_iou_threshold: float = 0.3  # 人员跟踪IoU匹配阈值
+    tracker_max_age: float = 1.0  # 轨迹未被匹配的最长保留时间（秒）
+    tracker_distance_threshold: float = 0.5  # 质心匹配的最大距离（相对人员框对角线）
+    dwell_prior: float = 60.0  # 缺少历史数据时假设的平均停留时间（秒）
+    dwell_history: int = 200  # 每个展品保留的停留时长样本数
+    dwell_min_sample: float = 2.0  # 短于该时长（秒）的停留不计入样本
+    heatmap_enabled: bool = True  # 累积访客落脚点热力图
+    heatmap_width: int = 64  # 热力图列数
+    heatmap_height: int = 36  # 热力图行数
+    heatmap_half_life: float = 3600.0  # 热度衰减的半衰期（秒）
+    heatmap_path: str = "exhibit_detection/heatmap.npz"  # 热力图检查点文件
+    heatmap_checkpoint_interval: float = 300.0  # 热力图检查点保存间隔（秒）
 
 
 @dataclass
@@ -51,8 +131,30 @@ class SpeechConfig:
     """语音识别配置"""
     sample_rate: int = 16000
     channels: int = 1
-    whisper_model: str = "tiny"
+    whisper_model: str = "tiny"  # 模型大小（tiny/base/small/...），两种后端通用
     language: str = "en"
+    asr_backend: str = "whisper"  # 语音识别后端："whisper"（openai-whisper）或 "faster-whisper"（CTranslate2）
+    asr_device: str = "auto"  # 推理设备："auto"、"cpu" 或 "cuda"
+    asr_compute_type: str = "int8"  # faster-whisper计算精度，如 "int8"、"int8_float16"、"float32"
+    asr_cpu_threads: int = 0  # faster-whisper的CPU线程数，0表示使用默认值
+    asr_beam_size: int = 1  # 束搜索宽度，1为贪心解码
+    always_on_capture: bool = True  # 麦克风持续录音到环形缓冲区，录音请求可包含请求前的预录音频
+    capture_buffer_seconds: float = 30.0  # 环形缓冲区时长（秒），不足一次最长录音时自动增大
+    preroll: float = 0.5  # 录音从请求到达前多少秒开始（仅持续录音时有效）
+    save_recordings: bool = False  # 在后台把每段录音保存为WAV文件（调试/留档）
+    recordings_dir: str = "recordings"  # 录音保存目录
+    vad_backend: str = "energy"  # 语音活动检测："energy"（能量阈值）或 "webrtc"（需安装webrtcvad）
+    vad_frame_ms: int = 30  # VAD帧长（毫秒），webrtc仅支持10/20/30
+    vad_energy_threshold_db: float = -45.0  # 能量VAD的语音最低能量（dBFS）
+    vad_noise_margin_db: float = 10.0  # 能量VAD中语音需高出噪声底的分贝数
+    vad_aggressiveness: int = 2  # webrtcvad的激进程度（0-3）
+    vad_silence_timeout: float = 0.8  # 最后一个语音帧之后静音多久视为说完（秒）
+    vad_min_utterance: float = 0.3  # 有效语音的最短时长（秒），更短的声音被忽略
+    vad_max_utterance: float = 15.0  # 一句话的最长录音时长（秒）
+    vad_max_wait: float = 8.0  # 等待访客开口的最长时间（秒）
+    vad_padding: float = 0.2  # 语音片段首尾保留的静音时长（秒）
+    stream_interval: float = 1.0  # 流式识别时每积累多少秒新音频解码一次部分结果
+    stream_window: float = 8.0  # 流式识别部分解码的滑动窗口长度（秒）
 
 
 @dataclass
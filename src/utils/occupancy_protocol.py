@@ -0,0 +1,366 @@
+"""
+展品占用消息协议
+检测服务与机器人之间的分帧消息格式：4字节大端长度前缀 + 紧凑JSON负载。
+
+负载字段：
+    v       协议版本
+    type    "snapshot"（完整状态）或 "delta"（仅包含变化的展品）
+    seq     序列号，每次检测递增
+    ts      帧时间戳（time.time()）
+    base    delta消息所基于的序列号，snapshot为null
+    ids     展品标记ID列表
+    bits    占用位图的十六进制字符串，第i位对应 ids[i]
+    counts  各展品人数
+    conf    各展品最大人员置信度
+    dwell   各展品当前访客的最长停留时间（秒，可选）
+    eta     各展品预计空闲前的剩余时间（秒，可选）
+    err     错误说明（可选）：服务端暂时没有检测结果时发送不含展品的快照并附带该字段，
+            客户端应视占用状态为未知
+
+订阅模式下（请求行包含 subscribe=1），服务端先发送快照，之后仅在展品占用状态变化时
+推送增量消息；空闲时定期发送不含展品的增量消息作为心跳。
+
+仅依赖标准库，机器人端可直接使用。
+"""
+import json
+import socket
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+PROTOCOL_VERSION = 1
+HEADER = struct.Struct("!I")
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+
+
+class ProtocolError(ValueError):
+    """消息格式错误或版本不受支持"""
+
+
+@dataclass
+class ExhibitStatus:
+    """单个展品的占用信息"""
+    occupied: bool
+    count: int = 0
+    max_conf: float = 0.0
+    dwell: float = 0.0  # 当前访客的最长停留时间（秒）
+    remaining: float = 0.0  # 预计空闲前的剩余时间（秒），以消息时间戳为准
+
+
+@dataclass
+class OccupancyMessage:
+    """展品占用消息"""
+    seq: int
+    timestamp: float
+    exhibits: Dict[int, ExhibitStatus] = field(default_factory=dict)
+    delta: bool = False
+    base_seq: Optional[int] = None
+    version: int = PROTOCOL_VERSION
+    error: Optional[str] = None
+
+    def occupancy_string(self, exhibit_ids) -> str:
+        """
+        按给定展品顺序生成旧格式的占用字符串，例如 "01"
+
+        Args:
+            exhibit_ids: 展品标记ID列表
+        """
+        return "".join(
+            "1" if mark_id in self.exhibits and self.exhibits[mark_id].occupied else "0"
+            for mark_id in exhibit_ids
+        )
+
+
+def make_delta(previous: OccupancyMessage, current: OccupancyMessage,
+               occupancy_only: bool = False) -> OccupancyMessage:
+    """
+    生成从 previous 到 current 的增量消息
+
+    只包含占用状态或人数发生变化的展品（置信度的小幅波动不单独触发更新）；
+    occupancy_only 为True时仅比较占用状态。
+    """
+    changed = {
+        mark_id: status
+        for mark_id, status in current.exhibits.items()
+        if mark_id not in previous.exhibits
+        or previous.exhibits[mark_id].occupied != status.occupied
+        or (not occupancy_only and previous.exhibits[mark_id].count != status.count)
+    }
+    return OccupancyMessage(
+        seq=current.seq,
+        timestamp=current.timestamp,
+        exhibits=changed,
+        delta=True,
+        base_seq=previous.seq
+    )
+
+
+def encode_payload(message: OccupancyMessage) -> bytes:
+    """将消息编码为紧凑JSON负载（不含长度前缀）"""
+    ids = list(message.exhibits)
+    statuses = [message.exhibits[mark_id] for mark_id in ids]
+    bits = 0
+    for i, status in enumerate(statuses):
+        if status.occupied:
+            bits |= 1 << i
+    payload = {
+        "v": message.version,
+        "type": "delta" if message.delta else "snapshot",
+        "seq": message.seq,
+        "ts": message.timestamp,
+        "base": message.base_seq,
+        "ids": ids,
+        "bits": format(bits, "x"),
+        "counts": [status.count for status in statuses],
+        "conf": [round(status.max_conf, 3) for status in statuses],
+        "dwell": [round(status.dwell, 1) for status in statuses],
+        "eta": [round(status.remaining, 1) for status in statuses],
+    }
+    if message.error is not None:
+        payload["err"] = message.error
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def encode_message(message: OccupancyMessage) -> bytes:
+    """将消息编码为带长度前缀的帧"""
+    payload = encode_payload(message)
+    return HEADER.pack(len(payload)) + payload
+
+
+def decode_payload(payload: bytes) -> OccupancyMessage:
+    """
+    解码JSON负载
+
+    Raises:
+        ProtocolError: 格式错误或版本不受支持
+    """
+    try:
+        data = json.loads(payload.decode("utf-8"))
+        version = data["v"]
+        if version > PROTOCOL_VERSION:
+            raise ProtocolError(f"Unsupported protocol version: {version}")
+        ids = data["ids"]
+        bits = int(data["bits"], 16)
+        counts = data.get("counts") or [0] * len(ids)
+        confs = data.get("conf") or [0.0] * len(ids)
+        dwells = data.get("dwell") or [0.0] * len(ids)
+        etas = data.get("eta") or [0.0] * len(ids)
+        exhibits = {
+            int(mark_id): ExhibitStatus(
+                bool(bits >> i & 1), int(counts[i]), float(confs[i]), float(dwells[i]), float(etas[i])
+            )
+            for i, mark_id in enumerate(ids)
+        }
+        return OccupancyMessage(
+            seq=int(data["seq"]),
+            timestamp=float(data["ts"]),
+            exhibits=exhibits,
+            delta=data["type"] == "delta",
+            base_seq=data.get("base"),
+            version=version,
+            error=data.get("err")
+        )
+    except ProtocolError:
+        raise
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        raise ProtocolError(f"Malformed occupancy message: {e}")
+
+
+def _check_length(length: int):
+    if length > MAX_MESSAGE_SIZE:
+        raise ProtocolError(f"Message too large: {length} bytes")
+
+
+def recv_exact(sock: socket.socket, size: int) -> bytes:
+    """从socket读取恰好 size 字节，连接提前关闭时抛出ConnectionError"""
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(min(remaining, 65536))
+        if not chunk:
+            raise ConnectionError("Connection closed while reading message")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def read_message(sock: socket.socket) -> OccupancyMessage:
+    """从阻塞socket读取一条完整消息"""
+    (length,) = HEADER.unpack(recv_exact(sock, HEADER.size))
+    _check_length(length)
+    return decode_payload(recv_exact(sock, length))
+
+
+async def read_message_async(reader) -> OccupancyMessage:
+    """从 asyncio.StreamReader 读取一条完整消息"""
+    (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+    _check_length(length)
+    return decode_payload(await reader.readexactly(length))
+
+
+class OccupancyTable:
+    """按展品标记ID维护的占用表，依次应用快照和增量消息"""
+
+    def __init__(self):
+        self.exhibits: Dict[int, ExhibitStatus] = {}
+        self.seq: Optional[int] = None
+        self.timestamp = 0.0
+        # 各展品状态最近一次更新对应的帧时间戳，用于推算剩余时间
+        self.updated_at: Dict[int, float] = {}
+
+    def apply(self, message: OccupancyMessage) -> bool:
+        """
+        应用一条消息
+
+        Returns:
+            是否成功应用；增量消息的 base 与当前序列号不连续时返回False，此时应重新获取快照
+        """
+        if message.delta:
+            if self.seq is None or message.base_seq != self.seq:
+                return False
+            self.exhibits.update(message.exhibits)
+        else:
+            self.exhibits = dict(message.exhibits)
+            self.updated_at = {}
+        self.updated_at.update(dict.fromkeys(message.exhibits, message.timestamp))
+        self.seq = message.seq
+        self.timestamp = message.timestamp
+        return True
+
+    def is_occupied(self, mark_id: int) -> bool:
+        """展品是否被占用，未知展品视为空闲"""
+        status = self.exhibits.get(mark_id)
+        return status is not None and status.occupied
+    
+    def expected_free_in(self, mark_id: int, now: Optional[float] = None) -> float:
+        """
+        展品预计多少秒后空闲：空闲或未知展品为0，否则为消息中的剩余时间减去消息发出后经过的时间
+        """
+        status = self.exhibits.get(mark_id)
+        if status is None or not status.occupied:
+            return 0.0
+        now = time.time() if now is None else now
+        return max(status.remaining - (now - self.updated_at.get(mark_id, self.timestamp)), 0.0)
+
+
+class OccupancySubscriber:
+    """
+    占用订阅客户端：在后台线程中保持与检测服务的长连接，持续更新本地占用表，
+    读取占用状态时不涉及网络访问
+    """
+
+    def __init__(self, host: str, port: int, heartbeat: float = 5.0, reconnect_delay: float = 2.0):
+        """
+        Args:
+            host: 检测服务地址
+            port: 检测服务端口
+            heartbeat: 服务端心跳间隔（秒），超过3个心跳周期未收到消息视为断线
+            reconnect_delay: 断线后重连的等待时间（秒）
+        """
+        self.host = host
+        self.port = port
+        self.heartbeat = heartbeat
+        self.reconnect_delay = reconnect_delay
+        self.table = OccupancyTable()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._sock: Optional[socket.socket] = None
+
+    @property
+    def has_data(self) -> bool:
+        """是否已收到至少一个快照"""
+        with self._lock:
+            return self.table.seq is not None
+
+    @property
+    def age(self) -> float:
+        """本地占用表对应帧距今的时长（秒）"""
+        with self._lock:
+            return time.time() - self.table.timestamp
+
+    def is_fresh(self, max_age: Optional[float] = None) -> bool:
+        """
+        本地占用表是否可用：已收到快照，且距今不超过 max_age 秒（默认3个心跳周期）；
+        检测服务停止或检测结果长时间未更新时返回False
+        """
+        if max_age is None:
+            max_age = self.heartbeat * 3
+        with self._lock:
+            return self.table.seq is not None and time.time() - self.table.timestamp <= max_age
+
+    def is_occupied(self, mark_id: int) -> bool:
+        """展品是否被占用（仅读取本地表）"""
+        with self._lock:
+            return self.table.is_occupied(mark_id)
+
+    def expected_free_in(self, mark_id: int) -> float:
+        """展品预计多少秒后空闲（仅读取本地表）"""
+        with self._lock:
+            return self.table.expected_free_in(mark_id)
+    
+    def snapshot(self) -> Dict[int, ExhibitStatus]:
+        """本地占用表的拷贝"""
+        with self._lock:
+            return dict(self.table.exhibits)
+
+    def start(self):
+        """启动后台订阅线程（重复调用无副作用）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止订阅并关闭连接"""
+        self._stop_event.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self._subscribe_once()
+            except (OSError, ProtocolError) as e:
+                if not self._stop_event.is_set():
+                    print(f"[Metadata] Subscription lost: {e}")
+            self._stop_event.wait(self.reconnect_delay)
+
+    def _subscribe_once(self):
+        """建立一次订阅连接并持续接收消息，直到断线或出现序列号缺口"""
+        with socket.create_connection((self.host, self.port), timeout=self.heartbeat * 3) as sock:
+            self._sock = sock
+            try:
+                request = f"proto={PROTOCOL_VERSION} subscribe=1"
+                with self._lock:
+                    if self.table.seq is not None:
+                        request += f" since={self.table.seq}"
+                sock.sendall((request + "\n").encode("utf-8"))
+                print(f"[Metadata] Subscribed to {self.host}:{self.port}")
+
+                while not self._stop_event.is_set():
+                    message = read_message(sock)
+                    if message.error is not None:
+                        # 服务端暂无检测结果：清空本地表（占用未知），保持连接等待快照
+                        with self._lock:
+                            self.table = OccupancyTable()
+                        continue
+                    with self._lock:
+                        applied = self.table.apply(message)
+                        if not applied:
+                            # 增量不连续，清空本地序列号以便重连后获取完整快照
+                            self.table.seq = None
+                    if not applied:
+                        raise ProtocolError(f"Out-of-order delta (base {message.base_seq})")
+            finally:
+                self._sock = None
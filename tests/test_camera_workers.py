@@ -0,0 +1,91 @@
+"""
+多相机工作进程池测试
+不启动工作进程，直接向结果队列放入各相机的结果，检查合并、过期结果的丢弃和已退出进程的处理
+"""
+import dataclasses
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from src.services.camera_workers import CameraWorkerPool, merge_statuses
+from src.utils.config import detection_config
+from src.utils.occupancy_protocol import ExhibitStatus
+
+
+def _pool(**overrides):
+    config = dataclasses.replace(
+        detection_config,
+        cameras=[{"exhibit_regions": {84: [0.0, 0.0, 1.0, 1.0]}},
+                 {"exhibit_regions": {80: [0.0, 0.0, 1.0, 1.0]}}],
+        detection_interval=0.2,
+        camera_stale_intervals=10,
+        **overrides
+    )
+    return CameraWorkerPool(config)
+
+
+def _put(pool, index, timestamp, statuses):
+    pool._results.put((index, timestamp, statuses, {"frames": 1}))
+
+
+def test_merge_statuses_takes_maximum():
+    merged = merge_statuses([
+        {84: ExhibitStatus(False, count=0, max_conf=0.0)},
+        {84: ExhibitStatus(True, count=2, max_conf=0.8, dwell=5.0, remaining=10.0)},
+    ])
+    assert merged[84] == ExhibitStatus(True, count=2, max_conf=0.8, dwell=5.0, remaining=10.0)
+
+
+def test_keeps_newest_result_per_camera():
+    pool = _pool()
+    now = time.time()
+    _put(pool, 0, now - 0.1, {84: ExhibitStatus(False)})
+    _put(pool, 0, now, {84: ExhibitStatus(True, count=1)})
+    _put(pool, 1, now - 0.05, {80: ExhibitStatus(True, count=1)})
+    time.sleep(0.1)
+    timestamp, merged = pool.next_result(timeout=1.0)
+    assert merged[84].occupied and merged[80].occupied
+    # 时间戳取参与合并的结果中最旧的一个
+    assert timestamp == pytest.approx(now - 0.05)
+
+
+def test_stale_camera_is_dropped():
+    pool = _pool()
+    now = time.time()
+    _put(pool, 1, now - 10.0, {80: ExhibitStatus(True, count=1)})
+    _put(pool, 0, now, {84: ExhibitStatus(True, count=1)})
+    time.sleep(0.1)
+    timestamp, merged = pool.next_result(timeout=1.0)
+    assert timestamp == pytest.approx(now)
+    assert merged[84].occupied
+    assert not merged[80].occupied
+    assert 1 not in pool._latest
+
+
+def test_all_cameras_stale_returns_none():
+    pool = _pool()
+    _put(pool, 0, time.time() - 10.0, {84: ExhibitStatus(True)})
+    assert pool.next_result(timeout=1.0) is None
+
+
+def test_exited_worker_results_are_dropped():
+    pool = _pool(camera_restart_delay=3600.0)
+    alive = SimpleNamespace(is_alive=lambda: True, exitcode=None)
+    dead = SimpleNamespace(is_alive=lambda: False, exitcode=1)
+    pool._processes = [alive, alive]
+    now = time.time()
+    _put(pool, 1, now, {80: ExhibitStatus(True, count=1)})
+    time.sleep(0.1)
+    assert pool.next_result(timeout=1.0)[1][80].occupied
+
+    pool._processes[1] = dead
+    _put(pool, 0, time.time(), {84: ExhibitStatus(False)})
+    time.sleep(0.1)
+    _, merged = pool.next_result(timeout=1.0)
+    assert not merged[80].occupied
+    assert 1 in pool._exited
+    # 重启延迟未到，不会重启
+    assert pool._processes[1] is dead
@@ -0,0 +1,108 @@
+"""
+粗到细多尺度检测测试
+用按调用顺序返回预设结果的检测器，检查不确定框的裁剪、裁剪数上限、坐标还原和NMS合并
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from src.services.person_detector import CoarseToFineDetector, PersonDetector
+
+
+class ScriptedDetector(PersonDetector):
+    """依次返回预设结果（第一次为整帧，之后为各裁剪窗口），并记录每次调用的图像形状和输入尺寸"""
+
+    def __init__(self, responses, imgsz=640):
+        super().__init__(confidence_threshold=0.5, imgsz=imgsz)
+        self.responses = list(responses)
+        self.calls = []
+
+    def detect(self, frame):
+        self.calls.append((frame.shape[:2], self.imgsz))
+        self.last_timings = {"inference": 0.001}
+        boxes, confidences = self.responses.pop(0) if self.responses else ([], [])
+        return (np.array(boxes, dtype=np.float32).reshape(-1, 4),
+                np.array(confidences, dtype=np.float32))
+
+
+FRAME = np.zeros((1000, 1000, 3), dtype=np.uint8)
+# 确定的人员框（置信度高于阈值 + margin），不裁剪
+CERTAIN = [100, 100, 150, 200]
+# 两个相距较远的不确定框，各自生成一个裁剪窗口
+UNCERTAIN_B = [500, 500, 540, 580]
+UNCERTAIN_C = [800, 100, 840, 180]
+
+
+def _detector(responses, max_crops=4, coarse_imgsz=None):
+    base = ScriptedDetector(responses)
+    detector = CoarseToFineDetector(base, confidence_threshold=0.5, margin=0.15, coarse_imgsz=coarse_imgsz,
+                                    crop_context=1.0, max_crops=max_crops, iou_threshold=0.45)
+    return detector, base
+
+
+def test_only_uncertain_boxes_get_crops():
+    detector, base = _detector([
+        ([CERTAIN, UNCERTAIN_B, UNCERTAIN_C], [0.9, 0.55, 0.4]),
+        ([[150, 150, 190, 230]], [0.8]),
+        ([[150, 100, 190, 180]], [0.3]),
+    ], coarse_imgsz=320)
+    # 底层检测器的阈值放宽到不确定区间的下限
+    assert base.confidence_threshold == pytest.approx(0.35)
+
+    boxes, confidences = detector.detect(FRAME)
+    assert detector.last_crops == 2
+    assert base.calls[0] == ((1000, 1000), 320)
+    # 窗口至少为输入尺寸的一半（640 / 4 * 2 = 320 像素），在画面边缘被截断
+    assert base.calls[1] == ((320, 320), 640)
+    assert base.calls[2] == ((300, 320), 640)
+    assert base.imgsz == 640
+
+    # 不确定框B的窗口为 [360, 380, 680, 700]，窗口内的框还原为整帧坐标；
+    # C在裁剪推理中未达到阈值，被丢弃
+    order = np.argsort(-confidences)
+    assert confidences[order].tolist() == pytest.approx([0.9, 0.8])
+    assert boxes[order].tolist() == [CERTAIN, [510, 530, 550, 610]]
+
+
+def test_all_certain_needs_no_crops():
+    detector, base = _detector([([CERTAIN], [0.95])])
+    boxes, confidences = detector.detect(FRAME)
+    assert detector.last_crops == 0
+    assert len(base.calls) == 1
+    assert boxes.tolist() == [CERTAIN]
+
+
+def test_max_crops_is_respected():
+    detector, base = _detector([
+        ([CERTAIN, UNCERTAIN_B, UNCERTAIN_C], [0.9, 0.55, 0.6]),
+        ([], []),
+    ], max_crops=1)
+    boxes, confidences = detector.detect(FRAME)
+    assert detector.last_crops == 1
+    assert len(base.calls) == 2
+    # 置信度更高的C获得唯一的窗口（裁剪推理未确认，丢弃）；
+    # 未分配到窗口的B直接按阈值判断，0.55 >= 0.5 保留
+    assert sorted(boxes.tolist()) == sorted([CERTAIN, UNCERTAIN_B])
+
+
+def test_unassigned_uncertain_box_below_threshold_is_dropped():
+    detector, base = _detector([
+        ([CERTAIN, UNCERTAIN_B, UNCERTAIN_C], [0.9, 0.45, 0.6]),
+        ([], []),
+    ], max_crops=1)
+    boxes, _ = detector.detect(FRAME)
+    assert boxes.tolist() == [CERTAIN]
+
+
+def test_duplicate_from_crop_is_merged_by_nms():
+    # 不确定框与确定框是同一个人；裁剪窗口为 [0, 0, 295, 310]，裁剪结果与确定框高度重叠
+    detector, base = _detector([
+        ([CERTAIN, [110, 100, 160, 200]], [0.9, 0.5]),
+        ([[105, 100, 155, 200]], [0.85]),
+    ])
+    boxes, confidences = detector.detect(FRAME)
+    assert detector.last_crops == 1
+    assert base.calls[1] == ((310, 295), 640)
+    assert boxes.tolist() == [CERTAIN]
+    assert confidences.tolist() == pytest.approx([0.9])
@@ -0,0 +1,79 @@
+"""
+调试快照测试
+采样规则：按变化保存时，因队列已满被丢弃的状态变化应在下一帧重试
+"""
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from src.services.debug_snapshots import DebugSnapshotWriter
+from src.services.exhibit_regions import ExhibitRegions
+
+
+class BlockingWriter(DebugSnapshotWriter):
+    """写盘前阻塞，直到测试放行，用于让队列保持已满"""
+
+    def __init__(self, *args, **kwargs):
+        self.release = threading.Event()
+        self.written = []
+        super().__init__(*args, **kwargs)
+
+    def _write(self, frame, timestamp, boxes_xyxy, confidences, occupied):
+        self.release.wait(timeout=5)
+        self.written.append(bool(occupied[0]))
+
+
+def _submit(writer, occupied, timestamp):
+    frame = np.zeros((24, 32, 3), dtype=np.uint8)
+    return writer.submit(frame, timestamp, np.zeros((0, 4), dtype=np.float32),
+                         np.zeros(0, dtype=np.float32), np.array([occupied]))
+
+
+def _wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_change_dropped_on_full_queue_is_retried(tmp_path):
+    writer = BlockingWriter(ExhibitRegions.from_config([84]), str(tmp_path), on_change=True, queue_size=1)
+    try:
+        assert _submit(writer, False, 0.0)
+        # 后台线程取走第一帧后阻塞在写盘中
+        assert _wait_until(writer._queue.empty)
+        assert _submit(writer, True, 1.0)
+        assert not _submit(writer, False, 2.0)
+        assert writer.stats["dropped"] == 1
+
+        writer.release.set()
+        assert _wait_until(writer._queue.empty)
+        # 上一次变化未能入队，状态仍与最后入队的快照不同，应重试
+        assert _submit(writer, False, 3.0)
+        assert not _submit(writer, False, 4.0)
+    finally:
+        writer.release.set()
+        writer.close()
+    assert writer.written == [False, True, False]
+
+
+def test_sample_interval_counts_from_last_queued_frame(tmp_path):
+    writer = BlockingWriter(ExhibitRegions.from_config([84]), str(tmp_path), sample_interval=5.0, queue_size=1)
+    try:
+        assert _submit(writer, False, 0.0)
+        assert _wait_until(writer._queue.empty)
+        assert _submit(writer, False, 5.0)
+        assert not _submit(writer, False, 10.0)
+
+        writer.release.set()
+        assert _wait_until(writer._queue.empty)
+        # 被丢弃的帧不更新采样时刻，下一帧立即重试
+        assert _submit(writer, False, 10.5)
+        assert not _submit(writer, False, 11.0)
+    finally:
+        writer.release.set()
+        writer.close()
@@ -0,0 +1,80 @@
+"""
+深度过滤测试
+用带深度的合成帧来源和按合成矩形给出人员框的检测器驱动 CameraPipeline，
+检查距离范围外的人员被剔除、范围内的人员正常计入占用
+"""
+import dataclasses
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from src.services.camera_pipeline import CameraPipeline
+from src.services.frame_sources import SyntheticFrameSource
+from src.services.person_detector import PersonDetector
+from src.utils.config import detection_config
+
+
+class SyntheticPersonDetector(PersonDetector):
+    """直接返回合成帧来源中矩形位置的检测器"""
+
+    def __init__(self, source: SyntheticFrameSource, confidence: float = 0.9):
+        super().__init__()
+        self.source = source
+        self.confidence = confidence
+
+    def detect(self, frame):
+        corners = self.source._pos.astype(int)
+        boxes = np.hstack([corners, corners + self.source._size]).astype(np.float32)
+        return boxes, np.full(len(boxes), self.confidence, dtype=np.float32)
+
+
+def _pipeline(person_depth, depth_filtering=True):
+    config = dataclasses.replace(
+        detection_config,
+        depth_filtering=depth_filtering,
+        exhibit_regions=None,
+        exhibit_depth_bands=None,
+        default_depth_band=(0.0, 4.0),
+        occupancy_min_hold=0.0,
+        motion_gating=False,
+        heatmap_enabled=False,
+        save_debug_images=False
+    )
+    source = SyntheticFrameSource(width=320, height=240, num_people=1, depth=True, seed=0)
+    source.person_depths[:] = person_depth
+    return CameraPipeline([84], config, frame_source=source, detector=SyntheticPersonDetector(source))
+
+
+def _run(pipeline, frames=5):
+    statuses = None
+    for _ in range(frames):
+        _, statuses = pipeline.process_frame()
+    pipeline.close()
+    return statuses[84]
+
+
+def test_person_within_depth_band_occupies_exhibit():
+    pipeline = _pipeline(2.0)
+    status = _run(pipeline)
+    assert status.occupied
+    assert status.count == 1
+    assert status.max_conf == pytest.approx(0.9)
+    assert pipeline.stats["depth_rejected"] == 0
+
+
+def test_person_beyond_depth_band_is_rejected():
+    pipeline = _pipeline(10.0)
+    status = _run(pipeline)
+    assert not status.occupied
+    assert status.count == 0
+    assert pipeline.stats["depth_rejected"] == 5
+
+
+def test_depth_ignored_when_filtering_disabled():
+    pipeline = _pipeline(10.0, depth_filtering=False)
+    status = _run(pipeline)
+    assert status.occupied
+    assert status.count == 1
+    assert pipeline.stats["depth_rejected"] == 0
@@ -0,0 +1,82 @@
+"""
+检测服务连接处理测试
+不打开相机、不加载模型，在本地端口上运行展品占用连接处理函数
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from src.services.detection_service import DetectionService
+from src.utils.occupancy_protocol import HEADER, decode_payload
+
+
+def _service():
+    service = DetectionService(num_exhibits=2, exhibit_ids=[84, 80])
+    # 不启动后台检测循环，模拟模型加载中或取帧失败、始终没有检测结果的情况
+    service.start_detection_loop = lambda: None
+    return service
+
+
+async def _read_frame(reader):
+    header = await reader.readexactly(HEADER.size)
+    return decode_payload(await reader.readexactly(HEADER.unpack(header)[0]))
+
+
+async def _wait_until(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition() and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.01)
+    return condition()
+
+
+def test_subscriber_without_results_gets_error_and_is_released_on_close():
+    service = _service()
+
+    async def run():
+        handler = service._connection_handler(service._handle_detection_client, "Metadata")
+        server = await asyncio.start_server(handler, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            for _ in range(3):
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(b"proto=1 subscribe=1\n")
+                message = await asyncio.wait_for(_read_frame(reader), timeout=5)
+                assert message.error is not None
+                assert message.exhibits == {}
+                assert len(service._connection_tasks) == 1
+
+                writer.close()
+                await writer.wait_closed()
+                assert await _wait_until(lambda: not service._connection_tasks)
+            assert not service._subscriber_events
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(run())
+
+
+
+def test_late_request_line_still_selects_framed_protocol():
+    service = _service()
+
+    async def run():
+        handler = service._connection_handler(service._handle_detection_client, "Metadata")
+        server = await asyncio.start_server(handler, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            # 请求行晚到（模拟网络延迟）时仍应按新协议返回带长度前缀的消息
+            await asyncio.sleep(0.05)
+            writer.write(b"proto=1 subscribe=1\n")
+            message = await asyncio.wait_for(_read_frame(reader), timeout=5)
+            assert message.error is not None
+            writer.close()
+            await writer.wait_closed()
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(run())
@@ -0,0 +1,67 @@
+"""
+展品区域测试
+多边形包含判断、默认垂直区域、落脚点计算与深度过滤
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.services.exhibit_regions import ExhibitRegions
+
+
+def test_contains_rectangle_and_triangle():
+    # 顶点数不同的区域会被补齐，补齐的顶点不应影响判断
+    regions = ExhibitRegions.from_config([84, 80], {
+        84: [0.0, 0.0, 0.5, 1.0],
+        80: [[0.5, 0.0], [1.0, 0.0], [1.0, 1.0]],
+    })
+    points = np.array([[0.25, 0.5], [0.9, 0.5], [0.6, 0.5]], dtype=np.float32)
+    assert regions.contains(points).tolist() == [
+        [True, False],
+        [False, True],
+        [False, False],
+    ]
+
+
+def test_default_vertical_strips():
+    regions = ExhibitRegions.from_config([84, 80, 5])
+    points = np.array([[0.1, 0.5], [0.5, 0.5], [0.9, 0.5]], dtype=np.float32)
+    assert regions.contains(points).tolist() == [
+        [True, False, False],
+        [False, True, False],
+        [False, False, True],
+    ]
+
+
+def test_missing_region_raises():
+    with pytest.raises(ValueError):
+        ExhibitRegions.from_config([84, 80], {84: [0.0, 0.0, 0.5, 1.0]})
+
+
+def test_box_on_bottom_edge_is_assigned():
+    regions = ExhibitRegions.from_config([84, 80])
+    boxes = np.array([[10, 20, 30, 100], [60, 0, 90, 50]], dtype=np.float32)
+    assert regions.occupancy(boxes, (100, 100, 3)).tolist() == [True, True]
+    assert regions.assign_boxes(boxes, (100, 100, 3)).tolist() == [[True, False], [False, True]]
+
+
+def test_box_depths_ignores_invalid_values():
+    depth = np.full((40, 40), 3.0, dtype=np.float32)
+    depth[20:, :] = np.nan
+    boxes = np.array([[0, 0, 40, 20], [0, 20, 40, 40]], dtype=np.float32)
+    depths = ExhibitRegions.box_depths(depth, boxes)
+    assert depths[0] == pytest.approx(3.0)
+    assert np.isnan(depths[1])
+
+
+def test_filter_by_depth_keeps_unknown_depths():
+    regions = ExhibitRegions.from_config([84], default_depth_band=(0.0, 4.0))
+    membership = np.ones((3, 1), dtype=bool)
+    depths = np.array([2.0, 10.0, np.nan], dtype=np.float32)
+    assert regions.filter_by_depth(membership, depths).tolist() == [[True], [False], [True]]
+
+
+def test_filter_by_depth_without_bands_is_noop():
+    regions = ExhibitRegions.from_config([84])
+    membership = np.ones((1, 1), dtype=bool)
+    assert regions.filter_by_depth(membership, np.array([100.0])).tolist() == [[True]]
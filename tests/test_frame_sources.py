@@ -0,0 +1,51 @@
+"""
+帧来源测试
+合成帧来源的帧数上限、可复现性、缓冲区复用与深度图
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from src.services.frame_sources import SyntheticFrameSource
+
+
+def test_num_frames_limit():
+    source = SyntheticFrameSource(width=64, height=48, num_frames=3)
+    frames = [source.read() for _ in range(4)]
+    assert all(frame is not None for frame in frames[:3])
+    assert frames[3] is None
+    assert frames[0].shape == (48, 64, 3)
+
+
+def test_same_seed_reproduces_frames():
+    a = SyntheticFrameSource(width=64, height=48, seed=3)
+    b = SyntheticFrameSource(width=64, height=48, seed=3)
+    for _ in range(5):
+        assert np.array_equal(a.read(), b.read())
+
+
+def test_read_reuses_buffer():
+    source = SyntheticFrameSource(width=64, height=48)
+    assert source.read() is source.read()
+    assert source.buffers.allocations == 0
+
+
+def test_depth_map_matches_people():
+    source = SyntheticFrameSource(width=120, height=90, num_people=1, depth=True,
+                                  depth_range=(2.0, 3.0), background_depth=12.0)
+    assert source.depth is None
+    source.read()
+    assert source.depth.shape == (90, 120)
+    assert source.depth.dtype == np.float32
+    x, y = source._pos.astype(int)[0]
+    w, h = source._size
+    assert source.depth[y + h // 2, x + w // 2] == pytest.approx(source.person_depths[0])
+    assert np.count_nonzero(source.depth == source.person_depths[0]) == w * h
+    assert np.count_nonzero(source.depth == 12.0) == 120 * 90 - w * h
+
+
+def test_without_depth_has_no_depth_map():
+    source = SyntheticFrameSource(width=64, height=48)
+    source.read()
+    assert source.depth is None
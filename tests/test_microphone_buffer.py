@@ -0,0 +1,78 @@
+"""
+麦克风环形缓冲区测试
+不打开麦克风，直接调用音频回调写入样本，检查环绕读取、覆盖检测和帧视图
+"""
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.services.microphone_buffer import MicrophoneRingBuffer
+
+OK = SimpleNamespace(input_overflow=False)
+
+
+def _feed(buffer, start, count, status=OK):
+    samples = np.arange(start, start + count, dtype=np.int16)[:, None]
+    buffer._callback(samples, count, None, status)
+
+
+def _buffer():
+    # 容量为2帧（8个样本）
+    return MicrophoneRingBuffer(sample_rate=8, channels=1, seconds=1.0, frame_length=4)
+
+
+def test_capacity_is_whole_frames():
+    buffer = MicrophoneRingBuffer(sample_rate=8, channels=1, seconds=0.6, frame_length=4)
+    assert buffer.capacity == 8
+
+
+def test_read_wraps_around_buffer_end():
+    buffer = _buffer()
+    for start in range(0, 12, 4):
+        _feed(buffer, start, 4)
+    assert buffer.position == 12
+    assert buffer.oldest == 4
+    assert buffer.read(4, 12)[:, 0].tolist() == list(range(4, 12))
+    assert buffer.read(6, 10)[:, 0].tolist() == [6, 7, 8, 9]
+
+
+def test_callback_block_straddling_buffer_end():
+    buffer = _buffer()
+    _feed(buffer, 0, 6)
+    _feed(buffer, 6, 6)
+    assert buffer.read(4, 12)[:, 0].tolist() == list(range(4, 12))
+
+
+def test_read_into_preallocated_array():
+    buffer = _buffer()
+    _feed(buffer, 0, 8)
+    out = np.zeros((16, 1), dtype=np.int16)
+    result = buffer.read(2, 7, out=out)
+    assert np.shares_memory(result, out)
+    assert result[:, 0].tolist() == [2, 3, 4, 5, 6]
+
+
+def test_read_overwritten_samples_raises():
+    buffer = _buffer()
+    _feed(buffer, 0, 12)
+    with pytest.raises(ValueError):
+        buffer.read(2, 6)
+
+
+def test_frame_is_view_into_buffer():
+    buffer = _buffer()
+    _feed(buffer, 0, 12)
+    frame = buffer.frame(8)
+    assert np.shares_memory(frame, buffer.buffer)
+    assert frame[:, 0].tolist() == [8, 9, 10, 11]
+
+
+def test_wait_for_and_overflow_count():
+    buffer = _buffer()
+    _feed(buffer, 0, 4, status=SimpleNamespace(input_overflow=True))
+    assert buffer.overflows == 1
+    assert buffer.wait_for(4, timeout=0)
+    # 未在录音时不会阻塞等待
+    assert not buffer.wait_for(8, timeout=1.0)
@@ -0,0 +1,110 @@
+"""
+运动门控测试
+用合成帧检查：画面不变时跳过推理、区域内变化触发推理、超过刷新间隔时强制推理
+"""
+import dataclasses
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from src.services.camera_pipeline import CameraPipeline
+from src.services.exhibit_regions import ExhibitRegions
+from src.services.frame_sources import SyntheticFrameSource
+from src.services.motion_gate import MotionGate
+from src.services.person_detector import PersonDetector
+from src.utils.config import detection_config
+
+
+def _background():
+    # 没有移动矩形的合成帧：静态噪声背景
+    source = SyntheticFrameSource(width=320, height=240, num_people=0, seed=1)
+    return source.read().copy()
+
+
+def _gate(refresh_interval=10.0):
+    regions = ExhibitRegions.from_config([84, 80])
+    return MotionGate(regions, width=160, pixel_threshold=25, changed_fraction=0.01,
+                      refresh_interval=refresh_interval)
+
+
+def test_first_frame_requires_inference():
+    gate = _gate()
+    assert gate.changed_regions(_background(), 0.0).tolist() == [True, True]
+
+
+def test_unchanged_frames_skip_inference():
+    gate = _gate()
+    frame = _background()
+    gate.changed_regions(frame, 0.0)
+    gate.mark_inferred(0.0)
+    for timestamp in (1.0, 2.0, 3.0):
+        assert gate.changed_regions(frame, timestamp).tolist() == [False, False]
+
+
+def test_change_inside_region_triggers_inference():
+    gate = _gate()
+    frame = _background()
+    gate.changed_regions(frame, 0.0)
+    gate.mark_inferred(0.0)
+
+    changed = frame.copy()
+    changed[60:180, 20:120] = (180, 160, 140)
+    assert gate.changed_regions(changed, 1.0).tolist() == [True, False]
+
+    gate.mark_inferred(1.0)
+    # 推理后以新画面为参考，同样的画面不再触发
+    assert gate.changed_regions(changed, 2.0).tolist() == [False, False]
+
+
+def test_refresh_interval_forces_inference():
+    gate = _gate(refresh_interval=5.0)
+    frame = _background()
+    gate.changed_regions(frame, 0.0)
+    gate.mark_inferred(0.0)
+    assert gate.changed_regions(frame, 4.9).tolist() == [False, False]
+    assert gate.changed_regions(frame, 5.0).tolist() == [True, True]
+
+
+def test_reset_forces_inference():
+    gate = _gate()
+    frame = _background()
+    gate.changed_regions(frame, 0.0)
+    gate.mark_inferred(0.0)
+    gate.reset()
+    assert gate.changed_regions(frame, 1.0).tolist() == [True, True]
+
+
+class CountingDetector(PersonDetector):
+    """不检测任何人员，只统计调用次数"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def detect(self, frame):
+        self.calls += 1
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32)
+
+
+def test_pipeline_skips_detector_on_static_scene():
+    config = dataclasses.replace(
+        detection_config,
+        exhibit_regions=None,
+        motion_gating=True,
+        motion_refresh_interval=3600.0,
+        depth_filtering=False,
+        heatmap_enabled=False,
+        save_debug_images=False
+    )
+    detector = CountingDetector()
+    source = SyntheticFrameSource(width=320, height=240, num_people=0, seed=1)
+    pipeline = CameraPipeline([84, 80], config, frame_source=source, detector=detector)
+    for _ in range(5):
+        pipeline.process_frame()
+    pipeline.close()
+    assert detector.calls == 1
+    stats = pipeline.get_stats()
+    assert stats["inferences"] == 1
+    assert stats["skipped_inferences"] == 4
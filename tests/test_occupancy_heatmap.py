@@ -0,0 +1,89 @@
+"""
+占用热力图测试
+半衰期衰减、长时间运行后的重新归一化（不应出现 inf/nan）与检查点保存/恢复
+"""
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.services.occupancy_heatmap import OccupancyHeatmap
+
+CENTER = np.array([[0.5, 0.5]], dtype=np.float32)
+
+
+def _cell(grid):
+    return float(grid[18, 32])
+
+
+def test_half_life_decay():
+    heatmap = OccupancyHeatmap(width=64, height=36, half_life=10.0)
+    heatmap.add_points(CENTER, 0.0)
+    assert _cell(heatmap.snapshot(0.0)) == pytest.approx(1.0)
+    assert _cell(heatmap.snapshot(10.0)) == pytest.approx(0.5)
+    assert _cell(heatmap.snapshot(20.0)) == pytest.approx(0.25)
+
+    heatmap.add_points(CENTER, 10.0, weight=2.0)
+    assert _cell(heatmap.snapshot()) == pytest.approx(2.5)
+    assert heatmap.snapshot().sum() == pytest.approx(2.5)
+
+
+def test_points_are_clipped_to_grid():
+    heatmap = OccupancyHeatmap(width=4, height=2, half_life=10.0)
+    heatmap.add_points(np.array([[1.0, 1.0], [-0.5, 0.0]], dtype=np.float32), 0.0)
+    grid = heatmap.snapshot()
+    assert grid[1, 3] == pytest.approx(1.0)
+    assert grid[0, 0] == pytest.approx(1.0)
+
+
+def test_long_uptime_rebases_without_overflow():
+    heatmap = OccupancyHeatmap(width=64, height=36, half_life=1.0)
+    heatmap.add_points(CENTER, 0.0)
+    # 约 1e6 个半衰期后 exp((t - t0) / tau) 远超浮点上限，必须先重新归一化
+    for step in range(1, 101):
+        heatmap.add_points(np.zeros((0, 2), dtype=np.float32), step * 1e4)
+    heatmap.add_points(CENTER, 1e6 + 1.0, weight=3.0)
+    grid = heatmap.snapshot()
+    assert np.all(np.isfinite(grid))
+    assert _cell(grid) == pytest.approx(3.0)
+    assert heatmap._t0 > 0.0
+    assert np.all(np.isfinite(heatmap.snapshot(1e6 + 2.0)))
+
+
+def test_rebase_preserves_values():
+    heatmap = OccupancyHeatmap(width=64, height=36, half_life=10.0)
+    heatmap.add_points(CENTER, 0.0)
+    heatmap._rebase(10.0)
+    assert _cell(heatmap.snapshot(10.0)) == pytest.approx(0.5)
+    assert _cell(heatmap.snapshot(20.0)) == pytest.approx(0.25)
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / "heatmaps" / "heatmap.npz")
+    now = time.time()
+    heatmap = OccupancyHeatmap(width=8, height=4, half_life=3600.0)
+    heatmap.add_points(np.array([[0.1, 0.1], [0.9, 0.9]], dtype=np.float32), now - 3600.0)
+    heatmap.save(path, now)
+
+    saved, timestamp = OccupancyHeatmap.load_checkpoint(path)
+    assert timestamp == pytest.approx(now)
+    assert np.allclose(saved, heatmap.snapshot(now))
+    assert saved[0, 0] == pytest.approx(0.5)
+
+    restored = OccupancyHeatmap(width=8, height=4, half_life=3600.0)
+    restored.restore(path)
+    # 恢复时衰减到当前时刻，保存后只经过了很短时间
+    assert np.allclose(restored.snapshot(), saved, rtol=1e-3)
+    assert restored.last_timestamp >= now
+
+
+def test_restore_ignores_mismatched_shape(tmp_path):
+    path = str(tmp_path / "heatmap.npz")
+    heatmap = OccupancyHeatmap(width=8, height=4)
+    heatmap.add_points(CENTER, time.time())
+    heatmap.save(path)
+
+    other = OccupancyHeatmap(width=16, height=9)
+    other.restore(path)
+    assert other.snapshot().sum() == 0.0
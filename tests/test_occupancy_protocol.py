@@ -0,0 +1,114 @@
+"""
+占用消息协议测试
+编码/解码往返、增量消息与占用表的应用、错误帧及旧版负载的兼容性（仅依赖标准库）
+"""
+import json
+import socket
+
+import pytest
+
+from src.utils.occupancy_protocol import (
+    HEADER, ExhibitStatus, OccupancyMessage, OccupancyTable, ProtocolError,
+    decode_payload, encode_message, encode_payload, make_delta, read_message
+)
+
+
+def _message(seq, statuses, timestamp=100.0):
+    return OccupancyMessage(seq=seq, timestamp=timestamp, exhibits=dict(statuses))
+
+
+def test_snapshot_round_trip():
+    message = _message(7, {
+        84: ExhibitStatus(True, count=2, max_conf=0.91, dwell=12.5, remaining=30.0),
+        80: ExhibitStatus(False),
+    })
+    decoded = decode_payload(encode_payload(message))
+    assert decoded.seq == 7
+    assert decoded.timestamp == 100.0
+    assert not decoded.delta and decoded.base_seq is None
+    assert decoded.error is None
+    assert decoded.exhibits == message.exhibits
+    assert decoded.occupancy_string([84, 80]) == "10"
+
+
+def test_read_message_from_socket():
+    message = _message(3, {84: ExhibitStatus(True, count=1, max_conf=0.5)})
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall(encode_message(message))
+        decoded = read_message(right)
+    assert decoded.exhibits == message.exhibits
+
+
+def test_read_message_raises_on_closed_connection():
+    left, right = socket.socketpair()
+    with right:
+        left.sendall(HEADER.pack(10) + b"{")
+        left.close()
+        with pytest.raises(ConnectionError):
+            read_message(right)
+
+
+def test_delta_applies_on_top_of_snapshot():
+    first = _message(1, {84: ExhibitStatus(False), 80: ExhibitStatus(False)})
+    second = _message(2, {84: ExhibitStatus(True, count=1), 80: ExhibitStatus(False)}, timestamp=101.0)
+    delta = make_delta(first, second)
+    assert delta.delta and delta.base_seq == 1
+    assert set(delta.exhibits) == {84}
+
+    table = OccupancyTable()
+    assert table.apply(decode_payload(encode_payload(first)))
+    assert table.apply(decode_payload(encode_payload(delta)))
+    assert table.seq == 2
+    assert table.is_occupied(84) and not table.is_occupied(80)
+
+
+def test_out_of_order_delta_is_rejected():
+    table = OccupancyTable()
+    table.apply(_message(1, {84: ExhibitStatus(False)}))
+    stale = OccupancyMessage(seq=5, timestamp=1.0, exhibits={84: ExhibitStatus(True)}, delta=True, base_seq=4)
+    assert not table.apply(stale)
+    assert not table.is_occupied(84)
+    assert table.seq == 1
+
+
+def test_delta_without_snapshot_is_rejected():
+    delta = OccupancyMessage(seq=2, timestamp=1.0, exhibits={84: ExhibitStatus(True)}, delta=True, base_seq=1)
+    assert not OccupancyTable().apply(delta)
+
+
+def test_error_frame_round_trip():
+    message = OccupancyMessage(seq=0, timestamp=1.0, error="no detection result available")
+    decoded = decode_payload(encode_payload(message))
+    assert decoded.error == "no detection result available"
+    assert decoded.exhibits == {}
+
+
+def test_legacy_payload_without_optional_fields():
+    payload = json.dumps({"v": 1, "type": "snapshot", "seq": 4, "ts": 10.0, "ids": [84, 80], "bits": "2"})
+    decoded = decode_payload(payload.encode("utf-8"))
+    assert not decoded.exhibits[84].occupied
+    assert decoded.exhibits[80].occupied
+    assert decoded.exhibits[80].count == 0 and decoded.exhibits[80].remaining == 0.0
+
+
+@pytest.mark.parametrize("payload", [
+    b"not json",
+    b'{"v": 1, "type": "snapshot"}',
+    b'{"v": 99, "type": "snapshot", "seq": 1, "ts": 0, "ids": [], "bits": "0"}',
+])
+def test_invalid_payload_raises_protocol_error(payload):
+    with pytest.raises(ProtocolError):
+        decode_payload(payload)
+
+
+def test_expected_free_in_counts_down_from_message_time():
+    table = OccupancyTable()
+    table.apply(_message(1, {
+        84: ExhibitStatus(True, remaining=30.0),
+        80: ExhibitStatus(False, remaining=0.0),
+    }, timestamp=100.0))
+    assert table.expected_free_in(84, now=110.0) == pytest.approx(20.0)
+    assert table.expected_free_in(84, now=200.0) == 0.0
+    assert table.expected_free_in(80, now=110.0) == 0.0
+    assert table.expected_free_in(1, now=110.0) == 0.0
@@ -0,0 +1,55 @@
+"""
+占用状态平滑测试
+双阈值滞回、滑动平均窗口与最短保持时间
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.services.occupancy_smoother import OccupancySmoother
+
+
+def _update(smoother, confidence, timestamp):
+    return bool(smoother.update(np.array([confidence], dtype=np.float32), timestamp)[0])
+
+
+def test_hysteresis_between_thresholds():
+    smoother = OccupancySmoother(1, window=1, enter_threshold=0.3, exit_threshold=0.15, min_hold=0.0)
+    assert not _update(smoother, 0.2, 0.0)
+    assert _update(smoother, 0.5, 1.0)
+    # 介于两个阈值之间时保持原状态
+    assert _update(smoother, 0.2, 2.0)
+    assert not _update(smoother, 0.1, 3.0)
+    assert not _update(smoother, 0.2, 4.0)
+
+
+def test_window_averages_confidences():
+    smoother = OccupancySmoother(1, window=5, enter_threshold=0.3, exit_threshold=0.15, min_hold=0.0)
+    assert not _update(smoother, 1.0, 0.0)
+    assert _update(smoother, 1.0, 1.0)
+    # 单帧漏检不会让状态翻转
+    assert _update(smoother, 0.0, 2.0)
+    assert smoother.scores[0] == pytest.approx(0.4)
+
+
+def test_min_hold_delays_change():
+    smoother = OccupancySmoother(1, window=1, min_hold=1.0)
+    assert _update(smoother, 0.5, 0.0)
+    assert _update(smoother, 0.0, 0.5)
+    assert not _update(smoother, 0.0, 1.0)
+
+
+def test_update_returns_copy_and_reset():
+    smoother = OccupancySmoother(2, window=1, min_hold=0.0)
+    state = smoother.update(np.array([0.9, 0.0], dtype=np.float32), 0.0)
+    state[:] = False
+    assert smoother.state.tolist() == [True, False]
+    smoother.reset()
+    assert smoother.state.tolist() == [False, False]
+
+
+def test_invalid_thresholds_raise():
+    with pytest.raises(ValueError):
+        OccupancySmoother(1, enter_threshold=0.1, exit_threshold=0.2)
+    with pytest.raises(ValueError):
+        OccupancySmoother(1, window=0)
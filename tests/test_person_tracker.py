@@ -0,0 +1,144 @@
+"""
+人员跟踪测试
+IoU/质心匹配（含交错和漏检一帧）、轨迹过期、互为最佳的贪心匹配，以及展品停留时间估计
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.services.person_tracker import ExhibitDwell, PersonTracker, _mutual_best_matches, box_iou
+
+
+def _boxes(*boxes):
+    return np.array(boxes, dtype=np.float32).reshape(-1, 4)
+
+
+def _walkers(step):
+    """两人相向而行：A 向右，B 向左，纵向错开，在第3步附近交错"""
+    a = [5 * step, 0, 5 * step + 10, 20]
+    b = [30 - 5 * step, 15, 40 - 5 * step, 35]
+    return a, b
+
+
+def test_box_iou():
+    iou = box_iou(_boxes([0, 0, 10, 10]), _boxes([0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]))
+    assert iou[0].tolist() == pytest.approx([1.0, 1 / 3, 0.0])
+
+
+def test_ids_follow_people_across_a_crossing():
+    tracker = PersonTracker(iou_threshold=0.3, max_age=1.0, distance_threshold=0.5)
+    first, _ = tracker.update(_boxes(*_walkers(0)), 0.0)
+    for step in range(1, 7):
+        a, b = _walkers(step)
+        # 检测框顺序每帧交替，匹配不应依赖输入顺序
+        if step % 2:
+            ids, _ = tracker.update(_boxes(b, a), step * 0.1)
+            ids = ids[::-1]
+        else:
+            ids, _ = tracker.update(_boxes(a, b), step * 0.1)
+        assert ids.tolist() == first.tolist()
+    assert len(tracker) == 2
+
+
+def test_centroid_match_after_dropped_frame():
+    tracker = PersonTracker(iou_threshold=0.3, max_age=1.0, distance_threshold=0.5)
+    first, _ = tracker.update(_boxes(*_walkers(0)), 0.0)
+    # 漏检一帧：本帧没有检测结果，轨迹保留
+    ids, removed = tracker.update(_boxes(), 0.1)
+    assert len(ids) == 0 and len(removed) == 0
+    # 两步位移后框不再重叠（IoU为0），按质心距离匹配
+    a, b = _walkers(2)
+    assert box_iou(_boxes(_walkers(0)[0]), _boxes(a))[0, 0] == 0.0
+    ids, _ = tracker.update(_boxes(a, b), 0.2)
+    assert ids.tolist() == first.tolist()
+
+
+def test_far_detection_starts_new_track():
+    tracker = PersonTracker(distance_threshold=0.5)
+    first, _ = tracker.update(_boxes([0, 0, 10, 20]), 0.0)
+    ids, _ = tracker.update(_boxes([100, 0, 110, 20]), 0.1)
+    assert ids[0] != first[0]
+    assert len(tracker) == 2
+
+
+def test_track_expires_after_max_age():
+    tracker = PersonTracker(max_age=1.0)
+    ids, _ = tracker.update(_boxes([0, 0, 10, 20]), 0.0)
+    _, removed = tracker.update(_boxes(), 1.0)
+    assert len(removed) == 0 and len(tracker) == 1
+    _, removed = tracker.update(_boxes(), 1.5)
+    assert removed.tolist() == ids.tolist()
+    assert len(tracker) == 0
+    # 过期后再出现的人员获得新ID
+    new_ids, _ = tracker.update(_boxes([0, 0, 10, 20]), 2.0)
+    assert new_ids[0] != ids[0]
+
+
+def test_touch_keeps_tracks_alive():
+    tracker = PersonTracker(max_age=1.0)
+    tracker.update(_boxes([0, 0, 10, 20]), 0.0)
+    tracker.touch(1.0)
+    _, removed = tracker.update(_boxes(), 1.5)
+    assert len(removed) == 0
+
+
+def test_mutual_best_matches_resolves_competition():
+    # 两条轨迹都最偏好第0个检测框：得分更高的轨迹0得到它，轨迹1退而求其次
+    score = np.array([[0.9, 0.8], [0.85, 0.1]])
+    rows, cols = _mutual_best_matches(score)
+    assert sorted(zip(rows.tolist(), cols.tolist())) == [(0, 0), (1, 1)]
+
+
+def test_mutual_best_matches_skips_unmatchable():
+    score = np.array([[0.5, -np.inf], [0.6, -np.inf], [-np.inf, -np.inf]])
+    rows, cols = _mutual_best_matches(score)
+    assert list(zip(rows.tolist(), cols.tolist())) == [(1, 0)]
+
+
+def test_mutual_best_matches_empty():
+    rows, cols = _mutual_best_matches(np.full((2, 3), -np.inf))
+    assert len(rows) == 0 and len(cols) == 0
+
+
+def _update(dwell, track_ids, regions, timestamp, removed=()):
+    """regions 为各轨迹所在区域下标，-1 表示不在任何区域"""
+    membership = np.zeros((len(track_ids), dwell.num_regions), dtype=bool)
+    for i, region in enumerate(regions):
+        if region >= 0:
+            membership[i, region] = True
+    dwell.update(np.array(track_ids, dtype=np.int64), membership, np.array(removed, dtype=np.int64), timestamp)
+
+
+def test_dwell_samples_and_min_sample_cutoff():
+    dwell = ExhibitDwell(num_regions=1, prior=60.0, min_sample=2.0)
+    _update(dwell, [1], [0], 0.0)
+    # 离开区域时记录完整停留时长
+    _update(dwell, [1], [-1], 10.0)
+    # 停留1秒后轨迹消失：短于 min_sample，视为路过，不计入样本
+    _update(dwell, [2], [0], 10.0)
+    _update(dwell, [], [], 11.0, removed=[2])
+    assert list(dwell._samples[0]) == [10.0]
+
+
+def test_expected_remaining():
+    dwell = ExhibitDwell(num_regions=1, prior=60.0, min_sample=2.0)
+    for start, end in [(0.0, 10.0), (20.0, 40.0)]:
+        _update(dwell, [1], [0], start)
+        _update(dwell, [1], [-1], end)
+    # 停留超过4秒的样本为10和20秒，平均剩余 (10 + 20) / 2 - 4
+    assert dwell.expected_remaining(0, 4.0) == pytest.approx(11.0)
+    assert dwell.expected_remaining(0, 12.0) == pytest.approx(8.0)
+    # 没有更长的样本时按先验估计，且不低于先验的四分之一
+    assert dwell.expected_remaining(0, 25.0) == pytest.approx(35.0)
+    assert dwell.expected_remaining(0, 55.0) == pytest.approx(15.0)
+
+
+def test_summary_reports_longest_visitor():
+    dwell = ExhibitDwell(num_regions=2, prior=60.0)
+    _update(dwell, [1, 2], [0, 0], 0.0)
+    _update(dwell, [1, 2, 3], [0, 0, -1], 3.0)
+    _update(dwell, [1, 2, 3], [0, -1, -1], 5.0)
+    current, remaining = dwell.summary(6.0)
+    assert current.tolist() == pytest.approx([6.0, 0.0])
+    assert remaining[0] == pytest.approx(54.0)
+    assert remaining[1] == 0.0
@@ -0,0 +1,66 @@
+"""
+语音端点检测测试
+UtteranceEndpointer 的说完判定、短噪声忽略、等待超时与最长时长，以及能量VAD
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.services.voice_activity import EnergyVAD, UtteranceEndpointer
+
+
+def _endpointer():
+    # 每帧0.1秒：静音3帧结束，有声至少2帧，最长10帧，最多等待5帧，首尾各填充1帧
+    return UtteranceEndpointer(0.1, silence_timeout=0.3, min_utterance=0.2, max_utterance=1.0,
+                               max_wait=0.5, padding=0.1)
+
+
+def _push_all(endpointer, frames):
+    return [endpointer.push(speech) for speech in frames]
+
+
+def test_utterance_ends_after_silence():
+    endpointer = _endpointer()
+    results = _push_all(endpointer, [False, False, True, True, True, False, False, False])
+    assert results == [False] * 7 + [True]
+    assert endpointer.speaking
+    assert endpointer.span() == (1, 6)
+
+
+def test_short_noise_is_ignored():
+    endpointer = _endpointer()
+    results = _push_all(endpointer, [True, False, False, False, False])
+    assert results == [False] * 4 + [True]
+    assert not endpointer.speaking
+    assert endpointer.span() is None
+
+
+def test_wait_timeout_without_speech():
+    endpointer = _endpointer()
+    assert _push_all(endpointer, [False] * 5) == [False] * 4 + [True]
+    assert endpointer.span() is None
+    # 结束后继续推进仍返回True
+    assert endpointer.push(True)
+
+
+def test_max_utterance_forces_end():
+    endpointer = _endpointer()
+    results = _push_all(endpointer, [True] * 10)
+    assert results == [False] * 9 + [True]
+    assert endpointer.span() == (0, 10)
+
+
+def test_reset_starts_new_utterance():
+    endpointer = _endpointer()
+    _push_all(endpointer, [False] * 5)
+    endpointer.reset()
+    assert not endpointer.done
+    assert not endpointer.push(True)
+
+
+def test_energy_vad_separates_speech_from_silence():
+    vad = EnergyVAD(threshold_db=-45.0, noise_margin_db=10.0)
+    silence = np.zeros(480, dtype=np.int16)
+    speech = (np.sin(np.linspace(0, 60 * np.pi, 480)) * 8000).astype(np.int16)
+    assert not vad.is_speech(silence)
+    assert vad.is_speech(speech)